@@ -5,11 +5,13 @@ import app.utils.Logger as Logger
 from app.utils.Generators import Generators
 from app.models.AnnouncementModels import AnnouncementCreateModel
 from app.utils.RedisConnector import RedisConnector
+from app.utils.Tracing import Tracing
 
 from app.dependencies import load_config
 
 config: dict = load_config()
 
+@Tracing.traced
 class Announcements:
     """Implements the announcements class for the ReVanced API"""
        
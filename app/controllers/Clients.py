@@ -11,11 +11,14 @@ import app.utils.Logger as Logger
 from app.utils.Generators import Generators
 from app.models.ClientModels import ClientModel
 from app.utils.RedisConnector import RedisConnector
+from app.utils.Denylist import Denylist
+from app.utils.Tracing import Tracing
 
 from app.dependencies import load_config
 
 config: dict = load_config()
 
+@Tracing.traced
 class Clients:
     
     """Implements a client for ReVanced Releases API."""
@@ -275,12 +278,19 @@ class Clients:
                                             value="",
                                             nx=True,
                                             ex=config['auth']['access_token_expires'])
-            await self.UserLogger.log("BAN_TOKEN", None, token)
-            banned = True
         except aioredis.RedisError as e:
             await self.UserLogger.log("BAN_TOKEN", e)
             raise e
         
+        await self.UserLogger.log("BAN_TOKEN", None, token)
+        banned = True
+        
+        try:
+            await Denylist.publish(token)
+        except aioredis.RedisError as e:
+            # The ban is in Redis and in this worker, the others load it within reload_interval
+            await self.UserLogger.log("PUBLISH_BAN", e)
+        
         return banned
     
     async def auth_checks(self, client_id: str, token: str) -> bool:
@@ -0,0 +1,310 @@
+import math
+import asyncio
+from datetime import datetime
+
+import httpx
+import orjson
+from loguru import logger
+from redis import asyncio as aioredis
+
+import app.utils.Logger as Logger
+from app.controllers.Releases import Releases
+from app.utils.RedisConnector import RedisConnector
+from app.utils.Tracing import Tracing
+from app.utils.CircuitBreaker import CircuitOpenError
+
+from app.dependencies import load_config
+
+config: dict = load_config()
+
+@Tracing.traced
+class Commits:
+
+    """Implements an incremental, Redis backed commit index for the changelogs."""
+
+    redis = RedisConnector.connect(config['commits']['database'])
+
+    httpx_client = Releases.httpx_client
+
+    singleflight = Releases.singleflight
+
+    breaker = Releases.breaker
+
+    InternalCacheLogger = Logger.InternalCacheLogger()
+
+    async def assemble_key(self, org: str, repository: str) -> str:
+        """Assemble the Redis key for the commit index of a repository
+
+        Returns:
+            str: The Redis key
+        """
+
+        return f"commits:{org}/{repository}"
+
+    async def sync_interval(self, org: str) -> int:
+        """Get how long the commit index of an organization's repository stays fresh
+
+        Organizations that send webhooks get a sync on every push, so their
+        schedule only has to catch missed deliveries.
+
+        Args:
+            org (str): Username of the organization
+
+        Returns:
+            int: Seconds between syncs
+        """
+
+        if org in config['commits']['webhooks']:
+            return config['commits']['webhook_sync_interval']
+
+        return config['commits']['sync_interval']
+
+    @staticmethod
+    def window(releases: list[str]) -> tuple[float, float] | None:
+        """Get the commit time range between the two latest releases
+
+        Args:
+            releases (list[str]): Creation dates of the latest releases, newest first
+
+        Returns:
+            tuple[float, float] | None: Newest and oldest score of the range, None without releases
+        """
+
+        if not releases:
+            return None
+
+        until: float = datetime.fromisoformat(releases[0]).timestamp()
+        since: float = datetime.fromisoformat(releases[1]).timestamp() if len(releases) > 1 else -math.inf
+
+        return until, since
+
+    @staticmethod
+    def record(commit: dict) -> dict:
+        """Build the index record of a commit as the commit list returns it
+
+        Args:
+            commit (dict): Commit
+
+        Returns:
+            dict: the commit's index record, without files until they are fetched
+        """
+
+        return {'sha': commit['sha'],
+                'author': commit['commit']['author']['name'],
+                'date': commit['commit']['author']['date'],
+                'committed_at': commit['commit']['committer']['date'],
+                'message': commit['commit']['message'],
+                'html_url': commit['html_url'],
+                'files': None
+                }
+
+    async def __get_files(self, org: str, repository: str, sha: str) -> list[str]:
+        """Get the files a commit touched, which only the single commit endpoint lists.
+
+        Args:
+            org (str): Username of the organization
+            repository (str): Repository name
+            sha (str): Commit SHA
+
+        Returns:
+            list[str]: Paths of the files
+        """
+
+        response = await self.httpx_client.get(
+            f"{config['github']['api_url']}/repos/{org}/{repository}/commits/{sha}"
+        )
+
+        response.raise_for_status()
+
+        return [file['filename'] for file in orjson.loads(response.content).get('files', [])]
+
+    async def __sync(self, org: str, repository: str) -> None:
+        """Add the commits newer than the last-seen SHA to the index.
+
+        Commits are immutable, so only the ones that were never seen are
+        listed, a page of them per request. The files a commit touched are
+        only fetched, one request each, once it falls between the two latest
+        releases, which is all /changelogs answers. The release boundaries
+        are refreshed on every sync.
+
+        Args:
+            org (str): Username of the organization
+            repository (str): Repository name
+        """
+
+        key: str = await self.assemble_key(org, repository)
+        api_url: str = f"{config['github']['api_url']}/repos/{org}/{repository}"
+
+        _releases = await self.httpx_client.get(f"{api_url}/releases?per_page=2")
+
+        # Not a repository, there is nothing to index
+        found: bool = _releases.status_code != 404
+
+        if found:
+            _releases.raise_for_status()
+
+        releases: list[str] = [release['created_at'] for release in orjson.loads(_releases.content)] if found else []
+
+        head: str | None = await self.redis.get(f"{key}:head")
+        new_commits: list[dict] = []
+        page: int = 1
+
+        while found and len(new_commits) < config['commits']['depth']:
+            _response = await self.httpx_client.get(
+                f"{api_url}/commits?per_page={config['github']['per_page']}&page={page}"
+            )
+
+            _response.raise_for_status()
+
+            listed: list[dict] = [self.record(commit) for commit in orjson.loads(_response.content)]
+            shas: list[str] = [commit['sha'] for commit in listed]
+
+            if head in shas:
+                new_commits.extend(listed[:shas.index(head)])
+                break
+
+            new_commits.extend(listed)
+
+            if 'next' not in _response.links:
+                break
+
+            page += 1
+
+        new_commits = new_commits[:config['commits']['depth']]
+
+        # The commits between the latest releases, new or indexed earlier, that still lack their files
+        window: tuple[float, float] | None = self.window(releases)
+        pending: list[dict] = []
+
+        if window is not None:
+            until, since = window
+            pending = [commit for commit in new_commits
+                       if since <= datetime.fromisoformat(commit['committed_at']).timestamp() <= until]
+            indexed: list[str] = await self.redis.zrevrangebyscore(key, until, since)
+            records: list[str | None] = await self.redis.mget([f"{key}:{sha}" for sha in indexed]) if indexed else []
+            pending.extend(commit for commit in (orjson.loads(record) for record in records if record is not None)
+                           if commit['files'] is None)
+
+        semaphore = asyncio.Semaphore(config['github']['concurrency'])
+
+        async def get_files(commit: dict) -> None:
+            async with semaphore:
+                commit['files'] = await self.__get_files(org, repository, commit['sha'])
+
+        await asyncio.gather(*[get_files(commit) for commit in pending])
+
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                for commit in {commit['sha']: commit for commit in [*new_commits, *pending]}.values():
+                    pipe.set(f"{key}:{commit['sha']}", orjson.dumps(commit))
+                for commit in new_commits:
+                    pipe.zadd(key, {commit['sha']: datetime.fromisoformat(commit['committed_at']).timestamp()})
+                if new_commits:
+                    pipe.set(f"{key}:head", new_commits[0]['sha'])
+                pipe.set(f"{key}:releases", orjson.dumps(releases))
+                pipe.set(f"{key}:synced", "", ex=await self.sync_interval(org))
+                await pipe.execute()
+
+            # Forget whatever fell beyond the configured depth
+            overflow: int = await self.redis.zcard(key) - config['commits']['depth']
+
+            if overflow > 0:
+                evicted: list[tuple[str, float]] = await self.redis.zpopmin(key, overflow)
+                await self.redis.delete(*[f"{key}:{sha}" for sha, _ in evicted])
+
+            await self.InternalCacheLogger.log("SYNC", None, key)
+        except aioredis.RedisError as e:
+            await self.InternalCacheLogger.log("SYNC", e)
+            raise e
+
+    async def sync(self, org: str, repository: str) -> None:
+        """Sync the commit index of a repository, once at a time across workers.
+
+        Args:
+            org (str): Username of the organization
+            repository (str): Repository name
+        """
+
+        await self.singleflight.run(
+            f"commits:{org}/{repository}", lambda: self.breaker.call('commits', lambda: self.__sync(org, repository))
+            )
+
+    async def is_stale(self, org: str, repository: str) -> bool:
+        """Check if the commit index of a repository is overdue for a sync
+
+        Args:
+            org (str): Username of the organization
+            repository (str): Repository name
+
+        Returns:
+            bool: True if the last sync is older than the sync interval, False otherwise
+        """
+
+        return not await self.redis.exists(f"{await self.assemble_key(org, repository)}:synced")
+
+    async def get(self, org: str, repository: str, path: str) -> dict:
+        """Get the commits between the two latest releases that touched a path.
+
+        Answered from the commit index, which is synced at most once per
+        sync interval no matter how many paths are asked for. If GitHub can't
+        be reached, the index is answered from as it is.
+
+        Args:
+            org (str): Username of the organization | valid values: revanced or vancedapp
+            repository (str): Repository name
+            path (str): Path to the file or directory
+
+        Raises:
+            ValueError: Raise if the organization is not revanced or vancedapp
+
+        Returns:
+            dict: a dictionary containing the repository's latest commits
+        """
+
+        if org != 'revanced' and org != 'vancedapp':
+            raise ValueError("Invalid organization.")
+
+        key: str = await self.assemble_key(org, repository)
+
+        if not await self.redis.exists(f"{key}:synced"):
+            try:
+                await self.sync(org, repository)
+            except (CircuitOpenError, httpx.HTTPError, ValueError) as e:
+                if not await self.redis.exists(f"{key}:releases"):
+                    raise e
+
+                logger.warning(f"[Commits] {org}/{repository} - Sync failed, serving the stale index: {e!r}")
+
+        releases: list[str] = orjson.loads(await self.redis.get(f"{key}:releases") or "[]")
+        window: tuple[float, float] | None = self.window(releases)
+
+        # A missing repository, or one without releases, has no changes to list
+        if window is None:
+            return {'repository': f"{org}/{repository}", 'path': path, 'commits': []}
+
+        until, since = window
+        shas: list[str] = await self.redis.zrevrangebyscore(key, until, since)
+        records: list[str | None] = await self.redis.mget([f"{key}:{sha}" for sha in shas]) if shas else []
+
+        prefix: str = path.strip('/')
+
+        def touches(commit: dict) -> bool:
+            return any(file == prefix or file.startswith(f"{prefix}/") for file in commit['files'] or [])
+
+        commits: list[dict] = []
+
+        for record in records:
+            if record is None:
+                continue
+
+            commit: dict = orjson.loads(record)
+
+            if not prefix or touches(commit):
+                commits.append({'sha': commit['sha'],
+                                'author': commit['author'],
+                                'date': commit['date'],
+                                'message': commit['message'],
+                                'html_url': commit['html_url']
+                                })
+
+        return {'repository': f"{org}/{repository}", 'path': path, 'commits': commits}
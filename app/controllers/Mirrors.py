@@ -3,11 +3,13 @@ from redis import asyncio as aioredis
 import app.utils.Logger as Logger
 from app.models.MirrorModels import MirrorModel, MirrorStoreModel
 from app.utils.RedisConnector import RedisConnector
+from app.utils.Tracing import Tracing
 
 from app.dependencies import load_config
 
 config: dict = load_config()
 
+@Tracing.traced
 class Mirrors:
     """Implements the Mirror class for the ReVanced API"""
     
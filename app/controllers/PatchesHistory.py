@@ -0,0 +1,153 @@
+import time
+from typing import Awaitable, cast
+
+import orjson
+from redis import asyncio as aioredis
+
+import app.utils.Logger as Logger
+from app.utils.HTTPCache import HTTPCache
+from app.utils.LocalCache import LocalCache
+from app.utils.RedisConnector import RedisConnector
+
+from app.dependencies import load_config
+
+config: dict = load_config()
+
+class PatchesHistory:
+
+    """Implements a history of the last patches.json documents, with precomputed diffs to the latest one.
+
+    Documents are identified by their content hash, the same one /patches
+    sends as its ETag, or by the git blob SHA patches.json had upstream.
+    """
+
+    redis = RedisConnector.connect(config['history']['database'], decode_responses=False)
+
+    local_cache = LocalCache()
+
+    InternalCacheLogger = Logger.InternalCacheLogger()
+
+    @staticmethod
+    def version(since: str) -> str:
+        """Normalize a version given by a client
+
+        Args:
+            since (str): Content hash, ETag of /patches or blob SHA
+
+        Returns:
+            str: The bare hash
+        """
+
+        return since.strip().removeprefix('W/').strip('"').partition('-')[0]
+
+    @staticmethod
+    def diff(old: list, new: list) -> dict[str, list]:
+        """Compute the changes between two patches.json documents, keyed by patch name
+
+        Args:
+            old (list): Older patches.json
+            new (list): Newer patches.json
+
+        Returns:
+            dict[str, list]: Added and changed patches as they are now, and the names of the removed ones
+        """
+
+        before: dict[str, dict] = {patch['name']: patch for patch in old}
+        after: dict[str, dict] = {patch['name']: patch for patch in new}
+
+        return {'added': [patch for name, patch in after.items() if name not in before],
+                'removed': [name for name in before if name not in after],
+                'changed': [patch for name, patch in after.items() if name in before and before[name] != patch]}
+
+    async def record(self, patches: list, sha: str | None = None) -> None:
+        """Add a patches.json document to the history and precompute the diffs to it
+
+        Args:
+            patches (list): Validated patches.json
+            sha (str | None, optional): Blob SHA patches.json had upstream, to alias it by. Defaults to None.
+        """
+
+        body: bytes = orjson.dumps(patches)
+        latest: str = HTTPCache.etag(body).strip('"')
+
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.zrange("patches:versions", 0, -1)
+                pipe.hgetall("patches:aliases")
+                recorded, aliases = await pipe.execute()
+
+            versions: list[str] = [version.decode() for version in recorded]
+
+            if versions and versions[-1] == latest:
+                return
+
+            # Oldest first, whatever fell beyond the configured depth is forgotten
+            versions = [version for version in versions if version != latest] + [latest]
+            evicted: list[str] = versions[:-config['patches']['history']]
+            versions = versions[-config['patches']['history']:]
+
+            documents: list[bytes | None] = await self.redis.mget([f"patches:version:{version}"
+                                                                   for version in versions[:-1]]) if versions[:-1] else []
+            diffs: dict[str, bytes] = {}
+
+            for version, document in zip(versions, [*documents, body]):
+                if document is None:
+                    continue
+
+                diff: bytes = orjson.dumps({'since': version, 'until': latest}
+                                           | self.diff(orjson.loads(document), patches))
+                diffs[version] = diff
+                diffs[f"{version}:etag"] = HTTPCache.etag(diff).encode()
+
+            kept: dict[str, str] = {alias.decode(): version.decode() for alias, version in aliases.items()
+                                    if version.decode() not in evicted}
+
+            if sha is not None:
+                kept[sha] = latest
+
+            # The document, the index, the aliases and the diffs change together
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.set(f"patches:version:{latest}", body)
+                pipe.zadd("patches:versions", {latest: time.time()})
+                if evicted:
+                    pipe.zrem("patches:versions", *evicted)
+                    pipe.delete(*[f"patches:version:{version}" for version in evicted])
+                pipe.delete("patches:aliases", "patches:diffs")
+                if kept:
+                    pipe.hset("patches:aliases", mapping=kept)
+                pipe.hset("patches:diffs", mapping=diffs)
+                await pipe.execute()
+
+            await self.local_cache.invalidate("patches:diffs")
+            await self.InternalCacheLogger.log("HISTORY", None, "patches:diffs")
+        except aioredis.RedisError as e:
+            await self.InternalCacheLogger.log("HISTORY", e)
+            raise e
+
+    async def get(self, since: str) -> tuple[bytes, str] | None:
+        """Get the precomputed diff from a past patches.json to the latest one
+
+        Args:
+            since (str): Content hash, ETag of /patches or blob SHA of the client's patches.json
+
+        Returns:
+            tuple[bytes, str] | None: The serialized diff and its ETag, or None if the version is unknown or too old
+        """
+
+        version: str = self.version(since)
+
+        async def read() -> tuple[bytes, bytes] | None:
+            alias: bytes | None = await cast(Awaitable[bytes | None], self.redis.hget("patches:aliases", version))
+            resolved: str = alias.decode() if alias is not None else version
+            body, etag = await cast(Awaitable[list], self.redis.hmget("patches:diffs", [resolved, f"{resolved}:etag"]))
+
+            return None if body is None or etag is None else (body, etag)
+
+        entry: tuple[bytes, bytes] | None = await self.local_cache.load(f"patches:diffs#{version}", read)
+
+        if entry is None:
+            return None
+
+        body, etag = entry
+
+        return body, etag.decode()
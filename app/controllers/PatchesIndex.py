@@ -0,0 +1,177 @@
+import orjson
+from typing import Awaitable, Callable
+from redis import asyncio as aioredis
+
+import app.utils.Logger as Logger
+from app.utils.HTTPCache import HTTPCache
+from app.utils.LocalCache import LocalCache
+from app.utils.SingleFlight import SingleFlight
+from app.utils.RedisConnector import RedisConnector
+
+from app.dependencies import load_config
+
+config: dict = load_config()
+
+class PatchesIndex:
+
+    """Implements a package to version to patches index, with pre-serialized buckets and their ETags."""
+
+    redis = RedisConnector.connect(config['cache']['database'], decode_responses=False)
+
+    local_cache = LocalCache()
+
+    singleflight = SingleFlight()
+
+    InternalCacheLogger = Logger.InternalCacheLogger()
+
+    any_version: str = "*"
+
+    empty: bytes = b"[]"
+
+    async def assemble_field(self, package: str, version: str | None = None) -> str:
+        """Assemble the hash field of a bucket
+
+        Args:
+            package (str): Package name
+            version (str | None, optional): Package version. Defaults to None, for every version.
+
+        Returns:
+            str: The hash field
+        """
+
+        return package if version is None else f"{package}@{version}"
+
+    async def build(self, patches: list) -> dict[str, bytes]:
+        """Build the serialized buckets for every package and version
+
+        Patches that don't name any version are compatible with all of them,
+        so they go in every version bucket of their package, and in the
+        any-version bucket answered for versions nobody named. Patches that
+        don't name any package are universal: they go in every bucket, and
+        in the bucket answered for packages nobody named.
+
+        Args:
+            patches (list): patches.json
+
+        Returns:
+            dict[str, bytes]: Serialized list of patches per hash field
+        """
+
+        index: dict[str, dict[str, list]] = {}
+        universal: list = [patch for patch in patches if not patch['compatiblePackages']]
+
+        for patch in patches:
+            for package in patch['compatiblePackages'] or []:
+                versions: dict[str, list] = index.setdefault(package['name'], {})
+                versions.setdefault(self.any_version, [])
+
+                for version in package['versions'] or [self.any_version]:
+                    versions.setdefault(version, []).append(patch)
+
+        position: dict[int, int] = {id(patch): order for order, patch in enumerate(patches)}
+
+        def ordered(bucket: list) -> list:
+            # Drop duplicates and keep the bucket in patches.json order
+            return sorted({id(patch): patch for patch in bucket}.values(), key=lambda patch: position[id(patch)])
+
+        buckets: dict[str, bytes] = {}
+
+        for package, versions in index.items():
+            any_version: list = versions[self.any_version] + universal
+
+            for version, version_patches in versions.items():
+                version_patches = version_patches + any_version
+
+                buckets[await self.assemble_field(package, version)] = orjson.dumps(ordered(version_patches))
+
+            every_patch: list = [patch for version_patches in versions.values() for patch in version_patches]
+            buckets[await self.assemble_field(package)] = orjson.dumps(ordered(every_patch + universal))
+
+        buckets[self.any_version] = orjson.dumps(universal)
+
+        return buckets
+
+    async def update(self, patches: list) -> None:
+        """Rebuild the index and atomically swap it in
+
+        Args:
+            patches (list): patches.json
+        """
+
+        buckets: dict[str, bytes] = await self.build(patches)
+        etags: dict[str, str] = {field: HTTPCache.etag(bucket) for field, bucket in buckets.items()}
+
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.delete("patches:index:next", "patches:index:etags:next")
+                pipe.hset("patches:index:next", mapping=buckets)
+                pipe.hset("patches:index:etags:next", mapping=etags)
+                pipe.rename("patches:index:next", "patches:index")
+                pipe.rename("patches:index:etags:next", "patches:index:etags")
+                pipe.set("patches:index:built", "")
+                await pipe.execute()
+
+            await self.local_cache.invalidate("patches:index")
+
+            await self.InternalCacheLogger.log("INDEX", None, "patches:index")
+        except aioredis.RedisError as e:
+            await self.InternalCacheLogger.log("INDEX", e)
+            raise e
+
+    async def ensure(self, fetch: Callable[[], Awaitable[list]]) -> None:
+        """Build the index, once at a time across workers, when it wasn't built yet
+
+        Args:
+            fetch (Callable[[], Awaitable[list]]): Gets patches.json
+        """
+
+        async def build() -> None:
+            if not await self.redis.exists("patches:index:built"):
+                patches: list = await fetch()
+
+                # Building a missing snapshot builds the index along with it
+                if not await self.redis.exists("patches:index:built"):
+                    await self.update(patches)
+
+        await self.singleflight.run("index:patches", build)
+
+    async def get(self, package: str, version: str | None = None) -> tuple[bytes, str] | None:
+        """Get the serialized patches compatible with a package
+
+        Args:
+            package (str): Package name
+            version (str | None, optional): Package version. Defaults to None, for every version.
+
+        Returns:
+            tuple[bytes, str] | None: Serialized list of patches and its ETag, or None if the index wasn't built yet
+        """
+
+        fields: list[str] = [await self.assemble_field(package, version)]
+
+        if version is not None:
+            fields.append(await self.assemble_field(package, self.any_version))
+
+        # Nobody named the package, only the universal patches are compatible
+        fields.append(self.any_version)
+
+        async def read() -> tuple[list, list] | None:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.exists("patches:index:built")
+                pipe.hmget("patches:index", fields)
+                pipe.hmget("patches:index:etags", fields)
+                built, buckets, etags = await pipe.execute()
+
+            return (buckets, etags) if built else None
+
+        index: tuple[list, list] | None = await self.local_cache.load(f"patches:index#{'|'.join(fields)}", read)
+
+        if index is None:
+            return None
+
+        buckets, etags = index
+
+        for bucket, etag in zip(buckets, etags):
+            if bucket is not None and etag is not None:
+                return bucket, etag.decode()
+
+        return self.empty, HTTPCache.etag(self.empty)
@@ -0,0 +1,472 @@
+import time
+import uuid
+import random
+import asyncio
+from typing import Any, Awaitable, Callable, cast
+
+import orjson
+from loguru import logger
+from pydantic import BaseModel
+from fastapi import Request, Response
+from redis.exceptions import WatchError
+
+import app.models.ResponseModels as ResponseModels
+
+from app.controllers.Releases import Releases
+from app.controllers.PatchesIndex import PatchesIndex
+from app.controllers.ReleaseHistory import ReleaseHistory
+from app.controllers.PatchesHistory import PatchesHistory
+from app.utils.HTTPCache import HTTPCache
+from app.utils.Metrics import Metrics
+from app.utils.LocalCache import LocalCache
+from app.utils.Streaming import Streaming
+from app.utils.SingleFlight import SingleFlight
+from app.utils.Compression import Compression
+from app.utils.RedisConnector import RedisConnector
+from app.utils.RateLimitScheduler import RateLimitScheduler
+
+from app.dependencies import load_config
+
+config: dict = load_config()
+
+class Refresher:
+
+    """Rebuilds the GitHub backed payloads on a schedule and swaps them into the cache.
+
+    Payloads are validated against their response model once, when they
+    are built. Snapshots are then stored serialized and pre-compressed, so
+    they are served as they are, without being decoded, validated or
+    encoded again.
+    """
+
+    redis = RedisConnector.connect(config['cache']['database'], decode_responses=False)
+
+    releases = Releases()
+
+    patches_index = PatchesIndex()
+
+    history = ReleaseHistory()
+
+    patches_history = PatchesHistory()
+
+    local_cache = LocalCache()
+
+    singleflight = SingleFlight()
+
+    def __init__(self) -> None:
+        self.tasks: list[asyncio.Task] = []
+        self.builders: dict[str, Callable[[], Awaitable[Any]]] = {
+            'tools': lambda: self.releases.get_latest_releases(config['app']['repositories']),
+            'patches': self.releases.get_patches_document,
+            'contributors': lambda: self.releases.get_contributors(config['app']['repositories'])
+        }
+        # The part of a built document that is served, the rest only goes to the hooks
+        self.payloads: dict[str, Callable[[Any], Any]] = {
+            'patches': lambda document: document['patches']
+        }
+        # Per-repository fragments that can be refreshed on their own
+        self.fragments: dict[str, Callable[[str], Awaitable[Any]]] = {
+            'tools': self.releases.get_release,
+            'contributors': self.releases.get_repository_contributors
+        }
+        self.mergers: dict[str, Callable[[Any, str, Any], Any]] = {
+            'tools': self.merge_tools,
+            'contributors': self.merge_contributors
+        }
+        # Response models the payloads are validated against at ingest
+        self.models: dict[str, type[BaseModel]] = {
+            'tools': ResponseModels.ToolsResponseModel,
+            'patches': ResponseModels.PatchesResponseModel,
+            'contributors': ResponseModels.ContributorsResponseModel
+        }
+        # Derived data rebuilt along with a resource's snapshot, from the payload and the built document
+        self.hooks: dict[str, list[Callable[[Any, Any], Awaitable[None]]]] = {
+            'tools': [lambda payload, document: self.history.record(payload)],
+            'patches': [lambda payload, document: self.patches_index.update(payload),
+                        lambda payload, document: self.patches_history.record(payload, document['sha'])]
+        }
+
+    @staticmethod
+    def merge_tools(snapshot: dict, repository: str, assets: list) -> dict:
+        """Replace a repository's assets in the /tools snapshot
+
+        Args:
+            snapshot (dict): Current snapshot
+            repository (str): Github's standard username/repository notation
+            assets (list): The repository's latest assets
+
+        Returns:
+            dict: The merged snapshot, in configured repository order
+        """
+
+        repositories: list[str] = config['app']['repositories']
+        tools: list[dict] = [asset for asset in snapshot['tools'] if asset['repository'] != repository] + assets
+        tools.sort(key=lambda asset: repositories.index(asset['repository'])
+                   if asset['repository'] in repositories else len(repositories))
+
+        return {'tools': tools}
+
+    @staticmethod
+    def merge_contributors(snapshot: dict, repository: str, entry: dict) -> dict:
+        """Replace a repository's entry in the /contributors snapshot
+
+        Args:
+            snapshot (dict): Current snapshot
+            repository (str): Github's standard username/repository notation
+            entry (dict): The repository's contributors
+
+        Returns:
+            dict: The merged snapshot
+        """
+
+        entries: list[dict] = snapshot['repositories']
+        names: list[str] = [existing['name'] for existing in entries]
+
+        if repository in names:
+            entries[names.index(repository)] = entry
+        else:
+            entries.append(entry)
+
+        return {'repositories': entries}
+
+    async def assemble_key(self, resource: str) -> str:
+        """Assemble the Redis key for a snapshot
+
+        Args:
+            resource (str): Name of the resource
+
+        Returns:
+            str: The Redis key
+        """
+
+        return f"snapshot:{resource}"
+
+    async def validate(self, resource: str, payload: Any) -> Any:
+        """Validate a freshly built payload against its response model
+
+        Args:
+            resource (str): Name of the resource
+            payload (Any): Freshly built payload
+
+        Raises:
+            pydantic.ValidationError: Raise if the payload doesn't fit the model
+
+        Returns:
+            Any: The payload as the model outputs it
+        """
+
+        model: BaseModel = self.models[resource].parse_obj(payload)
+        validated: dict = model.dict()
+
+        return validated['__root__'] if '__root__' in validated else validated
+
+    async def encode(self, payload: Any) -> dict[str, bytes | float]:
+        """Serialize and compress a payload into its snapshot fields
+
+        Args:
+            payload (Any): Freshly built payload
+
+        Returns:
+            dict[str, bytes | float]: The body, its compressed variants, its ETag and the update time
+        """
+
+        body: bytes = orjson.dumps(payload)
+        fields: dict[str, bytes | float] = {'payload': body, 'etag': HTTPCache.etag(body).encode(),
+                                            'updated_at': time.time()}
+
+        for encoding, compressed in (await Compression.compress(body)).items():
+            fields[f"payload:{encoding}"] = compressed
+
+        return fields
+
+    async def store(self, resource: str, payload: Any) -> None:
+        """Atomically replace the snapshot of a resource
+
+        Args:
+            resource (str): Name of the resource
+            payload (Any): Freshly built payload
+        """
+
+        key: str = await self.assemble_key(resource)
+        fields: dict[str, bytes | float] = await self.encode(payload)
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            # Drop variants the new body may not have
+            pipe.delete(key)
+            pipe.hset(key, mapping=fields)
+            await pipe.execute()
+
+        await self.local_cache.invalidate(key)
+
+    async def refresh(self, resource: str) -> Any:
+        """Rebuild a resource from GitHub and store it as the new snapshot
+
+        Args:
+            resource (str): Name of the resource
+
+        Returns:
+            Any: The freshly built payload
+        """
+
+        document: Any = await self.builders[resource]()
+        payload: Any = await self.validate(resource, self.payloads.get(resource, lambda document: document)(document))
+        await self.store(resource, payload)
+
+        for hook in self.hooks.get(resource, []):
+            await hook(payload, document)
+
+        logger.info(f"[Refresher] {resource} - Snapshot refreshed")
+
+        return payload
+
+    async def rebuild(self, resource: str) -> None:
+        """Build a missing snapshot, once for every worker and request waiting on it
+
+        The flight shares its lease with the scheduled refreshes, so a
+        request missing a snapshot waits for the refresh under way instead
+        of starting another one.
+
+        Args:
+            resource (str): Name of the resource
+        """
+
+        key: str = await self.assemble_key(resource)
+
+        async def build() -> None:
+            # The previous lease holder may have just stored it
+            if not await cast(Awaitable[bool], self.redis.hexists(key, 'payload')):
+                await self.refresh(resource)
+
+        # Followers read the snapshot itself, the flight's result is only a signal
+        await self.singleflight.run(f"refresh:{resource}", build)
+
+    async def refresh_fragment(self, resource: str, repository: str) -> Any:
+        """Rebuild a single repository's part of a resource and merge it into the snapshot
+
+        Args:
+            resource (str): Name of the resource
+            repository (str): Github's standard username/repository notation
+
+        Returns:
+            Any: The merged payload
+        """
+
+        fragment: Any = await self.fragments[resource](repository)
+        key: str = await self.assemble_key(resource)
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(key)
+                    current: bytes | None = await cast(Awaitable[bytes | None], pipe.hget(key, 'payload'))
+
+                    if current is None:
+                        await pipe.reset()
+                        return await self.refresh(resource)
+
+                    payload: Any = await self.validate(
+                        resource, self.mergers[resource](orjson.loads(current), repository, fragment)
+                        )
+                    fields: dict[str, bytes | float] = await self.encode(payload)
+
+                    pipe.multi()
+                    pipe.delete(key)
+                    pipe.hset(key, mapping=fields)
+                    await pipe.execute()
+                    break
+                except WatchError:
+                    # Someone swapped the snapshot in the meantime, merge into theirs
+                    continue
+
+        await self.local_cache.invalidate(key)
+
+        for hook in self.hooks.get(resource, []):
+            await hook(payload, payload)
+
+        logger.info(f"[Refresher] {resource} - {repository} fragment refreshed")
+
+        return payload
+
+    async def get(self, resource: str) -> Any:
+        """Get the last good snapshot of a resource
+
+        The snapshot is built inline only when none exists yet (e.g. on a cold
+        cache), once for every request missing it.
+
+        Args:
+            resource (str): Name of the resource
+
+        Returns:
+            Any: The snapshot payload
+        """
+
+        key: str = await self.assemble_key(resource)
+        payload: bytes | None = await cast(Awaitable[bytes | None], self.redis.hget(key, 'payload'))
+
+        if payload is None:
+            await self.rebuild(resource)
+            payload = await cast(Awaitable[bytes | None], self.redis.hget(key, 'payload'))
+
+        if payload is None:
+            raise RuntimeError(f"{resource} snapshot is missing right after being refreshed")
+
+        return orjson.loads(payload)
+
+    async def __headers(self, resource: str, etag: str, updated_at: bytes | None, encoding: str | None) -> dict[str, str]:
+        """Assemble the headers of a snapshot response
+
+        Args:
+            resource (str): Name of the resource
+            etag (str): ETag of the uncompressed snapshot
+            updated_at (bytes | None): When the snapshot was stored
+            encoding (str | None): Content encoding of the body, None for identity
+
+        Returns:
+            dict[str, str]: The response headers
+        """
+
+        age: float = max(time.time() - float(updated_at or 0), 0.0)
+        headers: dict[str, str] = HTTPCache.headers(HTTPCache.variant(etag, encoding))
+        headers.update({'Age': str(int(age)), 'Vary': "Accept-Encoding"})
+
+        if age > config['refresh']['intervals'][resource] * (1 + config['refresh']['jitter']):
+            headers['Warning'] = '110 - "Response is Stale"'
+
+        return headers
+
+    async def serve(self, resource: str, request: Request) -> Response:
+        """Answer with the last good snapshot of a resource, as it is stored
+
+        The body is sent in the best encoding the client accepts, or not at
+        all if the client's If-None-Match says it already has it. Hot
+        snapshots are answered from the worker's memory. A snapshot
+        that outlived its refresh interval means GitHub couldn't be reached
+        for a while, which is flagged with a 110 warning.
+
+        Args:
+            resource (str): Name of the resource
+            request (Request): Request being answered
+
+        Returns:
+            Response: The serialized snapshot, or a 304
+        """
+
+        key: str = await self.assemble_key(resource)
+        accepted: str | None = Compression.negotiate(request.headers.get('accept-encoding'))
+
+        async def read(field: str) -> tuple[bytes | None, bytes, bytes | None] | None:
+            body, etag, updated_at = await cast(Awaitable[list], self.redis.hmget(key, [field, 'etag', 'updated_at']))
+            # No snapshot yet, or one stored before ETags were
+            return None if etag is None else (body, etag, updated_at)
+
+        async def lookup() -> tuple[bytes, str, bytes | None, str | None] | None:
+            # Bodies too small to have been compressed only have the identity variant
+            for encoding in dict.fromkeys([accepted, None]):
+                field: str = 'payload' if encoding is None else f"payload:{encoding}"
+                entry: tuple[bytes | None, bytes, bytes | None] | None = await self.local_cache.load(
+                    f"{key}#{field}", lambda: read(field)
+                    )
+
+                if entry is None:
+                    return None
+
+                body, etag, updated_at = entry
+
+                if body is not None:
+                    return body, etag.decode(), updated_at, encoding
+
+            return None
+
+        found: tuple[bytes, str, bytes | None, str | None] | None = await lookup()
+
+        if found is None:
+            Metrics.lookup('snapshot', 'miss')
+            await self.rebuild(resource)
+            found = await lookup()
+
+        if found is None:
+            raise RuntimeError(f"{resource} snapshot is missing right after being refreshed")
+
+        body, etag, updated_at, encoding = found
+        # The same ETag on the 200 and the 304, for the variant actually sent
+        headers: dict[str, str] = await self.__headers(resource, etag, updated_at, encoding)
+
+        Metrics.lookup('snapshot', 'stale' if 'Warning' in headers else 'hit')
+
+        if HTTPCache.matches(request.headers.get('if-none-match'), etag):
+            return Response(status_code=304, headers=headers)
+
+        if encoding is not None:
+            headers['Content-Encoding'] = encoding
+
+        return Streaming.respond(body, headers)
+
+    async def is_stale(self, resource: str) -> bool:
+        """Check if the snapshot of a resource is due for a refresh
+
+        Args:
+            resource (str): Name of the resource
+
+        Returns:
+            bool: True if the snapshot is missing or older than its interval, False otherwise
+        """
+
+        interval: int = config['refresh']['intervals'][resource]
+        updated_at: bytes | None = await cast(Awaitable[bytes | None],
+                                              self.redis.hget(await self.assemble_key(resource), 'updated_at'))
+
+        if updated_at is None:
+            return True
+
+        return time.time() - float(updated_at) >= interval * (1 - config['refresh']['jitter'])
+
+    async def schedule(self, resource: str) -> None:
+        """Refresh a resource forever, on a jittered interval
+
+        Every worker runs this loop, but a short Redis lease makes sure that
+        only one of them rebuilds the snapshot in each interval. It's the
+        lease of rebuild()'s flight, which cold misses wait on.
+
+        Args:
+            resource (str): Name of the resource
+        """
+
+        interval: int = config['refresh']['intervals'][resource]
+        jitter: float = config['refresh']['jitter']
+
+        # Upstream requests made from here queue behind user-facing ones
+        RateLimitScheduler.priority.set(RateLimitScheduler.BACKGROUND)
+
+        lease: str = f"singleflight:lease:refresh:{resource}"
+
+        while True:
+            token: str = str(uuid.uuid4())
+
+            try:
+                if (await self.is_stale(resource) and
+                    await self.redis.set(lease, token, nx=True, ex=config['refresh']['lease'])):
+                    try:
+                        await self.refresh(resource)
+                    finally:
+                        # Only if it's still ours, a refresh that outlived the lease mustn't drop the next holder's
+                        await SingleFlight.release_lease(keys=[lease], args=[token])
+            except Exception as e:
+                # Keep serving the last good snapshot and try again on the next tick
+                logger.error(f"[Refresher] {resource} - Refresh failed with error: {e!r}")
+
+            await asyncio.sleep(interval * random.uniform(1 - jitter, 1 + jitter))
+
+    async def start(self) -> None:
+        """Start the refresh loops for every resource"""
+
+        for resource in self.builders:
+            self.tasks.append(asyncio.create_task(self.schedule(resource)))
+
+    async def stop(self) -> None:
+        """Cancel the refresh loops"""
+
+        for task in self.tasks:
+            task.cancel()
+
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks.clear()
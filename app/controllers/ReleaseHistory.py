@@ -0,0 +1,148 @@
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, cast
+
+import orjson
+from redis import asyncio as aioredis
+
+import app.utils.Logger as Logger
+from app.utils.HTTPCache import HTTPCache
+from app.utils.LocalCache import LocalCache
+from app.utils.RedisConnector import RedisConnector
+
+from app.dependencies import load_config
+
+config: dict = load_config()
+
+class ReleaseHistory:
+
+    """Implements a Redis backed history of every release seen in the /tools snapshots.
+
+    Each repository has a sorted set of its tags, scored by release time,
+    and every tag a record of its assets, pre-serialized along with its ETag.
+    Assets are often uploaded or replaced right after a release is published,
+    so a record follows the snapshots until its list of assets has been stable
+    for the settle window, counted from the release or from the last change.
+    Only a settled record is served as immutable, and a settled record whose
+    list of assets changes is unsettled again.
+    """
+
+    redis = RedisConnector.connect(config['history']['database'], decode_responses=False)
+
+    local_cache = LocalCache()
+
+    InternalCacheLogger = Logger.InternalCacheLogger()
+
+    async def assemble_key(self, repository: str, version: str | None = None) -> str:
+        """Assemble the Redis key of a repository's history, or of one of its releases
+
+        Args:
+            repository (str): Github's standard username/repository notation
+            version (str | None, optional): Release tag. Defaults to None, for the history.
+
+        Returns:
+            str: The Redis key
+        """
+
+        return f"history:{repository}" if version is None else f"history:{repository}:{version}"
+
+    async def record(self, snapshot: dict) -> None:
+        """Add the releases of a /tools snapshot to the history
+
+        Args:
+            snapshot (dict): Validated /tools payload
+        """
+
+        releases: dict[tuple[str, str], list[dict]] = {}
+
+        for asset in snapshot['tools']:
+            releases.setdefault((asset['repository'], asset['version']), []).append(asset)
+
+        now: float = time.time()
+        keys: list[str] = [await self.assemble_key(repository, version) for repository, version in releases]
+        written: list[str] = []
+
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.hmget(key, ['names', 'stable'])
+                recorded: list[list[bytes | None]] = await pipe.execute()
+
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key, (names, stable), ((repository, version), assets) in zip(keys, recorded, releases.items()):
+                    # Assets don't carry the release date, the earliest of them is the closest
+                    published: float = min(datetime.fromisoformat(asset['timestamp']).timestamp()
+                                           for asset in assets)
+                    current: bytes = orjson.dumps(sorted(asset['name'] for asset in assets))
+                    # The asset list has been stable since the release, or since it last changed
+                    since: float = published if names is None else float(stable or published)
+
+                    if names is not None and names != current:
+                        since = now
+
+                    if now - since < config['history']['settle'] or names != current:
+                        body: bytes = orjson.dumps({'tools': assets})
+                        pipe.hset(key, mapping={'body': body, 'etag': HTTPCache.etag(body), 'names': current,
+                                                'published': published, 'stable': since})
+                        written.append(key)
+
+                    pipe.zadd(await self.assemble_key(repository), {version: published}, nx=True)
+
+                await pipe.execute()
+        except aioredis.RedisError as e:
+            await self.InternalCacheLogger.log("HISTORY", e)
+            raise e
+
+        for key in written:
+            await self.local_cache.invalidate(key)
+
+    async def versions(self, repository: str, limit: int, before: float | None = None) -> dict:
+        """List the recorded releases of a repository, newest first
+
+        Args:
+            repository (str): Github's standard username/repository notation
+            limit (int): Maximum number of releases
+            before (float | None, optional): Only list releases older than this timestamp. Defaults to None.
+
+        Returns:
+            dict: The repository and its releases' tags and timestamps
+        """
+
+        releases: list[tuple[bytes, float]] = await self.redis.zrevrangebyscore(
+            await self.assemble_key(repository), f"({before}" if before is not None else "+inf", "-inf",
+            start=0, num=limit, withscores=True
+            )
+
+        return {'repository': repository,
+                'releases': [{'version': version.decode(),
+                              'timestamp': datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}
+                             for version, timestamp in releases]}
+
+    async def get(self, repository: str, version: str) -> tuple[bytes, str, bool] | None:
+        """Get a recorded release's assets
+
+        Args:
+            repository (str): Github's standard username/repository notation
+            version (str): Release tag
+
+        Returns:
+            tuple[bytes, str, bool] | None: The serialized assets, their ETag and whether they settled,
+            or None if the release wasn't seen
+        """
+
+        key: str = await self.assemble_key(repository, version)
+
+        async def read() -> tuple[bytes, bytes, float] | None:
+            body, etag, published, stable = await cast(Awaitable[list], self.redis.hmget(
+                key, ['body', 'etag', 'published', 'stable']
+                ))
+            return None if body is None or etag is None or published is None else (body, etag, float(stable or published))
+
+        entry: tuple[bytes, bytes, float] | None = await self.local_cache.load(key, read)
+
+        if entry is None:
+            return None
+
+        body, etag, stable = entry
+
+        return body, etag.decode(), time.time() - stable >= config['history']['settle']
@@ -1,11 +1,22 @@
 import asyncio
+from typing import Awaitable, cast
+import httpx
 import uvloop
 import orjson
-from base64 import b64decode
 from toolz.dicttoolz import keyfilter
 import asyncstdlib.builtins as a
+from loguru import logger
 from app.utils.HTTPXClient import HTTPXClient
+from app.utils.SingleFlight import SingleFlight
+from app.utils.CircuitBreaker import CircuitBreaker
+from app.utils.RedisConnector import RedisConnector
+from app.utils.Tracing import Tracing
 
+from app.dependencies import load_config
+
+config: dict = load_config()
+
+@Tracing.traced
 class Releases:
 
     """Implements the methods required to get the latest releases and patches from revanced repositories."""
@@ -14,18 +25,35 @@ class Releases:
 
     httpx_client = HTTPXClient.create()
 
+    singleflight = SingleFlight()
+
+    breaker = CircuitBreaker()
+
+    redis = RedisConnector.connect(config['upstream']['database'], decode_responses=False)
+
+    # The last patches.json seen by this worker, kept serialized so every caller parses its own copy
+    patches_json_sha: str | None = None
+    patches_json: bytes = b""
+
     async def __get_release(self, repository: str) -> list:
         """Get assets from latest release in a given repository.
 
         Args:
            repository (str): Github's standard username/repository notation
 
+        Raises:
+            httpx.HTTPStatusError: Raise if GitHub answers with an error other than 404
+
         Returns:
            dict: dictionary of filename and download url
         """
 
         assets: list = []
-        response = await self.httpx_client.get(f"https://api.github.com/repos/{repository}/releases/latest")
+        response = await self.httpx_client.get(f"{config['github']['api_url']}/repos/{repository}/releases/latest")
+
+        if response.status_code != 404:
+            # Don't mistake an outage or a spent rate limit for a repository without releases
+            response.raise_for_status()
 
         if response.status_code == 200:
             release_assets: dict = response.json()['assets']
@@ -57,8 +85,90 @@ class Releases:
 
         return assets
 
+    async def __get_latest_releases_graphql(self, repositories: list) -> list:
+        """Get assets from the latest release of every repository in a single GraphQL query.
+
+        Args:
+           repositories (list): List of repositories in Github's standard username/repository notation
+
+        Raises:
+            httpx.HTTPStatusError: Raise if the GraphQL API answers with an error status
+            ValueError: Raise if the GraphQL API answers with errors in the payload
+
+        Returns:
+           list: list of dictionaries of filename and download url, in the same shape as __get_release()
+        """
+
+        variables: dict[str, str] = {}
+        fields: list[str] = []
+
+        for index, repository in enumerate(repositories):
+            variables[f"owner{index}"], variables[f"name{index}"] = repository.split('/')
+            fields.append(
+                f"r{index}: repository(owner: $owner{index}, name: $name{index}) {{ "
+                "latestRelease { tagName publishedAt "
+                "releaseAssets(first: 100) { nodes { name size contentType downloadUrl updatedAt } } } }"
+            )
+
+        parameters: str = ", ".join(f"${variable}: String!" for variable in variables)
+        query: str = f"query({parameters}) {{ {' '.join(fields)} }}"
+
+        response = await self.httpx_client.post(config['github']['graphql_url'],
+                                                json={'query': query, 'variables': variables})
+
+        response.raise_for_status()
+
+        if response.json().get('errors'):
+            raise ValueError(f"GraphQL query failed: {response.json()['errors']}")
+
+        data: dict = response.json()['data']
+        assets: list = []
+
+        for index, repository in enumerate(repositories):
+            release: dict | None = (data[f"r{index}"] or {}).get('latestRelease')
+
+            if release is None:
+                continue
+
+            release_version: str = release['tagName']
+            release_assets: list = release['releaseAssets']['nodes']
+
+            if release_assets:
+                assets.extend({'repository': repository,
+                               'version': release_version,
+                               'timestamp': asset['updatedAt'],
+                               'name': asset['name'],
+                               'size': asset['size'],
+                               'browser_download_url': asset['downloadUrl'],
+                               'content_type': asset['contentType']
+                               } for asset in release_assets)
+            else:
+                assets.append({'repository': repository,
+                               'version': release_version,
+                               'timestamp': release['publishedAt'],
+                               'name': f"{repository.split('/')[1]}-{release_version}.tar.gz",
+                               'browser_download_url': f"{config['github']['api_url']}/repos/{repository}/tarball/{release_version}",
+                               'content_type': 'application/gzip'
+                               })
+
+        return assets
+
+    async def get_release(self, repository: str) -> list:
+        """Get assets from latest release in a given repository, once at a time.
+
+        Args:
+           repository (str): Github's standard username/repository notation
+
+        Returns:
+           list: list of dictionaries of filename and download url
+        """
+
+        return await self.singleflight.run(
+            f"release:{repository}", lambda: self.breaker.call('releases', lambda: self.__get_release(repository))
+            )
+
     async def get_latest_releases(self, repositories: list) -> dict:
-        """Runs get_release() asynchronously for each repository.
+        """Runs get_release() asynchronously for each repository, or a single GraphQL query for all of them.
 
         Args:
             repositories (list): List of repositories in Github's standard username/repository notation
@@ -67,27 +177,119 @@ class Releases:
             dict: A dictionary containing assets from each repository
         """
 
-        releases: dict[str, list] = {}
-        releases['tools'] = []
+        async def fetch() -> dict:
+            releases: dict[str, list] = {}
+            releases['tools'] = []
+
+            if config['github']['engine'] == 'graphql':
+                try:
+                    releases['tools'] = await self.breaker.call(
+                        'graphql', lambda: self.__get_latest_releases_graphql(repositories)
+                        )
+                    return releases
+                except Exception as e:
+                    # The REST API is always there to fall back on
+                    logger.warning(f"[Releases] GraphQL engine failed, falling back to REST: {e!r}")
 
-        results: list = await asyncio.gather(*[self.__get_release(repository) for repository in repositories])
+            results: list = await self.breaker.call('releases', lambda: asyncio.gather(
+                *[self.__get_release(repository) for repository in repositories]
+                ))
 
-        releases['tools'] = [asset for result in results for asset in result]
+            releases['tools'] = [asset for result in results for asset in result]
 
-        return releases
+            return releases
+
+        return await self.singleflight.run(f"releases:{','.join(repositories)}", fetch)
+
+    async def __get_patches_json_sha(self) -> str:
+        """Get the blob SHA of patches.json from its directory listing.
+
+        The listing is tiny and revalidated through the upstream cache, so
+        this is a cheap way to tell if patches.json changed.
+
+        Raises:
+            httpx.HTTPStatusError: Raise if the directory listing couldn't be retrieved
+            ValueError: Raise if the directory listing doesn't have patches.json
+
+        Returns:
+           str: blob SHA of patches.json
+        """
+
+        directory, _, filename = config['patches']['path'].rpartition('/')
+
+        response = await self.httpx_client.get(
+            f"{config['github']['api_url']}/repos/{config['patches']['repository']}/contents/{directory}"
+        )
+
+        response.raise_for_status()
+
+        for entry in orjson.loads(response.content):
+            if entry['name'] == filename:
+                return entry['sha']
+
+        raise ValueError("patches.json not found")
 
     async def __get_patches_json(self) -> dict:
-        """Get revanced-patches repository's README.md.
+        """Get revanced-patches repository's patches.json, along with its blob SHA.
+
+        The file is downloaded as a raw blob, streamed into a single buffer and
+        parsed once. Nothing is downloaded if its blob SHA didn't change.
+
+        Raises:
+            httpx.HTTPStatusError: Raise if the blob couldn't be retrieved
 
         Returns:
-           dict: JSON content
+           dict: The blob SHA and the JSON content, a copy the caller is free to change
         """
 
-        response = await self.httpx_client.get(f"https://api.github.com/repos/revanced/revanced-patches/contents/patches.json")
-        content = orjson.loads(
-            b64decode(response.json()['content']).decode('utf-8'))
+        sha: str = await self.__get_patches_json_sha()
+
+        if sha == self.patches_json_sha:
+            return {'sha': sha, 'patches': orjson.loads(self.patches_json)}
+
+        stored: list[bytes | None] = await cast(Awaitable[list], self.redis.hmget("patches", ["sha", "body"]))
+
+        if stored[0] is not None and stored[0].decode() == sha and stored[1] is not None:
+            body: bytes = stored[1]
+        else:
+            buffer: bytearray = bytearray()
+
+            async with self.httpx_client.stream(
+                'GET', f"{config['github']['api_url']}/repos/{config['patches']['repository']}/git/blobs/{sha}",
+                headers={'Accept': "application/vnd.github.raw"},
+                extensions={'upstream_cache': False}
+                ) as response:
+                response.raise_for_status()
+
+                async for chunk in response.aiter_bytes():
+                    buffer.extend(chunk)
 
-        return content
+            # Converted once, the same bytes are stored, parsed and kept
+            body = bytes(buffer)
+            del buffer
+
+            await cast(Awaitable[int], self.redis.hset("patches", mapping={'sha': sha, 'body': body}))
+
+        content: dict = orjson.loads(body)
+
+        Releases.patches_json_sha, Releases.patches_json = sha, body
+
+        return {'sha': sha, 'patches': content}
+
+    async def get_patches_document(self) -> dict:
+        """Get patches.json from revanced-patches repository, along with its blob SHA.
+
+        The SHA comes with the content it belongs to, wherever the flight was fetched.
+
+        Returns:
+            dict: The blob SHA of patches.json and the patches available for a given app
+        """
+
+        document: dict = await self.singleflight.run(
+            "patches", lambda: self.breaker.call('patches', self.__get_patches_json)
+            )
+
+        return document
 
     async def get_patches_json(self) -> dict:
         """Get patches.json from revanced-patches repository.
@@ -96,112 +298,119 @@ class Releases:
             dict: Patches available for a given app
         """
 
-        patches: dict = await self.__get_patches_json()
+        return (await self.get_patches_document())['patches']
 
-        return patches
+    async def __get_contributors_page(self, url: str) -> tuple[list, dict]:
+        """Get a single page of contributors from a given repository.
 
-    async def __get_contributors(self, repository: str) -> list:
-        """Get contributors from a given repository.
+        Each contributor is filtered as soon as the page is parsed, so only the
+        kept fields outlive the raw page.
 
         Args:
-           repository (str): Github's standard username/repository notation
+           url (str): URL of the contributors page
+
+        Raises:
+            httpx.HTTPStatusError: Raise if GitHub answers with an error, a missing page would truncate the list
 
         Returns:
-           list: a list of dictionaries containing the repository's contributors
+           tuple[list, dict]: the page's filtered contributors and its parsed Link header
         """
 
         keep: set = {'login', 'avatar_url', 'html_url', 'contributions'}
 
-        response = await self.httpx_client.get(f"https://api.github.com/repos/{repository}/contributors")
+        response = await self.httpx_client.get(url)
+
+        if response.status_code == 204:
+            # An empty repository has no contributors
+            return [], {}
+
+        # Better to keep the last good snapshot than to store a truncated one
+        response.raise_for_status()
 
         # Looping over each contributor, filtering each contributor so that
         # keyfilter() returns a dictionary with only the key-value pairs that are in the "keep" set.
-        contributors: list = [keyfilter(lambda k: k in keep, contributor) for contributor in response.json()]
+        contributors: list = [keyfilter(lambda k: k in keep, contributor) for contributor in orjson.loads(response.content)]
 
-        return contributors
+        return contributors, response.links
 
-    async def get_contributors(self, repositories: list) -> dict:
-        """Runs get_contributors() asynchronously for each repository.
+    async def __get_contributors(self, repository: str) -> list:
+        """Get contributors from a given repository, following every page.
+
+        The first page's Link header tells how many pages there are, the rest
+        are fetched concurrently. Pages are cached by their own ETag, so a
+        refresh only downloads the pages that changed.
 
         Args:
-            repositories (list): List of repositories in Github's standard username/repository notation
+           repository (str): Github's standard username/repository notation
 
         Returns:
-            dict: A dictionary containing the contributors from each repository
+           list: a list of dictionaries containing the repository's contributors
         """
 
-        contributors: dict[str, list]
+        url: str = f"{config['github']['api_url']}/repos/{repository}/contributors?per_page={config['github']['per_page']}"
 
-        contributors = {}
-        contributors['repositories'] = []
+        contributors, links = await self.__get_contributors_page(url)
 
-        revanced_repositories = [
-            repository for repository in repositories if 'revanced' in repository]
+        if 'last' in links:
+            last_page: int = int(httpx.URL(links['last']['url']).params['page'])
+            semaphore = asyncio.Semaphore(config['github']['concurrency'])
 
-        results: list[dict] = await asyncio.gather(*[self.__get_contributors(repository) for repository in revanced_repositories])
+            async def get_page(page: int) -> list:
+                async with semaphore:
+                    page_contributors, _ = await self.__get_contributors_page(f"{url}&page={page}")
+                    return page_contributors
 
-        async for key, value in a.zip(revanced_repositories, results):
-            data = {'name': key, 'contributors': value}
-            contributors['repositories'].append(data)
+            pages: list[list] = await asyncio.gather(*[get_page(page) for page in range(2, last_page + 1)])
+
+            for page_contributors in pages:
+                contributors.extend(page_contributors)
 
         return contributors
 
-    async def get_commits(self, org: str, repository: str, path: str) -> dict:
-        """Get commit history from a given repository.
+    async def get_repository_contributors(self, repository: str) -> dict:
+        """Get contributors from a given repository, once at a time.
 
         Args:
-            org (str): Username of the organization | valid values: revanced or vancedapp
-            repository (str): Repository name
-            path (str): Path to the file
-            per_page (int): Number of commits to return
-            since (str): ISO 8601 timestamp
+           repository (str): Github's standard username/repository notation
 
-        Raises:
-            Exception: Raise a generic exception if the organization is not revanced or vancedapp
+        Returns:
+           dict: the repository's entry in get_contributors()
+        """
+
+        contributors: list = await self.singleflight.run(
+            f"contributors:{repository}",
+            lambda: self.breaker.call('contributors', lambda: self.__get_contributors(repository))
+            )
+
+        return {'name': repository, 'contributors': contributors}
+
+    async def get_contributors(self, repositories: list) -> dict:
+        """Runs get_contributors() asynchronously for each repository.
+
+        Args:
+            repositories (list): List of repositories in Github's standard username/repository notation
 
         Returns:
-            dict: a dictionary containing the repository's latest commits
+            dict: A dictionary containing the contributors from each repository
         """
 
-        payload: dict = {}
-        payload["repository"] = f"{org}/{repository}"
-        payload["path"] = path
-        payload["commits"] = []
+        async def fetch() -> dict:
+            contributors: dict[str, list]
 
-        if org == 'revanced' or org == 'vancedapp':
-            _releases = await self.httpx_client.get(
-                f"https://api.github.com/repos/{org}/{repository}/releases?per_page=2"
-            )
+            contributors = {}
+            contributors['repositories'] = []
 
-            if _releases.status_code == 200:
-                releases = _releases.json()
-                if any(releases):
-                    since = releases[1]['created_at']
-                    until = releases[0]['created_at']
-                else:
-                    raise ValueError("No releases found")
-
-                _response = await self.httpx_client.get(
-                    f"https://api.github.com/repos/{org}/{repository}/commits?path={path}&since={since}&until={until}"
-                )
-                
-                if _response.status_code == 200:
-                    response = _response.json()
-
-                    async def get_commit_data(commit: dict) -> dict:
-                        return {'sha': commit['sha'],
-                                'author': commit['commit']['author']['name'],
-                                'date': commit['commit']['author']['date'],
-                                'message': commit['commit']['message'],
-                                'url': commit['html_url']
-                                }
-                        
-                    data: list = await asyncio.gather(*[get_commit_data(commit) for commit in response])
-                    
-                    payload['commits'].append(data)
-                else:
-                    raise ValueError("Error retrieving commits")
-        else:
-            raise ValueError("Invalid organization.")
-    
-        return payload
+            revanced_repositories = [
+                repository for repository in repositories if 'revanced' in repository]
+
+            results: list[dict] = await self.breaker.call('contributors', lambda: asyncio.gather(
+                *[self.__get_contributors(repository) for repository in revanced_repositories]
+                ))
+
+            async for key, value in a.zip(revanced_repositories, results):
+                data = {'name': key, 'contributors': value}
+                contributors['repositories'].append(data)
+
+            return contributors
+
+        return await self.singleflight.run(f"contributors:{','.join(repositories)}", fetch)
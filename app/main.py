@@ -1,30 +1,30 @@
 #!/usr/bin/env python3
 
-import os
-
 import binascii
-from redis import Redis
 
 from fastapi import FastAPI, Request, status
-from fastapi.responses import JSONResponse, UJSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 
-from slowapi.util import get_remote_address
-from slowapi.middleware import SlowAPIMiddleware
-from slowapi import Limiter, _rate_limit_exceeded_handler
 from fastapi.middleware.cors import CORSMiddleware
 
 from fastapi_cache import FastAPICache
 from fastapi_cache.decorator import cache
-from slowapi.errors import RateLimitExceeded
-from fastapi_cache.backends.redis import RedisBackend
 
 from fastapi_paseto_auth import AuthPASETO
 from fastapi_paseto_auth.exceptions import AuthPASETOException
 
 import app.controllers.Auth as Auth
 from app.controllers.Clients import Clients
-
+from app.controllers.Refresher import Refresher
+
+from app.utils.LocalCache import LocalCache
+from app.utils.Denylist import Denylist, DenylistNotLoadedError
+from app.utils.RateLimiter import RateLimiter, RateLimitMiddleware
+from app.utils.Metrics import Metrics, MetricsMiddleware
+from app.utils.Tracing import Tracing, TracingMiddleware
+from app.utils.CacheBackend import TwoTierBackend
 from app.utils.RedisConnector import RedisConnector
+from app.utils.CircuitBreaker import CircuitOpenError
 
 import app.models.GeneralErrors as GeneralErrors
 
@@ -35,6 +35,8 @@ from app.routers import patches
 from app.routers import socials
 from app.routers import changelogs
 from app.routers import contributors
+from app.routers import webhooks
+from app.routers import metrics
 
 #from app.routers import auth
 #from app.routers import clients
@@ -49,6 +51,14 @@ from app.dependencies import load_config
 
 config: dict = load_config()
 
+# Setup background refresher
+
+refresher = Refresher()
+
+local_cache = LocalCache()
+
+rate_limiter = RateLimiter()
+
 # Setup CORS config
 
 allow_origins: list[str] = ['*']
@@ -64,7 +74,7 @@ app = FastAPI(title=config['docs']['title'],
               license_info={"name": config['license']['name'],
                             "url": config['license']['url']
                             },
-              default_response_class=UJSONResponse
+              default_response_class=ORJSONResponse
               )
 
 # Hook up CORS middleware
@@ -78,16 +88,17 @@ app.add_middleware(
 )
 
 # Hook up rate limiter
-limiter = Limiter(key_func=get_remote_address,
-                  default_limits=[
-                      config['slowapi']['limit']
-                      ],
-                  headers_enabled=True,
-                  storage_uri=f"redis://{os.environ['REDIS_URL']}:{os.environ['REDIS_PORT']}/{config['slowapi']['database']}"
-                  )
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-app.add_middleware(SlowAPIMiddleware)
+
+app.add_middleware(RateLimitMiddleware)
+
+# Hook up metrics, outermost so the whole request is timed
+
+app.add_middleware(MetricsMiddleware)
+
+# Hook up tracing, only when it's enabled
+
+if Tracing.enabled:
+    app.add_middleware(TracingMiddleware)
 
 # Setup routes
 
@@ -98,12 +109,18 @@ app.include_router(contributors.router)
 app.include_router(changelogs.router)
 app.include_router(socials.router)
 app.include_router(ping.router)
+app.include_router(webhooks.router)
+app.include_router(metrics.router)
 
 #app.include_router(auth.router)
 #app.include_router(clients.router)
 #app.include_router(announcement.router)
 #app.include_router(mirrors.router)
 
+# Trace the route handlers, once they're all included
+
+Tracing.trace_routes(app)
+
 # Setup cache
 
 @cache()
@@ -128,12 +145,9 @@ def get_config() -> Auth.PasetoSettings:
 
 @AuthPASETO.token_in_denylist_loader
 def check_if_token_in_denylist(decrypted_token):
-    redis = Redis(host=os.environ['REDIS_URL'],
-              port=os.environ['REDIS_PORT'],
-              db=config['tokens']['database'],
-              decode_responses=True)
-    
-    return redis.exists(decrypted_token["jti"])
+    # Answered from the worker's copy of the denylist, the loader can't await Redis.
+    # Raises DenylistNotLoadedError until the copy is loaded
+    return Denylist.contains(decrypted_token["jti"])
 
 # Setup custom error handlers
 
@@ -181,13 +195,75 @@ async def invalid_token_exception_handler(request, exc) -> JSONResponse:
         "message": GeneralErrors.Unauthorized().message
         })
 
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_exception_handler(request: Request, exc: CircuitOpenError) -> JSONResponse:
+    """Handle CircuitOpenError, raised when GitHub is down and nothing is cached
+
+    Args:
+        request (Request): Request
+        exc (CircuitOpenError): Exception
+
+    Returns:
+        JSONResponse: Response
+    """
+    return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={
+        "error": GeneralErrors.UpstreamUnavailable().error,
+        "message": GeneralErrors.UpstreamUnavailable().message
+        }, headers={"Retry-After": str(config['breaker']['reset_timeout'])})
+
+@app.exception_handler(DenylistNotLoadedError)
+async def denylist_not_loaded_exception_handler(request: Request, exc: DenylistNotLoadedError) -> JSONResponse:
+    """Handle DenylistNotLoadedError, raised when tokens can't be checked yet
+
+    Args:
+        request (Request): Request
+        exc (DenylistNotLoadedError): Exception
+
+    Returns:
+        JSONResponse: Response
+    """
+    return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={
+        "error": GeneralErrors.DenylistNotLoaded().error,
+        "message": GeneralErrors.DenylistNotLoaded().message
+        }, headers={"Retry-After": "1"})
+
 @app.on_event("startup")
 async def startup() -> None:
     """Startup event handler"""
     
     # clients = Clients()
     # await clients.setup_admin()
-    FastAPICache.init(RedisBackend(RedisConnector.connect(config['cache']['database'])),
+    FastAPICache.init(TwoTierBackend(RedisConnector.connect(config['cache']['database'])),
                       prefix="fastapi-cache")
     
+    await refresher.start()
+    
+    await local_cache.start()
+    
+    await Denylist.start()
+    
+    await Metrics.start()
+    
+    await rate_limiter.start()
+    
+    Tracing.start()
+    
+    return None
+
+@app.on_event("shutdown")
+async def shutdown() -> None:
+    """Shutdown event handler"""
+    
+    await refresher.stop()
+    
+    await local_cache.stop()
+    
+    await Denylist.stop()
+    
+    await Metrics.stop()
+    
+    await rate_limiter.stop()
+    
+    Tracing.stop()
+    
     return None
@@ -40,6 +40,16 @@ class IdNotProvided(BaseModel):
     error: str = "Bad Request"
     message: str = "Missing client id"
     
+class InvalidWebhookPayload(BaseModel):
+    """Implements the response fields for when a webhook payload is not a JSON object.
+
+    Args:
+        BaseModel (pydantic.BaseModel): BaseModel from pydantic
+    """
+    
+    error: str = "Bad Request"
+    message: str = "The webhook payload must be a JSON object. Please set the webhook's content type to application/json."
+
 class Unauthorized(BaseModel):
     """Implements the response fields for when the client is unauthorized.
 
@@ -50,6 +60,36 @@ class Unauthorized(BaseModel):
     error: str = "Unauthorized"
     message: str = "The client is unauthorized to access this resource"
     
+class PackageNotProvided(BaseModel):
+    """Implements the response fields for when a version is given without a package.
+
+    Args:
+        BaseModel (pydantic.BaseModel): BaseModel from pydantic
+    """
+    
+    error: str = "Unprocessable Entity"
+    message: str = "A version can only be given along with a package."
+
+class ReleaseNotFound(BaseModel):
+    """Implements the response fields for when a release was never seen.
+
+    Args:
+        BaseModel (pydantic.BaseModel): BaseModel from pydantic
+    """
+    
+    error: str = "Not Found"
+    message: str = "No release was recorded for the repository and version provided."
+
+class PatchesVersionNotFound(BaseModel):
+    """Implements the response fields for when a patches.json version is unknown or too old to diff.
+
+    Args:
+        BaseModel (pydantic.BaseModel): BaseModel from pydantic
+    """
+    
+    error: str = "Not Found"
+    message: str = "No diff is available from the patches.json version provided. Please download /patches again."
+
 class MirrorNotFoundError(BaseModel):
     """Implements the response fields for when a mirror is not found.
 
@@ -69,3 +109,23 @@ class MirrorAlreadyExistsError(BaseModel):
     
     error: str = "Conflict"
     message: str = "A mirror already exists for the organization, repository, and version provided. Please use the PUT method to update the mirror."
+
+class UpstreamUnavailable(BaseModel):
+    """Implements the response fields for when GitHub can't be reached and nothing is cached.
+
+    Args:
+        BaseModel (pydantic.BaseModel): BaseModel from pydantic
+    """
+    
+    error: str = "Service Unavailable"
+    message: str = "GitHub is currently unreachable and no cached copy is available. Please try again later."
+
+class DenylistNotLoaded(BaseModel):
+    """Implements the response fields for when tokens can't be checked against the denylist yet.
+
+    Args:
+        BaseModel (pydantic.BaseModel): BaseModel from pydantic
+    """
+    
+    error: str = "Service Unavailable"
+    message: str = "The token denylist is still loading. Please try again shortly."
@@ -75,3 +75,12 @@ class ChangelogsResponseFields(BaseModel):
     author: str
     message: str
     html_url: str
+
+class ReleaseHistoryResponseFields(BaseModel):
+    """Implements the fields for each release in the /tools/history endpoint.
+    
+    Args:
+        BaseModel (pydantic.BaseModel): BaseModel from pydantic
+    """
+    version: str
+    timestamp: str
@@ -12,6 +12,16 @@ class ToolsResponseModel(BaseModel):
     
     tools: list[ ResponseFields.ToolsResponseFields ]
 
+class ReleaseHistoryResponseModel(BaseModel):
+    """Implements the JSON response model for the /tools/history endpoint.
+
+    Args:
+        BaseModel (pydantic.BaseModel): BaseModel from pydantic
+    """
+    
+    repository: str
+    releases: list[ ResponseFields.ReleaseHistoryResponseFields ]
+
 class PatchesResponseModel(BaseModel):
     """Implements the JSON response model for the /patches endpoint.
 
@@ -21,6 +31,19 @@ class PatchesResponseModel(BaseModel):
     
     __root__: list[ ResponseFields.PatchesResponseFields ]
     
+class PatchesDiffResponseModel(BaseModel):
+    """Implements the JSON response model for the /patches/diff endpoint.
+
+    Args:
+        BaseModel (pydantic.BaseModel): BaseModel from pydantic
+    """
+    
+    since: str
+    until: str
+    added: list[ ResponseFields.PatchesResponseFields ]
+    removed: list[ str ]
+    changed: list[ ResponseFields.PatchesResponseFields ]
+    
 class ContributorsResponseModel(BaseModel):
     """Implements the JSON response model for the /contributors endpoint.
 
@@ -116,3 +139,13 @@ class SocialsResponseModel(BaseModel):
     """
     
     __root__: dict[ str, str ]
+
+class WebhookResponseModel(BaseModel):
+    """Implements the response fields for received GitHub webhooks.
+
+    Args:
+        BaseModel (pydantic.BaseModel): BaseModel from pydantic
+    """
+    
+    event: str
+    refreshing: list[ str ]
@@ -1,12 +1,12 @@
 from fastapi import APIRouter, Request, Response
 from fastapi_cache.decorator import cache
 from app.dependencies import load_config
-from app.controllers.Releases import Releases
+from app.controllers.Commits import Commits
 import app.models.ResponseModels as ResponseModels
 
 router = APIRouter()
 
-releases = Releases()
+commits = Commits()
 
 config: dict = load_config()
 
@@ -18,8 +18,13 @@ async def changelogs(request: Request, response: Response, org: str, repo: str,
     Returns:
         json: list of commits
     """
-    return await releases.get_commits(
+    changes: dict = await commits.get(
         org=org,
         repository=repo,
         path=path
         )
+    
+    if await commits.is_stale(org, repo):
+        response.headers['Warning'] = '110 - "Response is Stale"'
+    
+    return changes
@@ -1,21 +1,19 @@
 from fastapi import APIRouter, Request, Response
-from fastapi_cache.decorator import cache
 from app.dependencies import load_config
-from app.controllers.Releases import Releases
+from app.controllers.Refresher import Refresher
 import app.models.ResponseModels as ResponseModels
 
 router = APIRouter()
 
-releases = Releases()
+refresher = Refresher()
 
 config: dict = load_config()
 
 @router.get('/contributors', response_model=ResponseModels.ContributorsResponseModel, tags=['ReVanced Tools'])
-@cache(config['cache']['expire'])
-async def contributors(request: Request, response: Response) -> dict:
+async def contributors(request: Request, response: Response) -> Response:
     """Get contributors.
 
     Returns:
         json: list of contributors
     """
-    return await releases.get_contributors(config['app']['repositories'])
+    return await refresher.serve('contributors', request)
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Request, Response
+from starlette.concurrency import run_in_threadpool
+
+from app.utils.Metrics import Metrics
+
+router = APIRouter()
+
+@router.get('/metrics', include_in_schema=False)
+async def metrics(request: Request) -> Response:
+    """Get the Prometheus metrics of every worker.
+
+    Returns:
+        Response: Metrics in the Prometheus text format
+    """
+    # Adding up the workers' files is blocking I/O
+    body, content_type = await run_in_threadpool(Metrics.render)
+
+    return Response(content=body, media_type=content_type)
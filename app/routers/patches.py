@@ -1,22 +1,83 @@
-from fastapi import APIRouter, Request, Response
-from fastapi_cache.decorator import cache
+from fastapi import APIRouter, Request, Response, HTTPException, status
 from app.dependencies import load_config
-from app.controllers.Releases import Releases
+from app.controllers.Refresher import Refresher
+from app.controllers.PatchesIndex import PatchesIndex
+from app.controllers.PatchesHistory import PatchesHistory
+from app.utils.HTTPCache import HTTPCache
+from app.utils.Streaming import Streaming
 import app.models.ResponseModels as ResponseModels
+import app.models.GeneralErrors as GeneralErrors
 
 router = APIRouter()
 
-releases = Releases()
+refresher = Refresher()
+
+patches_index = PatchesIndex()
+
+patches_history = PatchesHistory()
 
 config: dict = load_config()
 
 @router.get('/patches', response_model=ResponseModels.PatchesResponseModel, tags=['ReVanced Tools'])
-@cache(config['cache']['expire'])
-async def patches(request: Request, response: Response) -> dict:
-    """Get latest patches.
+async def patches(request: Request, response: Response, package: str | None = None, version: str | None = None) -> Response:
+    """Get latest patches, optionally only the ones compatible with a package and version.
 
     Returns:
         json: list of latest patches
     """
     
-    return await releases.get_patches_json()
+    if package is None:
+        if version is not None:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail={
+                "error": GeneralErrors.PackageNotProvided().error,
+                "message": GeneralErrors.PackageNotProvided().message
+                }
+                                )
+        
+        return await refresher.serve('patches', request)
+    
+    bucket: tuple[bytes, str] | None = await patches_index.get(package, version)
+    
+    if bucket is None:
+        await patches_index.ensure(lambda: refresher.get('patches'))
+        bucket = await patches_index.get(package, version)
+    
+    if bucket is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail={
+            "error": GeneralErrors.UpstreamUnavailable().error,
+            "message": GeneralErrors.UpstreamUnavailable().message
+            }
+                            )
+    
+    body, etag = bucket
+    
+    if HTTPCache.matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=HTTPCache.headers(etag))
+    
+    # Buckets are serialized when the index is built, so send them as they are
+    return Streaming.respond(body, HTTPCache.headers(etag))
+
+@router.get('/patches/diff', response_model=ResponseModels.PatchesDiffResponseModel, tags=['ReVanced Tools'])
+async def patches_diff(request: Request, response: Response, since: str) -> Response:
+    """Get the patches added, removed and changed since a previous version of the patches.
+
+    Returns:
+        json: changes between the given version, the ETag of /patches or the blob SHA of patches.json, and the latest one
+    """
+    
+    diff: tuple[bytes, str] | None = await patches_history.get(since)
+    
+    if diff is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail={
+            "error": GeneralErrors.PatchesVersionNotFound().error,
+            "message": GeneralErrors.PatchesVersionNotFound().message
+            }
+                            )
+    
+    body, etag = diff
+    
+    if HTTPCache.matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=HTTPCache.headers(etag))
+    
+    # Diffs are serialized when patches.json is refreshed, so send them as they are
+    return Streaming.respond(body, HTTPCache.headers(etag))
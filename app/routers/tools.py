@@ -1,21 +1,69 @@
-from fastapi import APIRouter, Request, Response
-from fastapi_cache.decorator import cache
+from datetime import datetime, timezone
+from fastapi import APIRouter, Request, Response, HTTPException, Query, status
 from app.dependencies import load_config
-from app.controllers.Releases import Releases
+from app.controllers.Refresher import Refresher
+from app.controllers.ReleaseHistory import ReleaseHistory
+from app.utils.HTTPCache import HTTPCache
+from app.utils.Streaming import Streaming
 import app.models.ResponseModels as ResponseModels
+import app.models.GeneralErrors as GeneralErrors
 
 router = APIRouter()
 
-releases = Releases()
+refresher = Refresher()
+
+history = ReleaseHistory()
 
 config: dict = load_config()
 
 @router.get('/tools', response_model=ResponseModels.ToolsResponseModel, tags=['ReVanced Tools'])
-@cache(config['cache']['expire'])
-async def tools(request: Request, response: Response) -> dict:
+async def tools(request: Request, response: Response) -> Response:
     """Get patching tools' latest version.
 
     Returns:
         json: information about the patching tools' latest version
     """
-    return await releases.get_latest_releases(config['app']['repositories'])
+    return await refresher.serve('tools', request)
+
+@router.get('/tools/history/{org}/{repo}', response_model=ResponseModels.ReleaseHistoryResponseModel, tags=['ReVanced Tools'])
+async def tools_history(request: Request, response: Response, org: str, repo: str,
+                        limit: int | None = Query(None, ge=1), before: datetime | None = None) -> dict:
+    """Get the releases of a patching tool seen so far, newest first.
+
+    Returns:
+        json: versions and release dates of the patching tool
+    """
+    
+    if before is not None and before.tzinfo is None:
+        # Release dates are in UTC
+        before = before.replace(tzinfo=timezone.utc)
+    
+    return await history.versions(f"{org}/{repo}", min(limit or config['history']['limit'], config['history']['limit']),
+                                  before.timestamp() if before is not None else None)
+
+@router.get('/tools/history/{org}/{repo}/{version}', response_model=ResponseModels.ToolsResponseModel, tags=['ReVanced Tools'])
+async def tools_release(request: Request, response: Response, org: str, repo: str, version: str) -> Response:
+    """Get the assets of a past release of a patching tool.
+
+    Returns:
+        json: information about the patching tool's release
+    """
+    
+    release: tuple[bytes, str, bool] | None = await history.get(f"{org}/{repo}", version)
+    
+    if release is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail={
+            "error": GeneralErrors.ReleaseNotFound().error,
+            "message": GeneralErrors.ReleaseNotFound().message
+            }
+                            )
+    
+    body, etag, settled = release
+    # Settled releases never change
+    headers: dict[str, str] = ({'ETag': etag, 'Cache-Control': f"public, max-age={config['history']['max_age']}, immutable"}
+                               if settled else HTTPCache.headers(etag))
+    
+    if HTTPCache.matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=headers)
+    
+    return Streaming.respond(body, headers)
@@ -0,0 +1,106 @@
+import os
+import hmac
+import hashlib
+from contextvars import Token
+from typing import Any, Awaitable, Callable
+
+import orjson
+from fastapi import APIRouter, Request, Response, BackgroundTasks, HTTPException, status
+from app.dependencies import load_config
+from app.controllers.Commits import Commits
+from app.controllers.Refresher import Refresher
+from app.utils.RateLimitScheduler import RateLimitScheduler
+import app.models.ResponseModels as ResponseModels
+import app.models.GeneralErrors as GeneralErrors
+
+router = APIRouter(
+    prefix="/webhooks",
+    tags=['Webhooks']
+)
+
+refresher = Refresher()
+commits = Commits()
+
+config: dict = load_config()
+
+# The before or after SHA of a push that created or deleted a branch
+null_sha: str = "0" * 40
+
+async def in_background(task: Callable[..., Awaitable[Any]], *args: str) -> None:
+    """Run a refresh behind user-facing requests, as the scheduled ones are
+
+    Args:
+        task (Callable[..., Awaitable[Any]]): The refresh
+        *args (str): Its arguments
+    """
+
+    token: Token[int] = RateLimitScheduler.priority.set(RateLimitScheduler.BACKGROUND)
+
+    try:
+        await task(*args)
+    finally:
+        RateLimitScheduler.priority.reset(token)
+
+@router.post('/github', response_model=ResponseModels.WebhookResponseModel, status_code=status.HTTP_202_ACCEPTED)
+async def github_webhook(request: Request, response: Response, background_tasks: BackgroundTasks) -> dict:
+    """Refresh the cached fragments affected by a GitHub event.
+
+    Returns:
+        json: the event and the fragments being refreshed
+    """
+    
+    body: bytes = await request.body()
+    secret: str | None = os.environ.get('GITHUB_WEBHOOK_SECRET')
+    signature: str = request.headers.get('X-Hub-Signature-256', '')
+    
+    if not secret or not hmac.compare_digest(
+        signature, "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()):
+        raise HTTPException(status_code=401, detail={
+            "error": GeneralErrors.Unauthorized().error,
+            "message": GeneralErrors.Unauthorized().message
+            }
+                            )
+    
+    event: str = request.headers.get('X-GitHub-Event', '')
+    
+    try:
+        payload: Any = orjson.loads(body)
+    except orjson.JSONDecodeError:
+        payload = None
+    
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail={
+            "error": GeneralErrors.InvalidWebhookPayload().error,
+            "message": GeneralErrors.InvalidWebhookPayload().message
+            }
+                            )
+    
+    # Not every event is about a repository, ping for one doesn't have to be
+    repository_payload: dict = payload.get('repository') or {}
+    repository: str = repository_payload.get('full_name', '')
+    org, _, repo = repository.partition('/')
+    refreshing: list[str] = []
+    
+    # Push payloads list 20 commits at most, but before and after always tell if the branch moved
+    pushed: bool = (event == 'push' and
+                    payload.get('ref') == f"refs/heads/{repository_payload.get('default_branch')}" and
+                    payload.get('after', null_sha) != null_sha and payload.get('before') != payload.get('after'))
+    
+    if event == 'release' and repository in config['app']['repositories']:
+        background_tasks.add_task(in_background, refresher.refresh_fragment, 'tools', repository)
+        refreshing.append(f"tools:{repository}")
+    
+    if event == 'member' and repository in config['app']['repositories'] and 'revanced' in repository:
+        background_tasks.add_task(in_background, refresher.refresh_fragment, 'contributors', repository)
+        refreshing.append(f"contributors:{repository}")
+    
+    # Refreshing costs a directory listing when patches.json's blob didn't change
+    if pushed and repository == config['patches']['repository']:
+        background_tasks.add_task(in_background, refresher.refresh, 'patches')
+        refreshing.append("patches")
+    
+    if (pushed or event == 'release') and org in ('revanced', 'vancedapp'):
+        background_tasks.add_task(in_background, commits.sync, org, repo)
+        refreshing.append(f"changelogs:{repository}")
+    
+    return {"event": event, "refreshing": refreshing}
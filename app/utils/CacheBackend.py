@@ -0,0 +1,57 @@
+import time
+from typing import Optional, Tuple, cast
+
+from fastapi_cache.backends.redis import RedisBackend
+
+from app.utils.Metrics import Metrics
+from app.utils.LocalCache import LocalCache
+
+class TwoTierBackend(RedisBackend):
+
+    """Implements a fastapi-cache backend that answers hot keys from the worker's LocalCache before Redis."""
+
+    local_cache = LocalCache()
+
+    # fastapi-cache annotates the value as str, but a miss is a None value, as RedisBackend returns it for a missing key
+    miss: Tuple[int, str] = (0, cast(str, None))
+
+    async def get_with_ttl(self, key: str) -> Tuple[int, str]:
+        async def loader() -> tuple[float, str] | None:
+            ttl, value = await super(TwoTierBackend, self).get_with_ttl(key)
+            return None if value is None else (time.time() + ttl if ttl > 0 else 0.0, value)
+
+        cached: tuple[float, str] | None = await self.local_cache.load(f"{key}#ttl", loader)
+
+        if cached is None:
+            Metrics.lookup('response', 'miss')
+            return self.miss
+
+        expires_at, value = cached
+
+        if expires_at and expires_at <= time.time():
+            # Expired in Redis while it was held here
+            Metrics.lookup('response', 'miss')
+            self.local_cache.evict(f"{key}#ttl")
+            return self.miss
+
+        Metrics.lookup('response', 'hit')
+
+        return (int(expires_at - time.time()) if expires_at else -1), value
+
+    async def get(self, key: str) -> Optional[str]:
+        _, value = await self.get_with_ttl(key)
+        return value
+
+    async def set(self, key: str, value: str, expire: Optional[int] = None) -> None:
+        await super().set(key, value, expire)
+        await self.local_cache.invalidate(key)
+
+    async def clear(self, namespace: Optional[str] = None, key: Optional[str] = None) -> int:
+        cleared: int = await super().clear(namespace, key)
+
+        if key:
+            await self.local_cache.invalidate(key)
+        elif namespace:
+            await self.local_cache.invalidate(namespace)
+
+        return cleared
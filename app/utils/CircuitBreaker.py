@@ -0,0 +1,131 @@
+import time
+from typing import Any, Awaitable, Callable
+
+import httpx
+from loguru import logger
+
+from app.dependencies import load_config
+
+config: dict = load_config()
+
+class CircuitOpenError(Exception):
+
+    """Raised instead of calling an upstream endpoint whose circuit is open."""
+
+    def __init__(self, endpoint: str) -> None:
+        super().__init__(f"Circuit for {endpoint} is open")
+        self.endpoint = endpoint
+
+class CircuitBreaker:
+
+    """Implements a per-endpoint circuit breaker for the GitHub calls.
+
+    After ``threshold`` failures in a row an endpoint's circuit opens and
+    calls fail fast. Once ``reset_timeout`` has passed, a single probe call is
+    let through (half-open): success closes the circuit, failure opens it for
+    another ``reset_timeout``. Only errors that say GitHub is unwell are
+    failures: a 4xx or a payload that doesn't validate is about the request,
+    and every caller of the endpoint would pay for it.
+    """
+
+    CLOSED: str = "closed"
+    OPEN: str = "open"
+    HALF_OPEN: str = "half-open"
+
+    def __init__(self) -> None:
+        self.circuits: dict[str, dict[str, Any]] = {}
+
+    def circuit(self, endpoint: str) -> dict[str, Any]:
+        """Get the state of an endpoint's circuit
+
+        Args:
+            endpoint (str): Upstream endpoint name
+
+        Returns:
+            dict[str, Any]: State, consecutive failures and when it opened
+        """
+
+        return self.circuits.setdefault(endpoint, {'state': self.CLOSED, 'failures': 0, 'opened_at': 0.0})
+
+    @staticmethod
+    def is_failure(error: BaseException) -> bool:
+        """Check if an error counts towards opening a circuit
+
+        Args:
+            error (BaseException): Error raised by the upstream call
+
+        Returns:
+            bool: True for transport errors, server errors and 429, False otherwise
+        """
+
+        if isinstance(error, httpx.TransportError):
+            return True
+
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.is_server_error or error.response.status_code == 429
+
+        return False
+
+    def is_open(self, endpoint: str) -> bool:
+        """Check if calls to an endpoint currently fail fast
+
+        Args:
+            endpoint (str): Upstream endpoint name
+
+        Returns:
+            bool: True if the circuit is open or probing, False otherwise
+        """
+
+        return self.circuit(endpoint)['state'] != self.CLOSED
+
+    async def call(self, endpoint: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Call an upstream endpoint through its circuit
+
+        Args:
+            endpoint (str): Upstream endpoint name
+            fetch (Callable[[], Awaitable[Any]]): Upstream call
+
+        Raises:
+            CircuitOpenError: Raise if the circuit is open, or half-open with a probe in flight
+
+        Returns:
+            Any: The upstream call's result
+        """
+
+        circuit: dict[str, Any] = self.circuit(endpoint)
+
+        if circuit['state'] == self.HALF_OPEN:
+            raise CircuitOpenError(endpoint)
+
+        if circuit['state'] == self.OPEN:
+            if time.monotonic() - circuit['opened_at'] < config['breaker']['reset_timeout']:
+                raise CircuitOpenError(endpoint)
+
+            circuit['state'] = self.HALF_OPEN
+            logger.info(f"[CircuitBreaker] {endpoint} - Half-open, probing")
+
+        try:
+            result: Any = await fetch()
+        except BaseException as e:
+            if not self.is_failure(e):
+                # Cancelled or not GitHub's fault, let the next call probe instead of leaving the circuit probing forever
+                if circuit['state'] == self.HALF_OPEN:
+                    circuit['state'] = self.OPEN
+                raise
+
+            circuit['failures'] += 1
+
+            if circuit['state'] == self.HALF_OPEN or circuit['failures'] >= config['breaker']['threshold']:
+                circuit['state'] = self.OPEN
+                circuit['opened_at'] = time.monotonic()
+                logger.warning(f"[CircuitBreaker] {endpoint} - Open after {circuit['failures']} failures")
+
+            raise
+
+        if circuit['state'] != self.CLOSED:
+            logger.info(f"[CircuitBreaker] {endpoint} - Closed")
+
+        circuit['state'] = self.CLOSED
+        circuit['failures'] = 0
+
+        return result
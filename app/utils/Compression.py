@@ -0,0 +1,98 @@
+import gzip
+import asyncio
+from typing import Callable
+
+from app.dependencies import load_config
+
+config: dict = load_config()
+
+# Brotli and Zstandard are optional, gzip is always there to fall back on
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+class Compression:
+
+    """Implements the pre-compression of cached bodies and the Accept-Encoding negotiation."""
+
+    compressors: dict[str, Callable[[bytes], bytes]] = {
+        'gzip': lambda body: gzip.compress(body, compresslevel=config['compression']['gzip_level'], mtime=0)
+    }
+
+    if brotli is not None:
+        compressors['br'] = lambda body: brotli.compress(body, quality=config['compression']['brotli_quality'])
+
+    if zstandard is not None:
+        compressors['zstd'] = lambda body: zstandard.ZstdCompressor(level=config['compression']['zstd_level']).compress(body)
+
+    # Best ratio first, used to break ties between equally acceptable encodings
+    preference: list[str] = list(filter(compressors.__contains__, ('br', 'zstd', 'gzip')))
+
+    @classmethod
+    async def compress(cls, body: bytes) -> dict[str, bytes]:
+        """Compress a body with every available encoding
+
+        The compressors run in threads, side by side since they release the
+        GIL, so the highest levels don't stall the event loop.
+
+        Args:
+            body (bytes): Serialized body
+
+        Returns:
+            dict[str, bytes]: Compressed body per encoding, empty if the body is too small to bother
+        """
+
+        if len(body) < config['compression']['min_size']:
+            return {}
+
+        encodings: list[str] = list(cls.compressors)
+        compressed: list[bytes] = await asyncio.gather(
+            *[asyncio.to_thread(cls.compressors[encoding], body) for encoding in encodings]
+            )
+
+        return dict(zip(encodings, compressed))
+
+    @classmethod
+    def negotiate(cls, accept_encoding: str | None) -> str | None:
+        """Pick the encoding to answer with
+
+        Args:
+            accept_encoding (str | None): Accept-Encoding header value
+
+        Returns:
+            str | None: The preferred acceptable encoding, or None for identity
+        """
+
+        if not accept_encoding:
+            return None
+
+        weights: dict[str, float] = {}
+
+        for coding in accept_encoding.split(','):
+            name, _, parameters = coding.strip().partition(';')
+            weight: float = 1.0
+
+            for parameter in parameters.split(';'):
+                key, _, value = parameter.strip().partition('=')
+                if key == 'q':
+                    try:
+                        weight = float(value)
+                    except ValueError:
+                        weight = 0.0
+
+            weights[name.strip().lower()] = weight
+
+        candidates: list[tuple[float, int, str]] = []
+
+        for rank, encoding in enumerate(cls.preference):
+            weight = weights.get(encoding, weights.get('*', 0.0))
+            if weight > 0:
+                candidates.append((-weight, rank, encoding))
+
+        return min(candidates)[2] if candidates else None
@@ -0,0 +1,197 @@
+import math
+import time
+import asyncio
+
+from loguru import logger
+
+from app.utils.RedisConnector import RedisConnector
+
+from app.dependencies import load_config
+
+config: dict = load_config()
+
+class DenylistNotLoadedError(Exception):
+
+    """Raised instead of checking a token before the worker's denylist is loaded."""
+
+    def __init__(self) -> None:
+        super().__init__("Denylist isn't loaded yet")
+
+class Denylist:
+
+    """Implements a per-worker copy of the banned token JTIs.
+
+    Every worker loads the whole denylist from Redis when it subscribes to
+    the ban channel, then adds each JTI Clients.ban_token publishes on it.
+    The copy is complete, so the PASETO loader answers from memory, without
+    a Redis call and without blocking the event loop. Losing the
+    subscription reloads the denylist, so bans made meanwhile aren't missed,
+    and so does every ``reload_interval``, for bans whose publish failed.
+    Until the first load completes, no token is let through.
+    """
+
+    redis = RedisConnector.connect(config['tokens']['database'])
+
+    # JTI -> when its ban expires
+    revoked: dict[str, float] = {}
+
+    listener: asyncio.Task | None = None
+
+    loaded: asyncio.Event | None = None
+
+    @staticmethod
+    def expiry(now: float) -> float:
+        """When a ban made now expires, going by the token lifetime
+
+        Args:
+            now (float): Timestamp
+
+        Returns:
+            float: Timestamp, infinite if tokens don't expire
+        """
+
+        expires: int | bool = config['auth']['access_token_expires']
+
+        return math.inf if type(expires) is bool else now + expires
+
+    @classmethod
+    def contains(cls, jti: str) -> bool:
+        """Check if a token is banned
+
+        Args:
+            jti (str): Token JTI
+
+        Returns:
+            bool: True if the token is banned, False otherwise
+
+        Raises:
+            DenylistNotLoadedError: If the denylist hasn't been loaded yet
+        """
+
+        if cls.loaded is None or not cls.loaded.is_set():
+            raise DenylistNotLoadedError()
+
+        expires: float | None = cls.revoked.get(jti)
+
+        if expires is None:
+            return False
+
+        if expires <= time.time():
+            del cls.revoked[jti]
+            return False
+
+        return True
+
+    @classmethod
+    def add(cls, jti: str) -> None:
+        """Ban a token in this worker
+
+        Args:
+            jti (str): Token JTI
+        """
+
+        cls.revoked[jti] = cls.expiry(time.time())
+
+    @classmethod
+    async def publish(cls, jti: str) -> None:
+        """Ban a token in every worker
+
+        Args:
+            jti (str): Token JTI, already banned in Redis
+        """
+
+        cls.add(jti)
+
+        await cls.redis.publish(config['tokens']['channel'], jti)
+
+    @classmethod
+    async def load(cls) -> None:
+        """Replace the copy with the denylist in Redis"""
+
+        revoked: dict[str, float] = {}
+        now: float = time.time()
+        batch: list[str] = []
+
+        async def expire(batch: list[str]) -> None:
+            async with cls.redis.pipeline(transaction=False) as pipe:
+                for jti in batch:
+                    pipe.ttl(jti)
+                ttls: list[int] = await pipe.execute()
+
+            for jti, ttl in zip(batch, ttls):
+                # -1 is no expiry, -2 expired since the scan saw it
+                if ttl != -2:
+                    revoked[jti] = math.inf if ttl == -1 else now + ttl
+
+        async for jti in cls.redis.scan_iter(count=1000):
+            batch.append(jti)
+
+            if len(batch) == 1000:
+                await expire(batch)
+                batch = []
+
+        if batch:
+            await expire(batch)
+
+        # Bans published while loading are already in Redis, keep them anyway
+        cls.revoked = revoked | {jti: expires for jti, expires in cls.revoked.items()
+                                 if jti not in revoked and expires > now}
+
+    @classmethod
+    async def listen(cls) -> None:
+        """Add bans as they're published, and reload the denylist every reload_interval, forever"""
+
+        while True:
+            try:
+                async with cls.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(config['tokens']['channel'])
+
+                    # Anything could have been banned while we weren't listening
+                    await cls.load()
+
+                    if cls.loaded is not None:
+                        cls.loaded.set()
+
+                    reloaded: float = time.monotonic()
+
+                    while True:
+                        message: dict | None = await pubsub.get_message(ignore_subscribe_messages=True,
+                                                                        timeout=1.0)
+
+                        if message is not None and message['type'] == 'message':
+                            cls.add(message['data'])
+
+                        # Bans whose publish failed are only in Redis
+                        if time.monotonic() - reloaded >= config['tokens']['reload_interval']:
+                            await cls.load()
+                            reloaded = time.monotonic()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[Denylist] Ban listener failed with error: {e!r}")
+                await asyncio.sleep(1)
+
+    @classmethod
+    async def start(cls) -> None:
+        """Load the denylist and start listening for bans"""
+
+        if cls.listener is not None:
+            return
+
+        cls.loaded = asyncio.Event()
+        cls.listener = asyncio.create_task(cls.listen())
+
+        try:
+            await asyncio.wait_for(cls.loaded.wait(), timeout=config['tokens']['load_timeout'])
+        except asyncio.TimeoutError:
+            logger.warning("[Denylist] Denylist not loaded yet, rejecting tokens until the listener loads it")
+
+    @classmethod
+    async def stop(cls) -> None:
+        """Stop listening for bans"""
+
+        if cls.listener is not None:
+            cls.listener.cancel()
+            await asyncio.gather(cls.listener, return_exceptions=True)
+            cls.listener = None
+            cls.loaded = None
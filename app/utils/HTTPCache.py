@@ -0,0 +1,80 @@
+import hashlib
+
+from app.dependencies import load_config
+
+config: dict = load_config()
+
+class HTTPCache:
+
+    """Implements strong ETags and the HTTP caching headers of the read endpoints."""
+
+    @staticmethod
+    def etag(body: bytes) -> str:
+        """Compute the strong ETag of a serialized body
+
+        Args:
+            body (bytes): Serialized body
+
+        Returns:
+            str: The quoted content hash
+        """
+
+        return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+    @staticmethod
+    def variant(etag: str, encoding: str | None) -> str:
+        """Get the ETag of an encoded variant of a body
+
+        Args:
+            etag (str): ETag of the uncompressed body
+            encoding (str | None): Content encoding, None for identity
+
+        Returns:
+            str: The ETag, suffixed with the encoding
+        """
+
+        return etag if encoding is None else f'{etag[:-1]}-{encoding}"'
+
+    @staticmethod
+    def matches(if_none_match: str | None, etag: str | None) -> bool:
+        """Check if the client already has the current body
+
+        Variants of the same body match each other, since they only differ by encoding.
+
+        Args:
+            if_none_match (str | None): If-None-Match header value
+            etag (str | None): ETag of the uncompressed body
+
+        Returns:
+            bool: True if a 304 can be answered, False otherwise
+        """
+
+        if not if_none_match or etag is None:
+            return False
+
+        current: str = etag.strip('"')
+
+        for candidate in if_none_match.split(','):
+            candidate = candidate.strip().removeprefix('W/').strip('"')
+
+            if candidate == '*' or candidate.partition('-')[0] == current:
+                return True
+
+        return False
+
+    @staticmethod
+    def headers(etag: str) -> dict[str, str]:
+        """Get the caching headers of a response
+
+        Args:
+            etag (str): ETag of the response
+
+        Returns:
+            dict[str, str]: ETag and Cache-Control headers
+        """
+
+        return {
+            'ETag': etag,
+            'Cache-Control': f"public, max-age={config['http_cache']['max_age']}, "
+                             f"stale-while-revalidate={config['http_cache']['stale_while_revalidate']}"
+        }
@@ -1,28 +1,43 @@
-import os
-import httpx_cache
+import httpx
 import app.utils.Logger as Logger
+from app.utils.UpstreamCache import UpstreamCacheTransport
+from app.utils.RateLimitScheduler import RateLimitScheduler
+from app.utils.TokenPool import TokenPool
+from app.utils.Metrics import MetricsTransport
+from app.utils.Tracing import Tracing, TracingTransport
+
+from app.dependencies import load_config
+
+config: dict = load_config()
 
 class HTTPXClient:
     
     """Implements the methods required to get the latest releases and patches from revanced repositories."""
     
     @staticmethod
-    def create() -> httpx_cache.AsyncClient:
-        """Create HTTPX client with cache
+    def create() -> httpx.AsyncClient:
+        """Create HTTPX client with a Redis backed conditional-request cache,
+        spread over a token pool and scheduled against the GitHub rate limit
 
         Returns:
-            httpx_cache.AsyncClient: HTTPX client with cache
+            httpx.AsyncClient: HTTPX client with cache
         """
     
-        headers = {'Accept': "application/vnd.github+json",
-                'Authorization': "token " + os.environ['GITHUB_TOKEN']
-                }
+        headers = {'Accept': "application/vnd.github+json"}
         
         httpx_logger = Logger.HTTPXLogger()
         
-        httpx_client = httpx_cache.AsyncClient(
+        transport: httpx.AsyncBaseTransport = UpstreamCacheTransport(TokenPool(RateLimitScheduler(
+            MetricsTransport(httpx.AsyncHTTPTransport(http2=True)))))
+        
+        if Tracing.enabled:
+            # Outermost, so the span also covers the cache lookup and the wait for a token
+            transport = TracingTransport(transport)
+        
+        httpx_client = httpx.AsyncClient(
             headers=headers,
-            http2=True,
+            timeout=httpx.Timeout(config['github']['timeout'], connect=config['github']['connect_timeout']),
+            transport=transport,
             event_hooks={
                 'request': [httpx_logger.log_request],
                 'response': [httpx_logger.log_response]
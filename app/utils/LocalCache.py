@@ -0,0 +1,218 @@
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+from loguru import logger
+
+from app.utils.Metrics import Metrics
+from app.utils.RedisConnector import RedisConnector
+
+from app.dependencies import load_config
+
+config: dict = load_config()
+
+class LocalCache:
+
+    """Implements a per-worker LRU/TTL cache in front of Redis.
+
+    Entries are shared by every instance in the worker. Whoever changes a
+    Redis key publishes it on the invalidation channel and every worker drops
+    its copies, while the TTL bounds how long a lost message can go unnoticed.
+    Concurrent misses on the same entry share a single Redis read.
+    """
+
+    redis = RedisConnector.connect(config['cache']['database'])
+
+    entries: OrderedDict[str, tuple[float, int, Any]] = OrderedDict()
+
+    inflight: dict[str, asyncio.Future] = {}
+
+    size: int = 0
+
+    listener: asyncio.Task | None = None
+
+    # Bumped on every invalidation, so a read that raced one isn't cached
+    generation: int = 0
+
+    @staticmethod
+    def weigh(value: Any) -> int:
+        """Estimate the memory held by a cached value
+
+        Args:
+            value (Any): Cached value
+
+        Returns:
+            int: Approximate size in bytes, counting the serialized bodies it holds
+        """
+
+        if isinstance(value, (bytes, str)):
+            return len(value)
+
+        if isinstance(value, (tuple, list)):
+            return sum(LocalCache.weigh(item) for item in value) + 8 * len(value)
+
+        return 64
+
+    def get(self, key: str) -> Any | None:
+        """Get an entry if it's still fresh
+
+        Args:
+            key (str): Entry key
+
+        Returns:
+            Any | None: The cached value, or None on a miss
+        """
+
+        entry: tuple[float, int, Any] | None = self.entries.get(key)
+
+        if entry is None:
+            Metrics.lookup('local', 'miss')
+            return None
+
+        if entry[0] <= time.monotonic():
+            Metrics.lookup('local', 'miss')
+            self.evict(key)
+            return None
+
+        Metrics.lookup('local', 'hit')
+        self.entries.move_to_end(key)
+
+        return entry[2]
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        """Store an entry, evicting the least recently used ones past the bounds
+
+        Args:
+            key (str): Entry key
+            value (Any): Value to cache
+            ttl (float | None, optional): Seconds to keep it. Defaults to None, for the configured bound.
+        """
+
+        ttl = config['local_cache']['ttl'] if ttl is None else min(ttl, config['local_cache']['ttl'])
+        weight: int = self.weigh(value)
+
+        if ttl <= 0 or weight > config['local_cache']['max_bytes']:
+            return
+
+        self.evict(key)
+        self.entries[key] = (time.monotonic() + ttl, weight, value)
+        LocalCache.size += weight
+
+        while (len(self.entries) > config['local_cache']['max_entries'] or
+               self.size > config['local_cache']['max_bytes']):
+            self.evict(next(iter(self.entries)))
+
+    def evict(self, key: str) -> None:
+        """Drop an entry from this worker
+
+        Args:
+            key (str): Entry key
+        """
+
+        entry: tuple[float, int, Any] | None = self.entries.pop(key, None)
+
+        if entry is not None:
+            LocalCache.size -= entry[1]
+
+    def drop(self, prefix: str) -> None:
+        """Drop every entry of a Redis key, or of a key namespace, from this worker
+
+        Args:
+            prefix (str): Redis key the entries were read from, or a namespace of keys
+        """
+
+        for key in [key for key in self.entries
+                    if key == prefix or key.startswith((f"{prefix}#", f"{prefix}:"))]:
+            self.evict(key)
+
+        LocalCache.generation += 1
+
+    async def load(self, key: str, loader: Callable[[], Awaitable[Any]], ttl: float | None = None) -> Any:
+        """Get an entry, reading it from Redis once on a miss
+
+        Args:
+            key (str): Entry key, the Redis key optionally followed by # and a qualifier
+            loader (Callable[[], Awaitable[Any]]): Redis read
+            ttl (float | None, optional): Seconds to keep it. Defaults to None, for the configured bound.
+
+        Returns:
+            Any: The cached or freshly read value
+        """
+
+        value: Any | None = self.get(key)
+
+        if value is not None:
+            return value
+
+        pending: asyncio.Future | None = self.inflight.get(key)
+
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        pending = asyncio.get_running_loop().create_future()
+        self.inflight[key] = pending
+        generation: int = self.generation
+
+        try:
+            value = await loader()
+        except BaseException as e:
+            pending.set_exception(e)
+            # Followers get the exception, don't let it be reported as never retrieved
+            pending.exception()
+            raise
+        else:
+            pending.set_result(value)
+        finally:
+            del self.inflight[key]
+
+        if value is not None and generation == self.generation:
+            self.set(key, value, ttl)
+
+        return value
+
+    async def invalidate(self, key: str) -> None:
+        """Drop a Redis key's entries from every worker
+
+        Args:
+            key (str): Redis key that changed
+        """
+
+        self.drop(key)
+
+        await self.redis.publish(config['local_cache']['channel'], key)
+
+    async def listen(self) -> None:
+        """Drop entries as invalidations are published, forever"""
+
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(config['local_cache']['channel'])
+
+                    # Anything could have changed while we weren't listening
+                    self.entries.clear()
+                    LocalCache.size = 0
+                    LocalCache.generation += 1
+
+                    async for message in pubsub.listen():
+                        if message['type'] == 'message':
+                            self.drop(message['data'])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[LocalCache] Invalidation listener failed with error: {e!r}")
+                await asyncio.sleep(1)
+
+    async def start(self) -> None:
+        """Start listening for invalidations"""
+
+        LocalCache.listener = asyncio.create_task(self.listen())
+
+    async def stop(self) -> None:
+        """Stop listening for invalidations"""
+
+        if self.listener is not None:
+            self.listener.cancel()
+            await asyncio.gather(self.listener, return_exceptions=True)
+            LocalCache.listener = None
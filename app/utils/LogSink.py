@@ -0,0 +1,124 @@
+import os
+import sys
+import queue
+import threading
+import traceback
+from typing import Any, TextIO
+
+import orjson
+
+from app.dependencies import load_config
+
+config: dict = load_config()
+
+class QueuedSink:
+
+    """Implements a Loguru sink that formats and writes records from a background thread.
+
+    The event loop only hands the record over to a queue. The writer
+    thread drains whatever piled up, up to a batch, formats it as JSON
+    lines or text and writes it with a single call. Records arriving while
+    the queue is full are dropped, and counted, rather than blocking the
+    loop on a slow stdout.
+    """
+
+    def __init__(self, stream: TextIO = sys.stdout, serialize: bool = False) -> None:
+        self.stream = stream
+        self.serialize = serialize
+        self.dropped: int = 0
+        self.start()
+
+        # The writer thread doesn't survive gunicorn's fork, so each worker gets its own
+        os.register_at_fork(after_in_child=self.start)
+
+    def start(self) -> None:
+        """Start the writer thread, with an empty queue"""
+
+        self.records: queue.SimpleQueue = queue.SimpleQueue()
+        self.writer = threading.Thread(target=self.drain, name="log-writer", daemon=True)
+        self.writer.start()
+
+    def stop(self) -> None:
+        """Write the records left and stop the writer thread"""
+
+        self.records.put(None)
+        self.writer.join()
+
+    def __call__(self, message: Any) -> None:
+        if self.records.qsize() >= config['logging']['queue_size']:
+            self.dropped += 1
+            return
+
+        self.records.put(message.record)
+
+    def format(self, record: dict) -> str:
+        """Format a record as a line
+
+        Args:
+            record (dict): Loguru record
+
+        Returns:
+            str: The record as JSON or text, with its traceback if any
+        """
+
+        exception: str | None = None
+        extra: dict[str, Any] = dict(record['extra'])
+        origin: dict[str, Any] = extra.pop('origin', None) or {'name': record['name'],
+                                                               'function': record['function'],
+                                                               'line': record['line']}
+
+        if record['exception'] is not None:
+            kind, value, trace = record['exception']
+            exception = "".join(traceback.format_exception(kind, value, trace))
+
+        if self.serialize:
+            entry: dict[str, Any] = {'time': record['time'].isoformat(),
+                                     'level': record['level'].name,
+                                     'message': record['message'],
+                                     **origin,
+                                     'process': record['process'].id}
+
+            if extra:
+                entry['extra'] = extra
+            if exception is not None:
+                entry['exception'] = exception
+
+            return orjson.dumps(entry, default=str).decode() + "\n"
+
+        line: str = (f"{record['time']:%Y-%m-%d %H:%M:%S.%f}"[:-3]
+                     + f" | {record['level'].name:<8} | {origin['name']}:{origin['function']}:{origin['line']}"
+                     + f" - {record['message']}\n")
+
+        return line + exception if exception is not None else line
+
+    def drain(self) -> None:
+        """Write batches of records as they come, until stopped"""
+
+        records: queue.SimpleQueue = self.records
+
+        while True:
+            batch: list[dict | None] = [records.get()]
+
+            while len(batch) < config['logging']['batch_size']:
+                try:
+                    batch.append(records.get_nowait())
+                except queue.Empty:
+                    break
+
+            lines: list[str] = [self.format(record) for record in batch if record is not None]
+
+            if self.dropped:
+                dropped, self.dropped = self.dropped, 0
+                warning: str = f"[Logging] Dropped {dropped} records, the queue was full"
+                lines.append(orjson.dumps({'level': "WARNING", 'message': warning}).decode() + "\n"
+                             if self.serialize else f"{warning}\n")
+
+            try:
+                self.stream.write("".join(lines))
+                self.stream.flush()
+            except (OSError, ValueError):
+                # Nowhere left to log to
+                pass
+
+            if None in batch:
+                return
@@ -1,7 +1,31 @@
+import random
+
 from loguru import logger
 from redis import RedisError
 from argon2.exceptions import VerifyMismatchError
 
+from app.dependencies import load_config
+
+config: dict = load_config()
+
+class Sampling:
+    """Per-category sampling of the log lines of successful operations. Failures are always logged."""
+
+    rates: dict[str, float] = config['logging']['sampling']
+
+    @classmethod
+    def keep(cls, category: str) -> bool:
+        """Decide whether to log a successful operation
+
+        Args:
+            category (str): Category of the operation, a key of [logging.sampling]
+
+        Returns:
+            bool: True to log it
+        """
+        rate: float = cls.rates.get(category, 1.0)
+        return rate >= 1.0 or random.random() < rate
+
 class HTTPXLogger():
     """Logger adapter for HTTPX."""
     
@@ -12,7 +36,8 @@ class HTTPXLogger():
             None
         """
         
-        logger.info(f"[HTTPX] Request: {request.method} {request.url} - Waiting for response")
+        if Sampling.keep('httpx'):
+            logger.info(f"[HTTPX] Request: {request.method} {request.url} - Waiting for response")
         
     async def log_response(self, response) -> None:
         """Logs HTTPX responses
@@ -22,7 +47,8 @@ class HTTPXLogger():
         """
         request = response.request
         
-        logger.info(f"[HTTPX] Response: {request.method} {request.url} - Status: {response.status_code} {response.reason_phrase}")
+        if response.is_error or Sampling.keep('httpx'):
+            logger.info(f"[HTTPX] Response: {request.method} {request.url} - Status: {response.status_code} {response.reason_phrase}")
 
 class InternalCacheLogger:
     async def log(self, operation: str, result: RedisError | None = None, key: str = "",) -> None:
@@ -32,9 +58,9 @@ class InternalCacheLogger:
             operation (str): Operation name
             key (str): Key used in the operation
         """
-        if type(result) is RedisError:
+        if isinstance(result, RedisError):
             logger.error(f"[InternalCache] REDIS {operation} - Failed with error: {result}")
-        else:
+        elif Sampling.keep('internal_cache'):
             logger.info(f"[InternalCache] REDIS {operation} {key} - OK")
 
 class UserLogger:
@@ -46,9 +72,9 @@ class UserLogger:
             operation (str): Operation name
             key (str): Key used in the operation
         """
-        if type(result) is RedisError:
+        if isinstance(result, RedisError):
             logger.error(f"[User] REDIS {operation} - Failed with error: {result}")
-        else:
+        elif Sampling.keep('user'):
             logger.info(f"[User] REDIS {operation} {key} - OK")
 
 class AnnouncementsLogger:
@@ -59,9 +85,9 @@ class AnnouncementsLogger:
             operation (str): Operation name
             key (str): Key used in the operation
         """
-        if type(result) is RedisError:
+        if isinstance(result, RedisError):
             logger.error(f"[ANNOUNCEMENT] REDIS {operation} - Failed with error: {result}")
-        else:
+        elif Sampling.keep('announcements'):
             logger.info(f"[ANNOUNCEMENT] REDIS {operation} {key} - OK")
 
 class MirrorsLogger:
@@ -72,7 +98,7 @@ class MirrorsLogger:
             operation (str): Operation name
             key (str): Key used in the operation
         """
-        if type(result) is RedisError:
+        if isinstance(result, RedisError):
             logger.error(f"[MIRRORS] REDIS {operation} - Failed with error: {result}")
-        else:
+        elif Sampling.keep('mirrors'):
             logger.info(f"[MIRRORS] REDIS {operation} {key} - OK")
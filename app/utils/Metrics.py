@@ -0,0 +1,188 @@
+import os
+import time
+import asyncio
+
+import httpx
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from prometheus_client import REGISTRY, CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+from app.utils.Tracing import Tracing
+
+from app.dependencies import load_config
+
+config: dict = load_config()
+
+class Metrics:
+
+    """Implements the Prometheus metrics of the API.
+
+    Under gunicorn every worker writes its samples to files in
+    PROMETHEUS_MULTIPROC_DIR, set by run.py, and /metrics adds them up, so
+    a scrape sees the whole instance whichever worker answers it.
+    """
+
+    requests = Histogram('http_request_duration_seconds', "Time to answer a request",
+                         ['method', 'route', 'status'])
+
+    cache = Counter('cache_lookups_total', "Cache lookups by cache and result (hit, miss or stale)",
+                    ['cache', 'result'])
+
+    singleflight = Counter('singleflight_fetches_total',
+                           "Upstream fetches by kind of flight and outcome (fetched, coalesced or stale)",
+                           ['flight', 'outcome'])
+
+    github = Histogram('github_request_duration_seconds', "Time for GitHub to answer, up to the response headers",
+                       ['endpoint', 'status'])
+
+    budget = Gauge('github_rate_limit_remaining', "Requests left in the GitHub rate limit window",
+                   ['token', 'resource'], multiprocess_mode='mostrecent')
+
+    tokens = Counter('github_token_requests_total', "GitHub requests by token fingerprint and outcome (accepted or rejected)",
+                     ['token', 'outcome'])
+
+    quarantine = Gauge('github_token_quarantined_until_seconds', "When a quarantined token is back in rotation",
+                       ['token'], multiprocess_mode='max')
+
+    scheduler = Gauge('github_scheduler_requests', "GitHub requests by state (queued for an upstream slot or active)",
+                      ['state'], multiprocess_mode='livesum')
+
+    redis = Histogram('redis_command_duration_seconds', "Time to run a Redis command or pipeline",
+                      ['database', 'command'],
+                      buckets=(.0001, .00025, .0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0))
+
+    loop_lag = Histogram('event_loop_lag_seconds', "How late the event loop ran a timer",
+                         buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0))
+
+    # GitHub path segments kept as they are, the others (owners, repositories, SHAs...) become *
+    github_segments: frozenset[str] = frozenset({'repos', 'releases', 'latest', 'contents', 'git', 'blobs',
+                                                 'contributors', 'commits', 'graphql'})
+
+    lag_monitor: asyncio.Task | None = None
+
+    @staticmethod
+    def render() -> tuple[bytes, str]:
+        """Expose the metrics of every worker
+
+        Returns:
+            tuple[bytes, str]: The metrics in the Prometheus text format, and its content type
+        """
+
+        registry: CollectorRegistry = REGISTRY
+
+        if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+
+    @classmethod
+    def lookup(cls, cache: str, result: str) -> None:
+        """Count a cache lookup, and tag the current span with its result
+
+        Args:
+            cache (str): Cache looked up
+            result (str): hit, miss or stale
+        """
+
+        cls.cache.labels(cache, result).inc()
+        Tracing.attribute(f"cache.{cache}", result)
+
+    @classmethod
+    def endpoint(cls, url: httpx.URL) -> str:
+        """Name the GitHub endpoint of a URL, without what varies between calls
+
+        Args:
+            url (httpx.URL): Request URL
+
+        Returns:
+            str: The endpoint, e.g. /repos/*/*/releases/latest
+        """
+
+        return "/" + "/".join(segment if segment in cls.github_segments else "*"
+                              for segment in url.path.strip("/").split("/"))
+
+    @classmethod
+    async def watch_loop(cls) -> None:
+        """Measure how late the event loop wakes up from a sleep, forever"""
+
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        interval: float = config['metrics']['lag_interval']
+
+        while True:
+            started: float = loop.time()
+            await asyncio.sleep(interval)
+            cls.loop_lag.observe(max(loop.time() - started - interval, 0.0))
+
+    @classmethod
+    async def start(cls) -> None:
+        """Start measuring the event loop lag of this worker"""
+
+        if cls.lag_monitor is None:
+            cls.lag_monitor = asyncio.create_task(cls.watch_loop())
+
+    @classmethod
+    async def stop(cls) -> None:
+        """Stop measuring the event loop lag"""
+
+        if cls.lag_monitor is not None:
+            cls.lag_monitor.cancel()
+            await asyncio.gather(cls.lag_monitor, return_exceptions=True)
+            cls.lag_monitor = None
+
+class MetricsMiddleware:
+
+    """Times every request by method, route template and status code.
+
+    Labels use the route's path template, not the requested path, so
+    arbitrary URLs can't grow the number of series.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        started: float = time.perf_counter()
+        status: int = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+
+            if message['type'] == 'http.response.start':
+                status = message['status']
+
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get('route')
+            Metrics.requests.labels(scope['method'], route.path if route is not None else "unmatched",
+                                    str(status)).observe(time.perf_counter() - started)
+
+class MetricsTransport(httpx.AsyncBaseTransport):
+
+    """Times the requests that actually reach GitHub, by endpoint and status code."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport) -> None:
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started: float = time.perf_counter()
+        status: str = "error"
+
+        try:
+            response: httpx.Response = await self.transport.handle_async_request(request)
+            status = str(response.status_code)
+            return response
+        finally:
+            Metrics.github.labels(Metrics.endpoint(request.url), status).observe(time.perf_counter() - started)
+
+    async def aclose(self) -> None:
+        """Close the wrapped transport"""
+
+        await self.transport.aclose()
@@ -0,0 +1,246 @@
+import time
+import heapq
+import asyncio
+import hashlib
+import itertools
+from contextvars import ContextVar
+
+import httpx
+from loguru import logger
+
+from app.utils.Metrics import Metrics
+from app.utils.RedisConnector import RedisConnector
+
+from app.dependencies import load_config
+
+config: dict = load_config()
+
+class BudgetExhaustedError(Exception):
+
+    """Raised when a background request would have to wait too long for rate limit budget."""
+
+class RateLimitScheduler(httpx.AsyncBaseTransport):
+
+    """Schedules GitHub requests against the rate limit budget of the token they use.
+
+    The remaining budget of every token and resource (core, graphql...) is
+    tracked from the X-RateLimit-* headers. Requests get an upstream slot by
+    priority, so background refreshes always queue behind user-facing misses.
+    Once the budget runs low, requests are paced over what's left of the
+    window instead of running it dry: each paced request reserves the next
+    free send time, so concurrent requests don't all wake up at once.
+    """
+
+    USER: int = 0
+    BACKGROUND: int = 1
+
+    priority: ContextVar[int] = ContextVar('github_priority', default=USER)
+
+    redis = RedisConnector.connect(config['upstream']['database'])
+
+    # GitHub rate limit windows last an hour
+    window: int = 3600
+
+    def __init__(self, transport: httpx.AsyncBaseTransport) -> None:
+        self.transport = transport
+        self.budgets: dict[str, dict[str, float]] = {}
+        # Budget key -> earliest time the next paced request may be sent
+        self.slots: dict[str, float] = {}
+        self.queue: list[tuple[int, int, asyncio.Future]] = []
+        self.order = itertools.count()
+        self.active: int = 0
+
+    @staticmethod
+    def fingerprint(authorization: str) -> str:
+        """Get the fingerprint a token is tracked by, without exposing it
+
+        Args:
+            authorization (str): Authorization header value
+
+        Returns:
+            str: Token fingerprint
+        """
+
+        return hashlib.sha256(authorization.encode()).hexdigest()[:8]
+
+    @staticmethod
+    def resource(request: httpx.Request) -> str:
+        """Get the rate limit resource a request is charged to
+
+        Args:
+            request (httpx.Request): Outgoing request
+
+        Returns:
+            str: core or graphql
+        """
+
+        return 'graphql' if request.url.path.endswith('/graphql') else 'core'
+
+    def budget_key(self, request: httpx.Request) -> str:
+        """Get the budget a request is charged to
+
+        Args:
+            request (httpx.Request): Outgoing request
+
+        Returns:
+            str: Token fingerprint and rate limit resource
+        """
+
+        return f"{self.fingerprint(request.headers.get('Authorization', ''))}:{self.resource(request)}"
+
+    def delay(self, key: str, priority: int) -> float:
+        """Work out how long a request should wait before being sent, and reserve its send time
+
+        Args:
+            key (str): Budget key
+            priority (int): Request priority
+
+        Raises:
+            BudgetExhaustedError: Raise if a background request would wait longer than background_max_wait
+
+        Returns:
+            float: Seconds to wait
+        """
+
+        budget: dict[str, float] | None = self.budgets.get(key)
+        now: float = time.time()
+
+        if budget is None or now >= budget['reset']:
+            return 0
+
+        reserve: float = budget['limit'] * config['scheduler']['reserve']
+
+        if priority == self.BACKGROUND:
+            # Background work never touches the reserve, and is paced early
+            available: float = budget['remaining'] - config['scheduler']['floor'] - reserve
+            pace_below: float = budget['limit'] * config['scheduler']['pace_below']
+        else:
+            available = budget['remaining'] - config['scheduler']['floor']
+            pace_below = reserve
+
+        if available <= 0:
+            # Nothing left until the next window
+            wait: float = budget['reset'] - now
+            interval: float = 0
+        elif budget['remaining'] < pace_below:
+            # Spread what's left evenly over the rest of the window, one request per slot
+            wait = max(self.slots.get(key, now) - now, 0)
+            interval = (budget['reset'] - now) / available
+        else:
+            return 0
+
+        if priority == self.BACKGROUND:
+            # A refresh holds its lease while it waits, so give up well before it runs out
+            if wait > config['scheduler']['background_max_wait']:
+                raise BudgetExhaustedError(f"{key} - No budget left for background requests until {budget['reset']}")
+        else:
+            # User-facing misses only wait so long
+            wait = min(wait, config['scheduler']['max_wait'])
+
+        if interval:
+            self.slots[key] = max(self.slots.get(key, now), now + wait) + interval
+
+        return wait
+
+    async def acquire(self, priority: int) -> None:
+        """Wait for an upstream slot, highest priority first
+
+        Args:
+            priority (int): Request priority
+        """
+
+        if self.active < config['scheduler']['concurrency'] and not self.queue:
+            self.active += 1
+            Metrics.scheduler.labels('active').inc()
+            return
+
+        slot: asyncio.Future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.queue, (priority, next(self.order), slot))
+        Metrics.scheduler.labels('queued').inc()
+
+        try:
+            await slot
+        except asyncio.CancelledError:
+            if slot.done() and not slot.cancelled():
+                self.release()
+            raise
+        finally:
+            # Granted or given up, either way it's no longer queued
+            Metrics.scheduler.labels('queued').dec()
+
+    def release(self) -> None:
+        """Hand the upstream slot to the next waiting request, or free it"""
+
+        while self.queue:
+            _, _, slot = heapq.heappop(self.queue)
+            if not slot.done():
+                slot.set_result(None)
+                return
+
+        self.active -= 1
+        Metrics.scheduler.labels('active').dec()
+
+    async def observe(self, key: str, response: httpx.Response) -> None:
+        """Update a budget from the rate limit headers of a response
+
+        Args:
+            key (str): Budget key
+            response (httpx.Response): Upstream response
+        """
+
+        if 'x-ratelimit-remaining' not in response.headers:
+            return
+
+        budget: dict[str, float] = {
+            'remaining': int(response.headers['x-ratelimit-remaining']),
+            'limit': int(response.headers.get('x-ratelimit-limit', 0)),
+            'reset': int(response.headers.get('x-ratelimit-reset', 0))
+        }
+        self.budgets[key] = budget
+        Metrics.budget.labels(*key.split(':')).set(budget['remaining'])
+
+        if budget['remaining'] <= config['scheduler']['floor']:
+            logger.warning(f"[Scheduler] {key} - {budget['remaining']} requests left until {budget['reset']}")
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hset("github:budget", mapping={f"{key}:{field}": value for field, value in budget.items()})
+            # Budgets of tokens no longer in use go away with their window
+            pipe.expire("github:budget", self.window)
+            await pipe.execute()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Send a request once its budget and priority allow it
+
+        Args:
+            request (httpx.Request): Outgoing request
+
+        Returns:
+            httpx.Response: Upstream response
+        """
+
+        key: str = self.budget_key(request)
+        priority: int = self.priority.get()
+
+        wait: float = self.delay(key, priority)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+        await self.acquire(priority)
+
+        try:
+            if key in self.budgets:
+                # Account for the request now, the headers will correct it
+                self.budgets[key]['remaining'] -= 1
+
+            response: httpx.Response = await self.transport.handle_async_request(request)
+        finally:
+            self.release()
+
+        await self.observe(key, response)
+
+        return response
+
+    async def aclose(self) -> None:
+        """Close the wrapped transport"""
+
+        await self.transport.aclose()
@@ -0,0 +1,247 @@
+import re
+import math
+import time
+import asyncio
+
+from loguru import logger
+from redis import asyncio as aioredis
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils.RedisConnector import RedisConnector
+
+from app.dependencies import load_config
+
+config: dict = load_config()
+
+class Allowance:
+
+    """What a worker knows about a client's usage of the limit."""
+
+    __slots__ = ('count', 'pending', 'synced_at')
+
+    def __init__(self) -> None:
+        # Requests in the sliding window, as of the last Redis call
+        self.count: int = 0
+        # Requests let through locally and not counted in Redis yet
+        self.pending: int = 0
+        self.synced_at: float = 0.0
+
+class RateLimiter:
+
+    """Implements a sliding window rate limit per client, shared by every worker through Redis.
+
+    The window is approximated from the counters of the current and the
+    previous fixed windows, checked and incremented in a single script
+    call. Each worker also keeps a small local allowance per client: while
+    the last known count leaves room, requests are let through without a
+    round trip and counted in Redis in the background, every sync_interval.
+    A worker never holds more than limit × slack uncounted requests for a
+    client, which bounds how far past the limit a client can get.
+    """
+
+    redis = RedisConnector.connect(config['ratelimit']['database'])
+
+    # KEYS: current window, previous window
+    # ARGV: limit, window length, share of the current window elapsed,
+    #       requests already let through, requests asking to be let through
+    count_hits = redis.register_script("""
+        local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+        local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+        local served = tonumber(ARGV[4])
+        local requested = tonumber(ARGV[5])
+        local count = math.floor(previous * (1 - tonumber(ARGV[3]))) + current + served
+        local allowed = count + requested <= tonumber(ARGV[1])
+        if allowed then
+            count = count + requested
+            served = served + requested
+        end
+        if served > 0 then
+            redis.call('INCRBY', KEYS[1], served)
+            redis.call('EXPIRE', KEYS[1], 2 * tonumber(ARGV[2]))
+        end
+        return {allowed and 1 or 0, count}
+        """)
+
+    units: dict[str, int] = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+    allowances: dict[str, Allowance] = {}
+
+    reconciler: asyncio.Task | None = None
+
+    @classmethod
+    def parse(cls, limit: str) -> tuple[int, int]:
+        """Parse a limit such as 60/minute or 100 per 5 minutes
+
+        Args:
+            limit (str): Limit notation
+
+        Returns:
+            tuple[int, int]: Requests allowed and the window, in seconds
+        """
+
+        match: re.Match | None = re.fullmatch(r"\s*(\d+)\s*(?:/|per)\s*(\d+)?\s*(second|minute|hour|day)s?\s*", limit)
+
+        if match is None:
+            raise ValueError(f"Invalid rate limit: {limit}")
+
+        requests, multiple, unit = match.groups()
+
+        return int(requests), int(multiple or 1) * cls.units[unit]
+
+    def __init__(self) -> None:
+        self.limit, self.window = self.parse(config['ratelimit']['limit'])
+        self.budget: int = int(self.limit * config['ratelimit']['slack'])
+
+    def window_of(self, client: str, now: float) -> tuple[list[str], float, float]:
+        """Locate a moment in the fixed windows
+
+        Args:
+            client (str): Client address
+            now (float): Timestamp
+
+        Returns:
+            tuple[list[str], float, float]: Keys of the current and previous
+            windows, share of the current one elapsed, and when it ends
+        """
+
+        index, offset = divmod(now, self.window)
+
+        return ([f"ratelimit:{client}:{int(index)}", f"ratelimit:{client}:{int(index) - 1}"],
+                offset / self.window, (index + 1) * self.window)
+
+    async def sync(self, client: str, allowance: Allowance, requested: int) -> bool:
+        """Count the pending requests of a client in Redis, along with the new ones if they fit
+
+        Args:
+            client (str): Client address
+            allowance (Allowance): The client's local allowance
+            requested (int): Requests asking to be let through
+
+        Returns:
+            bool: True if the requested ones were let through
+        """
+
+        served: int = allowance.pending
+        # Whatever is let through meanwhile goes in the next call
+        allowance.pending = 0
+        now: float = time.time()
+        keys, elapsed, _ = self.window_of(client, now)
+
+        try:
+            allowed, count = await self.count_hits(keys=keys, args=[self.limit, self.window, elapsed, served, requested])
+        except aioredis.RedisError as e:
+            allowance.pending += served
+            raise e
+
+        allowance.count, allowance.synced_at = count, now
+
+        return bool(allowed)
+
+    async def acquire(self, client: str) -> tuple[bool, int, float]:
+        """Let a request through if the client is within the limit, and count it
+
+        Args:
+            client (str): Client address
+
+        Returns:
+            tuple[bool, int, float]: Whether it's let through, requests
+            left in the window and when the current window ends
+        """
+
+        now: float = time.time()
+        allowance: Allowance | None = self.allowances.get(client)
+
+        if allowance is None:
+            allowance = self.allowances[client] = Allowance()
+
+        used: int = allowance.count + allowance.pending
+        fresh: bool = now - allowance.synced_at < 2 * config['ratelimit']['sync_interval']
+
+        if fresh and allowance.pending < self.budget and used < self.limit:
+            allowance.pending += 1
+            allowed: bool = True
+        else:
+            try:
+                allowed = await self.sync(client, allowance, 1)
+            except aioredis.RedisError as e:
+                # Better to let everyone through than no one
+                logger.error(f"[RateLimiter] {client} - Check failed with error: {e}")
+                return True, self.limit, self.window_of(client, now)[2]
+
+        return allowed, max(self.limit - allowance.count - allowance.pending, 0), self.window_of(client, now)[2]
+
+    async def reconcile(self) -> None:
+        """Count the locally let through requests in Redis and forget idle clients"""
+
+        now: float = time.time()
+
+        for client, allowance in list(self.allowances.items()):
+            if allowance.pending:
+                try:
+                    await self.sync(client, allowance, 0)
+                except aioredis.RedisError as e:
+                    logger.error(f"[RateLimiter] {client} - Sync failed with error: {e}")
+            elif now - allowance.synced_at > self.window:
+                del self.allowances[client]
+
+    async def run(self) -> None:
+        """Reconcile every sync_interval, forever"""
+
+        while True:
+            await asyncio.sleep(config['ratelimit']['sync_interval'])
+            await self.reconcile()
+
+    async def start(self) -> None:
+        """Start reconciling in the background"""
+
+        if RateLimiter.reconciler is None:
+            RateLimiter.reconciler = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stop reconciling, counting what's still pending"""
+
+        if RateLimiter.reconciler is not None:
+            RateLimiter.reconciler.cancel()
+            await asyncio.gather(RateLimiter.reconciler, return_exceptions=True)
+            RateLimiter.reconciler = None
+
+        await self.reconcile()
+
+class RateLimitMiddleware:
+
+    """Answers clients past the rate limit with a 429, and tells the others how much they have left."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.limiter = RateLimiter()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        client: str = scope['client'][0] if scope.get('client') else "127.0.0.1"
+        allowed, remaining, reset = await self.limiter.acquire(client)
+        headers: dict[str, str] = {'X-RateLimit-Limit': str(self.limiter.limit),
+                                   'X-RateLimit-Remaining': str(remaining),
+                                   'X-RateLimit-Reset': str(int(reset))}
+
+        if not allowed:
+            headers['Retry-After'] = str(max(math.ceil(reset - time.time()), 1))
+            response = JSONResponse(status_code=429, headers=headers, content={
+                "error": f"Rate limit exceeded: {config['ratelimit']['limit']}"
+                })
+            await response(scope, receive, send)
+            return
+
+        raw_headers: list[tuple[bytes, bytes]] = [(name.lower().encode(), value.encode())
+                                                  for name, value in headers.items()]
+
+        async def send_with_headers(message: Message) -> None:
+            if message['type'] == 'http.response.start':
+                message['headers'] = [*message.get('headers', []), *raw_headers]
+
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
@@ -1,6 +1,13 @@
 import os
+import time
+from typing import Any
 
 from redis import asyncio as aioredis
+from redis.asyncio.client import Pipeline
+from redis.asyncio.connection import ConnectionPool
+
+from app.utils.Metrics import Metrics
+from app.utils.Tracing import Tracing
 
 from app.dependencies import load_config
 
@@ -15,11 +22,75 @@ redis_config: dict[ str, str | int ] = {
     "port": os.environ['REDIS_PORT'],
 }
 
+# Controller each database belongs to, to label the command metrics with
+
+databases: dict[int, str] = {int(section['database']): name for name, section in config.items()
+                             if isinstance(section, dict) and 'database' in section}
+
+def database_name(pool: ConnectionPool) -> str:
+    database: int = int(pool.connection_kwargs.get('db', 0))
+    return databases.get(database, str(database))
+
+class InstrumentedPipeline(Pipeline):
+    """Pipeline timing each execution as a whole"""
+
+    async def execute(self, raise_on_error: bool = True) -> list[Any]:
+        started: float = time.perf_counter()
+
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            Metrics.redis.labels(database_name(self.connection_pool),
+                                 "MULTI" if self.is_transaction else "PIPELINE").observe(time.perf_counter() - started)
+
+class InstrumentedRedis(aioredis.Redis):
+    """Redis client timing every command"""
+
+    async def execute_command(self, *args: Any, **options: Any) -> Any:
+        started: float = time.perf_counter()
+
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            Metrics.redis.labels(database_name(self.connection_pool),
+                                 str(args[0]).upper()).observe(time.perf_counter() - started)
+
+    def pipeline(self, transaction: bool = True, shard_hint: str | None = None) -> InstrumentedPipeline:
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+class TracedPipeline(InstrumentedPipeline):
+    """Pipeline also tracing each execution in a span"""
+
+    async def execute(self, raise_on_error: bool = True) -> list[Any]:
+        with Tracing.start_span("MULTI" if self.is_transaction else "PIPELINE") as span:
+            span.set_attribute('db.system', "redis")
+            span.set_attribute('db.name', database_name(self.connection_pool))
+            span.set_attribute('db.redis.commands', len(self.command_stack))
+            return await super().execute(raise_on_error)
+
+class TracedRedis(InstrumentedRedis):
+    """Redis client also tracing every command in a span, only used when tracing is enabled"""
+
+    async def execute_command(self, *args: Any, **options: Any) -> Any:
+        with Tracing.start_span(str(args[0]).upper()) as span:
+            span.set_attribute('db.system', "redis")
+            span.set_attribute('db.name', database_name(self.connection_pool))
+            return await super().execute_command(*args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint: str | None = None) -> TracedPipeline:
+        return TracedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
 class RedisConnector:
     """Implements the RedisConnector class for the ReVanced API"""
-    
+
     @staticmethod
-    def connect(database: str) -> aioredis.Redis:
-        """Connect to Redis"""
+    def connect(database: str, decode_responses: bool = True) -> aioredis.Redis:
+        """Connect to Redis
+
+        Args:
+            database (str): Redis database number
+            decode_responses (bool, optional): Decode replies to str. Defaults to True.
+        """
         redis_url = f"{redis_config['url']}:{redis_config['port']}/{database}"
-        return aioredis.from_url(redis_url, encoding="utf-8", decode_responses=True)
+        client: type[InstrumentedRedis] = TracedRedis if Tracing.enabled else InstrumentedRedis
+        return client.from_url(redis_url, encoding="utf-8", decode_responses=decode_responses)
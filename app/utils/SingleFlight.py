@@ -0,0 +1,168 @@
+import time
+import uuid
+import asyncio
+from typing import Any, Awaitable, Callable
+
+import orjson
+from loguru import logger
+
+from app.utils.Metrics import Metrics
+from app.utils.RedisConnector import RedisConnector
+
+from app.dependencies import load_config
+
+config: dict = load_config()
+
+class SingleFlight:
+
+    """Coalesces concurrent upstream fetches across workers and replicas with a short Redis lease."""
+
+    redis = RedisConnector.connect(config['cache']['database'])
+
+    release_lease = redis.register_script("""
+        if redis.call('GET', KEYS[1]) == ARGV[1] then
+            return redis.call('DEL', KEYS[1])
+        end
+        return 0
+        """)
+
+    inflight: dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    def count(key: str, outcome: str) -> None:
+        """Count a fetch in the worker's metrics. Everything but the fetched
+        outcome is an upstream call that was saved.
+
+        Args:
+            key (str): Flight key, counted by its kind (e.g. release for release:owner/repo)
+            outcome (str): fetched, coalesced or stale
+        """
+
+        Metrics.singleflight.labels(key.split(':', 1)[0], outcome).inc()
+
+    async def lead(self, key: str, token: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Fetch from upstream as the lease holder and publish the result
+
+        Args:
+            key (str): Flight key
+            token (str): Lease token
+            fetch (Callable[[], Awaitable[Any]]): Upstream fetch
+
+        Returns:
+            Any: The fetched payload
+        """
+
+        try:
+            result: Any = await fetch()
+            payload: bytes = orjson.dumps(result)
+
+            async with self.redis.pipeline(transaction=True) as pipe:
+                # Stored once, the result key only tells followers this lease's payload has landed
+                pipe.set(f"singleflight:stale:{key}", payload, ex=config['singleflight']['stale_expire'])
+                pipe.set(f"singleflight:result:{key}:{token}", "", ex=config['singleflight']['result_expire'])
+                await pipe.execute()
+        finally:
+            await self.release_lease(keys=[f"singleflight:lease:{key}"], args=[token])
+
+        self.count(key, "fetched")
+
+        return result
+
+    async def result(self, key: str, holder: str) -> str | None:
+        """Get the payload a lease holder published, if it did
+
+        Args:
+            key (str): Flight key
+            holder (str): Lease token of the holder
+
+        Returns:
+            str | None: The serialized payload, or None if it didn't land yet
+        """
+
+        if not await self.redis.exists(f"singleflight:result:{key}:{holder}"):
+            return None
+
+        # A later holder may have replaced it since, with an even fresher payload
+        payload: str | None = await self.redis.get(f"singleflight:stale:{key}")
+
+        return payload
+
+    async def follow(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Wait for whoever holds the lease, or take it over
+
+        Args:
+            key (str): Flight key
+            fetch (Callable[[], Awaitable[Any]]): Upstream fetch
+
+        Returns:
+            Any: The payload fetched by the lease holder, a stale payload or
+            a payload fetched by this worker
+        """
+
+        lease_key: str = f"singleflight:lease:{key}"
+        deadline: float = time.monotonic() + config['singleflight']['wait']
+
+        while time.monotonic() < deadline:
+            token: str = str(uuid.uuid4())
+
+            if await self.redis.set(lease_key, token, nx=True, ex=config['singleflight']['lease']):
+                return await self.lead(key, token, fetch)
+
+            holder: str | None = await self.redis.get(lease_key)
+
+            while holder is not None and time.monotonic() < deadline:
+                payload: str | None = await self.result(key, holder)
+
+                if payload is not None:
+                    self.count(key, "coalesced")
+                    return orjson.loads(payload)
+
+                await asyncio.sleep(config['singleflight']['poll'])
+
+                if await self.redis.get(lease_key) != holder:
+                    # The holder is done; its result may have landed just before the lease went away
+                    payload = await self.result(key, holder)
+
+                    if payload is not None:
+                        self.count(key, "coalesced")
+                        return orjson.loads(payload)
+
+                    holder = None
+
+        stale: str | None = await self.redis.get(f"singleflight:stale:{key}")
+
+        if stale is not None:
+            logger.warning(f"[SingleFlight] {key} - Lease holder timed out, serving stale payload")
+            self.count(key, "stale")
+            return orjson.loads(stale)
+
+        return await fetch()
+
+    async def run(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Run an upstream fetch at most once at a time for a given key
+
+        Concurrent calls in the same worker share one task, and that task
+        shares the lease with every other worker and replica.
+
+        Args:
+            key (str): Flight key
+            fetch (Callable[[], Awaitable[Any]]): Upstream fetch
+
+        Returns:
+            Any: The fetched payload
+        """
+
+        task: asyncio.Task | None = self.inflight.get(key)
+
+        if task is not None:
+            self.count(key, "coalesced")
+            return await asyncio.shield(task)
+
+        task = asyncio.create_task(self.follow(key, fetch))
+        self.inflight[key] = task
+
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if self.inflight.get(key) is task:
+                del self.inflight[key]
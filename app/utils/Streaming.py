@@ -0,0 +1,54 @@
+from typing import AsyncIterator
+
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+
+from app.dependencies import load_config
+
+config: dict = load_config()
+
+class Streaming:
+
+    """Implements chunked sending of large pre-serialized bodies.
+
+    A body sent in one piece is copied into the transport buffer of every
+    slow client. Sent in chunks, each send waits for the client to drain
+    the previous ones, so a request only ever holds a chunk on top of the
+    body shared by the whole worker.
+    """
+
+    @staticmethod
+    async def chunks(body: bytes) -> AsyncIterator[bytes]:
+        """Slice a body, one chunk at a time
+
+        Args:
+            body (bytes): Serialized body
+
+        Yields:
+            bytes: The next chunk
+        """
+
+        size: int = config['streaming']['chunk_size']
+
+        for offset in range(0, len(body), size):
+            yield body[offset:offset + size]
+
+    @staticmethod
+    def respond(body: bytes, headers: dict[str, str], media_type: str = "application/json") -> Response:
+        """Send a pre-serialized body, in chunks if it's large
+
+        Args:
+            body (bytes): Serialized body
+            headers (dict[str, str]): Response headers
+            media_type (str, optional): Content type. Defaults to "application/json".
+
+        Returns:
+            Response: A plain response for small bodies, a streaming one otherwise
+        """
+
+        if len(body) < config['streaming']['threshold']:
+            return Response(content=body, media_type=media_type, headers=headers)
+
+        # The length is known, so clients still get it instead of a chunked transfer
+        return StreamingResponse(Streaming.chunks(body), media_type=media_type,
+                                 headers=headers | {'Content-Length': str(len(body))})
@@ -0,0 +1,173 @@
+import os
+import time
+import random
+
+import httpx
+from loguru import logger
+
+from app.utils.Metrics import Metrics
+from app.utils.RateLimitScheduler import RateLimitScheduler
+
+from app.dependencies import load_config
+
+config: dict = load_config()
+
+class TokenPool(httpx.AsyncBaseTransport):
+
+    """Spreads GitHub requests over a pool of tokens, weighted by their remaining rate limit.
+
+    Tokens are read from GITHUB_TOKENS (comma separated), GITHUB_TOKENS_FILE
+    (one per line) or, failing both, GITHUB_TOKEN. A token answering 401, or
+    403 for running out of rate limit, is quarantined and the request is
+    retried with another one.
+    """
+
+    def __init__(self, scheduler: RateLimitScheduler) -> None:
+        self.scheduler = scheduler
+        self.tokens: list[str] = self.load()
+        self.fingerprints: dict[str, str] = {token: RateLimitScheduler.fingerprint(f"token {token}")
+                                             for token in self.tokens}
+        self.quarantined: dict[str, float] = {}
+
+    @staticmethod
+    def load() -> list[str]:
+        """Load the tokens from the environment
+
+        Returns:
+            list[str]: GitHub tokens
+        """
+
+        tokens: list[str] = [token.strip() for token in os.environ.get('GITHUB_TOKENS', '').split(',')]
+
+        if 'GITHUB_TOKENS_FILE' in os.environ:
+            with open(os.environ['GITHUB_TOKENS_FILE']) as tokens_file:
+                tokens.extend(line.strip() for line in tokens_file)
+
+        tokens = list(dict.fromkeys(token for token in tokens if token))
+
+        return tokens or [os.environ['GITHUB_TOKEN']]
+
+    def weight(self, token: str, resource: str) -> float:
+        """Weigh a token by the budget it has left
+
+        Args:
+            token (str): GitHub token
+            resource (str): Rate limit resource
+
+        Returns:
+            float: Remaining requests, or the default limit if unknown or reset
+        """
+
+        budget: dict[str, float] | None = self.scheduler.budgets.get(f"{self.fingerprints[token]}:{resource}")
+
+        if budget is None or time.time() >= budget['reset']:
+            return config['token_pool']['default_limit']
+
+        # Keep a floor so an exhausted token is still picked when it's the only one left
+        return max(budget['remaining'], 1)
+
+    def choose(self, resource: str, tried: set[str]) -> str | None:
+        """Pick a token for a request
+
+        Args:
+            resource (str): Rate limit resource
+            tried (set[str]): Tokens the request was already rejected with
+
+        Returns:
+            str | None: GitHub token, or None if there's none left to try
+        """
+
+        now: float = time.time()
+        available: list[str] = [token for token in self.tokens
+                                if self.quarantined.get(token, 0) <= now and token not in tried]
+
+        if not available:
+            if tried:
+                return None
+
+            logger.error("[TokenPool] Every token is quarantined, using the one released first")
+            return min(self.tokens, key=lambda token: self.quarantined.get(token, 0))
+
+        return random.choices(available, weights=[self.weight(token, resource) for token in available])[0]
+
+    @staticmethod
+    def rejected(response: httpx.Response) -> bool:
+        """Check if a response rejected the token rather than the request
+
+        Any other 403, for a blocked or forbidden resource, would be the same
+        with every token, so it's returned as it is.
+
+        Args:
+            response (httpx.Response): Upstream response
+
+        Returns:
+            bool: True for bad credentials or a primary or secondary rate limit, False otherwise
+        """
+
+        if response.status_code == 401:
+            return True
+
+        return response.status_code == 403 and (response.headers.get('x-ratelimit-remaining') == '0' or
+                                                'retry-after' in response.headers)
+
+    async def quarantine(self, token: str, response: httpx.Response) -> None:
+        """Take a token out of rotation
+
+        Args:
+            token (str): GitHub token
+            response (httpx.Response): The response that rejected it
+        """
+
+        until: float = time.time() + config['token_pool']['quarantine']
+
+        if response.headers.get('x-ratelimit-remaining') == '0' and 'x-ratelimit-reset' in response.headers:
+            # Just out of budget, it will be back at the reset
+            until = float(response.headers['x-ratelimit-reset'])
+        elif 'retry-after' in response.headers:
+            until = time.time() + float(response.headers['retry-after'])
+
+        self.quarantined[token] = until
+        logger.warning(f"[TokenPool] {self.fingerprints[token]} - Quarantined after {response.status_code} until {int(until)}")
+        Metrics.quarantine.labels(self.fingerprints[token]).set(until)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Send a request with a token from the pool
+
+        Args:
+            request (httpx.Request): Outgoing request
+
+        Returns:
+            httpx.Response: Upstream response
+        """
+
+        resource: str = RateLimitScheduler.resource(request)
+        tried: set[str] = set()
+        token: str | None = self.choose(resource, tried)
+
+        while True:
+            assert token is not None
+            tried.add(token)
+            request.headers['Authorization'] = f"token {token}"
+
+            response: httpx.Response = await self.scheduler.handle_async_request(request)
+            rejected: bool = self.rejected(response)
+
+            # Counted in the worker's memory, not in Redis, so it costs no round trip
+            Metrics.tokens.labels(self.fingerprints[token], 'rejected' if rejected else 'accepted').inc()
+
+            if not rejected:
+                return response
+
+            await self.quarantine(token, response)
+
+            token = self.choose(resource, tried)
+
+            if token is None:
+                return response
+
+            await response.aclose()
+
+    async def aclose(self) -> None:
+        """Close the wrapped transport"""
+
+        await self.scheduler.aclose()
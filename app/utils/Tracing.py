@@ -0,0 +1,218 @@
+import inspect
+import functools
+from typing import Any, Awaitable, Callable, ContextManager, TypeVar
+
+import httpx
+from loguru import logger
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.dependencies import load_config
+
+config: dict = load_config()
+
+# OpenTelemetry is optional, without it tracing stays off whatever the config says
+try:
+    from opentelemetry import trace
+    from opentelemetry.trace import Span, Tracer
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+    installed: bool = True
+except ImportError:
+    installed = False
+
+if config['tracing']['enabled'] and not installed:
+    logger.warning("[Tracing] OpenTelemetry isn't installed, tracing is disabled")
+
+T = TypeVar('T')
+
+class Tracing:
+
+    """Implements OpenTelemetry tracing, exported to an OTLP collector.
+
+    Whether tracing is on is decided once, on import. When it's off the
+    decorators hand back what they're given and no instrumentation is
+    installed, so disabled tracing adds no code to any call.
+    """
+
+    enabled: bool = bool(config['tracing']['enabled']) and installed
+
+    tracer: 'Tracer | None' = trace.get_tracer("revanced-releases-api") if enabled else None
+
+    provider: Any = None
+
+    @classmethod
+    def start(cls) -> None:
+        """Set up the exporter of this worker
+
+        Done per worker, as the exporting thread wouldn't survive gunicorn's fork.
+        """
+
+        if not cls.enabled or cls.provider is not None:
+            return
+
+        cls.provider = TracerProvider(
+            resource=Resource.create({'service.name': config['tracing']['service_name']}),
+            sampler=ParentBased(TraceIdRatioBased(config['tracing']['sample_ratio']))
+            )
+        cls.provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=config['tracing']['endpoint'])))
+        trace.set_tracer_provider(cls.provider)
+
+    @classmethod
+    def stop(cls) -> None:
+        """Flush the spans left and stop exporting"""
+
+        if cls.provider is not None:
+            cls.provider.shutdown()
+            cls.provider = None
+
+    @classmethod
+    def start_span(cls, name: str, **options: Any) -> ContextManager['Span']:
+        """Start a span as the current one, only called when tracing is enabled
+
+        Args:
+            name (str): Name of the span
+            **options (Any): Passed on to Tracer.start_as_current_span
+
+        Returns:
+            ContextManager[Span]: The span, ended on exit
+        """
+
+        assert cls.tracer is not None, "Tracing is disabled"
+
+        return cls.tracer.start_as_current_span(name, **options)
+
+    @classmethod
+    def traced(cls, target: type[T]) -> type[T]:
+        """Trace every coroutine method of a class, each call in a span named after the method
+
+        Args:
+            target (type[T]): Class to trace
+
+        Returns:
+            type[T]: The same class
+        """
+
+        if not cls.enabled:
+            return target
+
+        for name, attribute in list(vars(target).items()):
+            # Class and static methods wrap the coroutine function
+            method: Any = attribute.__func__ if isinstance(attribute, (classmethod, staticmethod)) else attribute
+
+            if inspect.iscoroutinefunction(method):
+                wrapper: Any = cls.span(method.__qualname__)(method)
+                setattr(target, name, type(attribute)(wrapper) if method is not attribute else wrapper)
+
+        return target
+
+    @classmethod
+    def span(cls, name: str) -> Callable[[Callable[..., Awaitable[T]]], Callable[..., Awaitable[T]]]:
+        """Trace the calls of a coroutine function in a span
+
+        Args:
+            name (str): Name of the span
+
+        Returns:
+            Callable: Decorator
+        """
+
+        def decorator(function: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+            if not cls.enabled:
+                return function
+
+            @functools.wraps(function)
+            async def wrapper(*args: Any, **kwargs: Any) -> T:
+                with cls.start_span(name):
+                    return await function(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    @classmethod
+    def trace_routes(cls, app: FastAPI) -> None:
+        """Trace the handlers of every route, apart from the middlewares and the serialization around them
+
+        Args:
+            app (FastAPI): App whose routers are all included
+        """
+
+        if not cls.enabled:
+            return
+
+        for route in app.routes:
+            # Sync handlers are run in a thread pool, which a coroutine wrapper would break
+            if isinstance(route, APIRoute) and inspect.iscoroutinefunction(route.dependant.call):
+                router: str = route.endpoint.__module__.rpartition('.')[2]
+                route.dependant.call = cls.span(f"{router}.{route.name}")(route.dependant.call)
+
+    @classmethod
+    def attribute(cls, key: str, value: str | int | float | bool) -> None:
+        """Set an attribute on the current span
+
+        Args:
+            key (str): Attribute name
+            value (str | int | float | bool): Attribute value
+        """
+
+        if cls.enabled:
+            trace.get_current_span().set_attribute(key, value)
+
+class TracingMiddleware:
+
+    """Traces every request in a server span named after its route template."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        with Tracing.start_span(f"{scope['method']} {scope['path']}", kind=trace.SpanKind.SERVER) as span:
+            span.set_attribute('http.method', scope['method'])
+            span.set_attribute('http.target', scope['path'])
+
+            async def send_with_status(message: Message) -> None:
+                if message['type'] == 'http.response.start':
+                    span.set_attribute('http.status_code', message['status'])
+
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                route = scope.get('route')
+
+                if route is not None:
+                    span.update_name(f"{scope['method']} {route.path}")
+                    span.set_attribute('http.route', route.path)
+
+class TracingTransport(httpx.AsyncBaseTransport):
+
+    """Traces every request sent through the HTTPX client in a client span."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport) -> None:
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        with Tracing.start_span(f"{request.method} {request.url.host}", kind=trace.SpanKind.CLIENT) as span:
+            span.set_attribute('http.method', request.method)
+            span.set_attribute('http.url', str(request.url))
+
+            response: httpx.Response = await self.transport.handle_async_request(request)
+            span.set_attribute('http.status_code', response.status_code)
+
+            return response
+
+    async def aclose(self) -> None:
+        """Close the wrapped transport"""
+
+        await self.transport.aclose()
@@ -0,0 +1,102 @@
+from typing import Awaitable, cast
+
+import httpx
+import orjson
+
+from app.utils.Metrics import Metrics
+from app.utils.RedisConnector import RedisConnector
+
+from app.dependencies import load_config
+
+config: dict = load_config()
+
+class UpstreamCacheTransport(httpx.AsyncBaseTransport):
+
+    """Conditional-request cache for GitHub responses, shared by every worker through Redis.
+
+    Responses carrying an ETag or Last-Modified header are stored per URL.
+    The next request for the same URL is sent with If-None-Match or
+    If-Modified-Since, and a 304 is answered from the stored body. GitHub
+    doesn't count 304s against the rate limit.
+
+    Requests can opt out with the ``upstream_cache`` extension set to False,
+    e.g. for streamed downloads.
+    """
+
+    redis = RedisConnector.connect(config['upstream']['database'], decode_responses=False)
+
+    stored_headers: tuple[str, ...] = ('content-type', 'link')
+
+    def __init__(self, transport: httpx.AsyncBaseTransport) -> None:
+        self.transport = transport
+
+    async def store(self, url: str, response: httpx.Response) -> None:
+        """Store the validators and body of a response
+
+        Args:
+            url (str): Request URL
+            response (httpx.Response): Response with its body already read
+        """
+
+        entry: dict[str, str | bytes] = {
+            'body': response.content,
+            'headers': orjson.dumps({name: response.headers[name]
+                                     for name in self.stored_headers if name in response.headers})
+        }
+
+        if 'etag' in response.headers:
+            entry['etag'] = response.headers['etag']
+        if 'last-modified' in response.headers:
+            entry['last_modified'] = response.headers['last-modified']
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(f"upstream:{url}")
+            pipe.hset(f"upstream:{url}", mapping=entry)
+            pipe.expire(f"upstream:{url}", config['upstream']['expire'])
+            await pipe.execute()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Send a request, revalidating against the stored copy when there is one
+
+        Args:
+            request (httpx.Request): Outgoing request
+
+        Returns:
+            httpx.Response: Upstream response, or the stored copy on a 304
+        """
+
+        if request.method != 'GET' or not request.extensions.get('upstream_cache', True):
+            return await self.transport.handle_async_request(request)
+
+        url: str = str(request.url)
+        entry: dict[bytes, bytes] = await cast(Awaitable[dict], self.redis.hgetall(f"upstream:{url}"))
+
+        if b'etag' in entry:
+            request.headers['If-None-Match'] = entry[b'etag'].decode()
+        elif b'last_modified' in entry:
+            request.headers['If-Modified-Since'] = entry[b'last_modified'].decode()
+
+        response: httpx.Response = await self.transport.handle_async_request(request)
+
+        if response.status_code == 304 and entry:
+            await response.aclose()
+            Metrics.lookup('upstream', 'hit')
+
+            headers: dict[str, str] = orjson.loads(entry[b'headers'])
+            headers.update({name: value for name, value in response.headers.items()
+                            if name.startswith('x-ratelimit-')})
+
+            return httpx.Response(200, headers=headers, content=entry[b'body'], request=request)
+
+        if response.status_code == 200 and ('etag' in response.headers or 'last-modified' in response.headers):
+            await response.aread()
+            await self.store(url, response)
+
+        Metrics.lookup('upstream', 'miss')
+
+        return response
+
+    async def aclose(self) -> None:
+        """Close the wrapped transport"""
+
+        await self.transport.aclose()
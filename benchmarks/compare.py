@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+"""Put two suite.py results side by side.
+
+Every (scenario, route) measured in both runs gets a line with its
+requests per second and p95/p99 latency, before and after, and the change
+in percent.
+
+Usage:
+    python benchmarks/compare.py before.json after.json
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+import orjson
+
+def change(before: float, after: float) -> str:
+    if not before:
+        return "n/a"
+
+    return f"{(after - before) / before * 100:+.1f}%"
+
+def main() -> None:
+    options = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    options.add_argument('before')
+    options.add_argument('after')
+    arguments: argparse.Namespace = options.parse_args()
+
+    before: dict = orjson.loads(Path(arguments.before).read_bytes())
+    after: dict = orjson.loads(Path(arguments.after).read_bytes())
+
+    if before['parameters'] != after['parameters']:
+        print("warning: the runs were made with different parameters", file=sys.stderr)
+
+    baseline: dict[tuple[str, str], dict] = {(result['scenario'], result['route']): result
+                                             for result in before['results']}
+
+    print(f"{before['commit'][:10]} -> {after['commit'][:10]}")
+    print(f"{'scenario':<8} {'route':<48} {'rps':>24} {'p95 ms':>24} {'p99 ms':>24}")
+
+    for result in after['results']:
+        old: dict | None = baseline.get((result['scenario'], result['route']))
+
+        if old is None:
+            continue
+
+        columns: list[str] = []
+
+        for new_value, old_value in ((result['rps'], old['rps']),
+                                     (result['latency_ms']['p95'], old['latency_ms']['p95']),
+                                     (result['latency_ms']['p99'], old['latency_ms']['p99'])):
+            columns.append(f"{f'{old_value} -> {new_value}':>16} {change(old_value, new_value):>7}")
+
+        print(f"{result['scenario']:<8} {result['route']:<48} {' '.join(columns)}")
+
+if __name__ == '__main__':
+    main()
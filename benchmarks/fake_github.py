@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+
+"""A local stand-in for the parts of the GitHub API the releases API uses.
+
+Serves releases (REST and the aliased GraphQL query), the patches.json
+directory listing and raw blob, paginated contributors and commits, with
+ETags, 304s and rate limit headers. Latency, error rate and payload sizes
+are configurable, and the data is generated from a seed so every run sees
+the same payloads. Tests run it in-process and inject faults with fail().
+
+Usage:
+    python benchmarks/fake_github.py [--port 8701] [--latency 0.05] [--patches 1000] ...
+"""
+
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+import orjson
+import uvicorn
+from starlette.routing import Route
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.applications import Starlette
+
+from patches_memory import synthetic_patches
+
+REPOSITORIES: list[str] = ["revanced/revanced-patcher", "revanced/revanced-patches", "revanced/revanced-integrations",
+                           "revanced/revanced-manager", "revanced/revanced-cli", "revanced/revanced-website",
+                           "revanced/revanced-releases-api"]
+
+def parser() -> argparse.ArgumentParser:
+    """Describe the knobs of the fake
+
+    Returns:
+        argparse.ArgumentParser: Parser of the fake's options
+    """
+
+    options = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    options.add_argument('--host', default="127.0.0.1")
+    options.add_argument('--port', type=int, default=8701)
+    options.add_argument('--latency', type=float, default=0.05, help="seconds added to every response")
+    options.add_argument('--jitter', type=float, default=0.5, help="share of the latency randomly added or removed")
+    options.add_argument('--error-rate', type=float, default=0.0, help="share of requests answered with a 502")
+    options.add_argument('--patches', type=int, default=1000, help="patches in patches.json")
+    options.add_argument('--contributors', type=int, default=250, help="contributors per repository")
+    options.add_argument('--assets', type=int, default=3, help="assets per release")
+    options.add_argument('--releases', type=int, default=20, help="releases per repository")
+    options.add_argument('--commits', type=int, default=300, help="commits per repository")
+    options.add_argument('--rate-limit', type=int, default=1000000, help="requests per hour before the budget runs out")
+    options.add_argument('--seed', type=int, default=0)
+    return options
+
+class FakeGitHub:
+
+    """Generates the fake data and answers the GitHub endpoints with it."""
+
+    def __init__(self, options: argparse.Namespace) -> None:
+        self.options = options
+        self.random = random.Random(options.seed)
+        self.epoch = datetime(2023, 1, 1, tzinfo=timezone.utc)
+        # API URLs in payloads point back at the fake, like GitHub's point at api.github.com
+        self.url: str = f"http://{options.host}:{options.port}"
+        self.remaining: int = options.rate_limit
+        self.reset: int = int(time.time()) + 3600
+        # Path prefix, status and headers of the next requests to fail, in order
+        self.faults: list[tuple[str, int, dict[str, str]]] = []
+        # Requests answered, by path
+        self.requests: Counter[str] = Counter()
+
+        self.patches: bytes = synthetic_patches(options.patches)
+        self.patches_sha: str = hashlib.sha1(self.patches).hexdigest()
+
+        self.releases: dict[str, list[dict]] = {repository: self.generate_releases(repository)
+                                                for repository in REPOSITORIES}
+        self.contributors: dict[str, list[dict]] = {repository: self.generate_contributors()
+                                                    for repository in REPOSITORIES}
+        self.commits: dict[str, list[dict]] = {repository: self.generate_commits()
+                                               for repository in REPOSITORIES}
+        self.commit_index: dict[str, dict] = {commit['sha']: commit
+                                              for commits in self.commits.values() for commit in commits}
+
+    def fail(self, status: int, times: int = 1, path: str = "/", headers: dict[str, str] | None = None) -> None:
+        """Answer the next requests under a path with an error
+
+        Args:
+            status (int): Status code to answer with
+            times (int, optional): Requests to fail. Defaults to 1.
+            path (str, optional): Path prefix of the requests to fail. Defaults to every path.
+            headers (dict[str, str] | None, optional): Headers of the error responses. Defaults to None.
+        """
+
+        self.faults.extend([(path, status, headers or {})] * times)
+
+    def fault(self, request: Request) -> tuple[int, dict[str, str]] | None:
+        """Take the first fault injected for a request, if any
+
+        Args:
+            request (Request): Incoming request
+
+        Returns:
+            tuple[int, dict[str, str]] | None: Status and headers to answer with
+        """
+
+        for index, (path, status, headers) in enumerate(self.faults):
+            if request.url.path.startswith(path):
+                del self.faults[index]
+                return status, headers
+
+        return None
+
+    def timestamp(self, days: float) -> str:
+        return (self.epoch + timedelta(days=days)).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    def generate_releases(self, repository: str) -> list[dict]:
+        name: str = repository.split('/')[1]
+        releases: list[dict] = []
+
+        for index in range(self.options.releases):
+            tag: str = f"v1.{index}.0"
+            published: str = self.timestamp(index * 7)
+            releases.append({
+                'tag_name': tag,
+                'published_at': published,
+                'created_at': published,
+                'tarball_url': f"{self.url}/repos/{repository}/tarball/{tag}",
+                'assets': [{'name': f"{name}-{tag}-{asset}.jar",
+                            'size': self.random.randint(10**5, 10**8),
+                            'browser_download_url': f"https://github.com/{repository}/releases/download/{tag}/{name}-{asset}.jar",
+                            'content_type': "application/java-archive",
+                            'updated_at': published} for asset in range(self.options.assets)]
+            })
+
+        # Newest first, like GitHub
+        return releases[::-1]
+
+    def generate_contributors(self) -> list[dict]:
+        return [{'login': f"contributor-{index}",
+                 'id': index,
+                 'avatar_url': f"https://avatars.githubusercontent.com/u/{index}?v=4",
+                 'html_url': f"https://github.com/contributor-{index}",
+                 'type': "User",
+                 'site_admin': False,
+                 'contributions': self.random.randint(1, 1000)} for index in range(self.options.contributors)]
+
+    def generate_commits(self) -> list[dict]:
+        commits: list[dict] = []
+        days: float = self.options.releases * 7
+
+        for index in range(self.options.commits):
+            date: str = self.timestamp(days * (1 - index / self.options.commits))
+            commits.append({
+                'sha': hashlib.sha1(f"{self.random.random()}".encode()).hexdigest(),
+                'html_url': "https://github.com/revanced/commit",
+                'commit': {'author': {'name': f"contributor-{index % 20}", 'date': date},
+                           'committer': {'date': date},
+                           'message': f"fix: change number {index}"},
+                'files': [{'filename': f"src/main/kotlin/{self.random.choice(['app', 'patch', 'util'])}/File{index % 50}.kt"}]
+            })
+
+        return commits
+
+    async def respond(self, request: Request, content: bytes | None, status: int = 200,
+                      headers: dict[str, str] | None = None) -> Response:
+        """Answer like GitHub does: after some latency, with an ETag and rate limit headers
+
+        Args:
+            request (Request): Incoming request
+            content (bytes | None): Body, None for a 404
+            status (int, optional): Status code. Defaults to 200.
+            headers (dict[str, str] | None, optional): Extra headers. Defaults to None.
+
+        Returns:
+            Response: The fake GitHub response
+        """
+
+        latency: float = self.options.latency * (1 + self.options.jitter * (2 * random.random() - 1))
+        await asyncio.sleep(max(latency, 0))
+        self.requests[request.url.path] += 1
+
+        if time.time() >= self.reset:
+            self.remaining, self.reset = self.options.rate_limit, int(time.time()) + 3600
+
+        self.remaining = max(self.remaining - 1, 0)
+        headers = (headers or {}) | {'x-ratelimit-limit': str(self.options.rate_limit),
+                                     'x-ratelimit-remaining': str(self.remaining),
+                                     'x-ratelimit-reset': str(self.reset),
+                                     'x-ratelimit-resource': "graphql" if request.url.path == "/graphql" else "core"}
+
+        fault: tuple[int, dict[str, str]] | None = self.fault(request)
+
+        if fault is not None:
+            return Response(b'{"message": "Injected fault"}', status_code=fault[0], headers=headers | fault[1])
+
+        if random.random() < self.options.error_rate:
+            return Response(b'{"message": "Server Error"}', status_code=502, headers=headers)
+
+        if content is None:
+            return Response(b'{"message": "Not Found"}', status_code=404, headers=headers)
+
+        etag: str = f'"{hashlib.md5(content).hexdigest()}"'
+        headers['etag'] = etag
+
+        if request.headers.get('if-none-match') == etag:
+            return Response(status_code=304, headers=headers)
+
+        return Response(content, status_code=status, media_type=headers.pop('content-type', "application/json"),
+                        headers=headers)
+
+    def page(self, request: Request, items: list) -> tuple[list, dict[str, str]]:
+        """Paginate a list and build its Link header
+
+        Args:
+            request (Request): Incoming request
+            items (list): Every item
+
+        Returns:
+            tuple[list, dict[str, str]]: The requested page and its headers
+        """
+
+        per_page: int = int(request.query_params.get('per_page', 30))
+        page: int = int(request.query_params.get('page', 1))
+        last: int = max((len(items) + per_page - 1) // per_page, 1)
+        links: list[str] = []
+
+        if page < last:
+            links.append(f'<{request.url.include_query_params(page=page + 1)}>; rel="next"')
+            links.append(f'<{request.url.include_query_params(page=last)}>; rel="last"')
+
+        return items[(page - 1) * per_page:page * per_page], {'link': ", ".join(links)} if links else {}
+
+    def repository(self, request: Request) -> str:
+        return f"{request.path_params['owner']}/{request.path_params['repo']}"
+
+    async def latest_release(self, request: Request) -> Response:
+        releases: list[dict] | None = self.releases.get(self.repository(request))
+        return await self.respond(request, orjson.dumps(releases[0]) if releases else None)
+
+    async def releases_list(self, request: Request) -> Response:
+        releases: list[dict] | None = self.releases.get(self.repository(request))
+
+        if releases is None:
+            return await self.respond(request, None)
+
+        page, headers = self.page(request, releases)
+        return await self.respond(request, orjson.dumps(page), headers=headers)
+
+    async def graphql(self, request: Request) -> Response:
+        variables: dict[str, str] = orjson.loads(await request.body())['variables']
+        data: dict[str, dict | None] = {}
+
+        for index in range(len(variables) // 2):
+            releases: list[dict] | None = self.releases.get(f"{variables[f'owner{index}']}/{variables[f'name{index}']}")
+
+            if not releases:
+                data[f"r{index}"] = None
+                continue
+
+            release: dict = releases[0]
+            data[f"r{index}"] = {'latestRelease': {
+                'tagName': release['tag_name'],
+                'publishedAt': release['published_at'],
+                'releaseAssets': {'nodes': [{'name': asset['name'],
+                                             'size': asset['size'],
+                                             'contentType': asset['content_type'],
+                                             'downloadUrl': asset['browser_download_url'],
+                                             'updatedAt': asset['updated_at']} for asset in release['assets']]}
+            }}
+
+        return await self.respond(request, orjson.dumps({'data': data}))
+
+    async def contents(self, request: Request) -> Response:
+        listing: list[dict] = [{'name': "patches.json", 'path': "patches.json", 'sha': self.patches_sha,
+                                'size': len(self.patches), 'type': "file"},
+                               {'name': "README.md", 'path': "README.md", 'sha': "0" * 40, 'size': 10, 'type': "file"}]
+        return await self.respond(request, orjson.dumps(listing))
+
+    async def blob(self, request: Request) -> Response:
+        if request.path_params['sha'] != self.patches_sha:
+            return await self.respond(request, None)
+
+        return await self.respond(request, self.patches, headers={'content-type': "application/vnd.github.raw"})
+
+    async def contributors_list(self, request: Request) -> Response:
+        contributors: list[dict] | None = self.contributors.get(self.repository(request))
+
+        if contributors is None:
+            return await self.respond(request, None)
+
+        page, headers = self.page(request, contributors)
+        return await self.respond(request, orjson.dumps(page), headers=headers)
+
+    async def commits_list(self, request: Request) -> Response:
+        commits: list[dict] | None = self.commits.get(self.repository(request))
+
+        if commits is None:
+            return await self.respond(request, None)
+
+        # Like GitHub, the list leaves out the files each commit touched
+        page, headers = self.page(request, [{key: value for key, value in commit.items() if key != 'files'}
+                                            for commit in commits])
+        return await self.respond(request, orjson.dumps(page), headers=headers)
+
+    async def commit(self, request: Request) -> Response:
+        commit: dict | None = self.commit_index.get(request.path_params['sha'])
+        return await self.respond(request, orjson.dumps(commit) if commit else None)
+
+    def app(self) -> Starlette:
+        """Route the fake GitHub endpoints
+
+        Returns:
+            Starlette: The ASGI app
+        """
+
+        return Starlette(routes=[
+            Route('/graphql', self.graphql, methods=['POST']),
+            Route('/repos/{owner}/{repo}/releases/latest', self.latest_release),
+            Route('/repos/{owner}/{repo}/releases', self.releases_list),
+            Route('/repos/{owner}/{repo}/contents/{path:path}', self.contents),
+            Route('/repos/{owner}/{repo}/git/blobs/{sha}', self.blob),
+            Route('/repos/{owner}/{repo}/contributors', self.contributors_list),
+            Route('/repos/{owner}/{repo}/commits', self.commits_list),
+            Route('/repos/{owner}/{repo}/commits/{sha}', self.commit),
+        ])
+
+if __name__ == '__main__':
+    options: argparse.Namespace = parser().parse_args()
+    uvicorn.run(FakeGitHub(options).app(), host=options.host, port=options.port, log_level="warning")
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+
+"""Drive load at a running instance of the API and report latency percentiles.
+
+Requests are sent back to back from a fixed number of concurrent clients,
+either for a duration or for a number of requests, and every latency is
+kept so p50/p95/p99 are exact.
+
+Usage:
+    python benchmarks/load.py http://127.0.0.1:8700 /tools /patches [--concurrency 32] [--duration 10]
+"""
+
+import math
+import time
+import asyncio
+import argparse
+import statistics
+from typing import Any, Callable, Coroutine
+
+import httpx
+import orjson
+
+def percentile(latencies: list[float], share: float) -> float:
+    """Get a percentile by the nearest-rank method
+
+    Args:
+        latencies (list[float]): Sorted latencies
+        share (float): Percentile, between 0 and 1
+
+    Returns:
+        float: The latency at that percentile, 0 if there's none
+    """
+
+    if not latencies:
+        return 0.0
+
+    return latencies[max(math.ceil(share * len(latencies)) - 1, 0)]
+
+def summarize(route: str, latencies: list[float], errors: int, elapsed: float) -> dict:
+    """Summarize a run
+
+    Args:
+        route (str): Route that was driven
+        latencies (list[float]): Latency of every answered request, in seconds
+        errors (int): Failed requests
+        elapsed (float): Duration of the run, in seconds
+
+    Returns:
+        dict: Requests, errors, requests per second and latency percentiles in milliseconds
+    """
+
+    latencies = sorted(latencies)
+
+    return {'route': route,
+            'requests': len(latencies),
+            'errors': errors,
+            'rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+            'latency_ms': {'p50': round(percentile(latencies, 0.50) * 1000, 2),
+                           'p95': round(percentile(latencies, 0.95) * 1000, 2),
+                           'p99': round(percentile(latencies, 0.99) * 1000, 2),
+                           'max': round(latencies[-1] * 1000, 2) if latencies else 0.0,
+                           'mean': round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0}}
+
+async def drive(client: httpx.AsyncClient, route: str, concurrency: int, duration: float | None = None,
+                requests: int | None = None, during: Callable[[], Coroutine[Any, Any, None]] | None = None) -> dict:
+    """Send requests to a route from concurrent clients
+
+    Args:
+        client (httpx.AsyncClient): Client bound to the API
+        route (str): Path and query to request
+        concurrency (int): Requests in flight
+        duration (float | None, optional): Seconds to keep sending. Defaults to None.
+        requests (int | None, optional): Requests to send in total, if no duration is given. Defaults to None.
+        during (Callable[[], Coroutine[Any, Any, None]] | None, optional): Runs alongside the load, cancelled when it ends. Defaults to None.
+
+    Returns:
+        dict: The summary of the run
+    """
+
+    latencies: list[float] = []
+    errors: int = 0
+    remaining: int = requests if requests is not None else -1
+    deadline: float = time.perf_counter() + (duration or 0)
+
+    def more() -> bool:
+        nonlocal remaining
+
+        if duration is not None:
+            return time.perf_counter() < deadline
+
+        remaining -= 1
+        return remaining >= 0
+
+    async def worker() -> None:
+        nonlocal errors
+
+        while more():
+            started: float = time.perf_counter()
+
+            try:
+                response: httpx.Response = await client.get(route, headers={'Accept-Encoding': "gzip"})
+            except httpx.HTTPError:
+                errors += 1
+                continue
+
+            if response.status_code >= 400:
+                errors += 1
+                continue
+
+            latencies.append(time.perf_counter() - started)
+
+    side: asyncio.Task | None = asyncio.create_task(during()) if during is not None else None
+    started: float = time.perf_counter()
+
+    try:
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+    finally:
+        if side is not None:
+            side.cancel()
+            await asyncio.gather(side, return_exceptions=True)
+
+    return summarize(route, latencies, errors, time.perf_counter() - started)
+
+async def main() -> None:
+    options = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    options.add_argument('url')
+    options.add_argument('routes', nargs='+')
+    options.add_argument('--concurrency', type=int, default=32)
+    options.add_argument('--duration', type=float, default=10)
+    arguments: argparse.Namespace = options.parse_args()
+
+    limits = httpx.Limits(max_connections=arguments.concurrency, max_keepalive_connections=arguments.concurrency)
+
+    async with httpx.AsyncClient(base_url=arguments.url, limits=limits, timeout=30) as client:
+        for route in arguments.routes:
+            print(orjson.dumps(await drive(client, route, arguments.concurrency, arguments.duration)).decode())
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+
+"""Measure the event loop time logging takes per request.
+
+A request is simulated by the log calls a typical one makes: its access
+log line, which goes through the stdlib InterceptHandler, two HTTPX lines
+and four successful Redis operations.
+
+The old pipeline walks the stack for every stdlib record, logs every
+successful operation and formats and writes each line to the stream from
+the event loop. The new one samples successful operations, takes the
+caller from the record and hands records to QueuedSink, whose thread
+formats and writes them. The output goes to a temporary file in both
+cases, so the writes are real.
+
+Only the time spent on the event loop's thread is counted, as CPU time
+and as wall time. The writer thread's work runs beside the loop.
+
+Usage:
+    PYTHONPATH=. python benchmarks/logging_overhead.py [requests] [--json]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import tempfile
+from types import FrameType
+
+from loguru import logger
+
+# run.py reads these when imported, none of them is used here
+for name, value in {'REDIS_URL': "localhost", 'REDIS_PORT': "6379", 'GITHUB_TOKEN': "benchmark",
+                    'SECRET_KEY': "benchmark"}.items():
+    os.environ.setdefault(name, value)
+
+from run import InterceptHandler
+from app.utils.LogSink import QueuedSink
+from app.utils.Logger import InternalCacheLogger, HTTPXLogger, Sampling
+
+class OldInterceptHandler(logging.Handler):
+    """The InterceptHandler run.py used to have"""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        level: str | int
+        try:
+            level = logger.level(record.levelname).name
+        except ValueError:
+            level = record.levelno
+
+        frame: FrameType | None = logging.currentframe()
+        depth: int = 2
+        while frame is not None and frame.f_code.co_filename == logging.__file__:
+            frame = frame.f_back
+            depth += 1
+
+        logger.opt(depth=depth, exception=record.exc_info).log(level, record.getMessage())
+
+class Request:
+    """Stand-in for the httpx request and response the HTTPX hooks log"""
+
+    method: str = "GET"
+    url: str = "https://api.github.com/repos/revanced/revanced-patches/releases/latest"
+    status_code: int = 200
+    reason_phrase: str = "OK"
+    is_error: bool = False
+
+    @property
+    def request(self) -> 'Request':
+        return self
+
+async def old_request(access: logging.Logger) -> None:
+    access.info('%s - "%s %s HTTP/%s" %d', "127.0.0.1:50000", "GET", "/tools", "1.1", 200)
+    logger.info(f"[HTTPX] Request: {Request.method} {Request.url} - Waiting for response")
+    logger.info(f"[HTTPX] Response: {Request.method} {Request.url} - Status: 200 OK")
+
+    for operation in ("GET", "SET", "HSET", "EXPIRE"):
+        logger.info(f"[InternalCache] REDIS {operation} snapshot:tools - OK")
+
+async def new_request(access: logging.Logger, internal_cache: InternalCacheLogger, httpx_logger: HTTPXLogger) -> None:
+    access.info('%s - "%s %s HTTP/%s" %d', "127.0.0.1:50000", "GET", "/tools", "1.1", 200)
+    await httpx_logger.log_request(Request())
+    await httpx_logger.log_response(Request())
+
+    for operation in ("GET", "SET", "HSET", "EXPIRE"):
+        await internal_cache.log(operation, None, "snapshot:tools")
+
+async def measure(requests: int, request) -> tuple[float, float]:
+    """Run requests one after the other and time the loop thread
+
+    Returns:
+        tuple[float, float]: CPU and wall microseconds per request
+    """
+
+    cpu: float = time.thread_time()
+    wall: float = time.perf_counter()
+
+    for _ in range(requests):
+        await request()
+
+    return ((time.thread_time() - cpu) / requests * 1e6, (time.perf_counter() - wall) / requests * 1e6)
+
+def access_logger(handler: logging.Handler) -> logging.Logger:
+    access: logging.Logger = logging.getLogger("uvicorn.access")
+    access.handlers = [handler]
+    access.propagate = False
+    access.setLevel(logging.INFO)
+    return access
+
+async def main() -> None:
+    requests: int = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 20000
+    serialize: bool = "--json" in sys.argv
+
+    with tempfile.TemporaryFile("w") as stream:
+        logger.configure(handlers=[{"sink": stream, "serialize": serialize}])
+        access: logging.Logger = access_logger(OldInterceptHandler())
+        before: tuple[float, float] = await measure(requests, lambda: old_request(access))
+
+    async def run(rates: dict[str, float]) -> tuple[float, float]:
+        Sampling.rates = rates
+
+        with tempfile.TemporaryFile("w") as stream:
+            sink: QueuedSink = QueuedSink(stream, serialize=serialize)
+            logger.configure(handlers=[{"sink": sink, "format": "{message}", "colorize": False}])
+            access = access_logger(InterceptHandler())
+            internal_cache, httpx_logger = InternalCacheLogger(), HTTPXLogger()
+            result: tuple[float, float] = await measure(requests, lambda: new_request(access, internal_cache, httpx_logger))
+            sink.stop()
+
+        return result
+
+    sampled: dict[str, float] = Sampling.rates
+    # Everything logged, to tell the queued sink's share from the sampling's
+    unsampled: tuple[float, float] = await run({})
+    after: tuple[float, float] = await run(sampled)
+
+    print(f"{requests} requests, {'JSON' if serialize else 'text'} output")
+    print(f"before:          {before[0]:8.1f} us CPU {before[1]:8.1f} us wall per request")
+    print(f"after, unsampled:{unsampled[0]:8.1f} us CPU {unsampled[1]:8.1f} us wall per request")
+    print(f"after:           {after[0]:8.1f} us CPU {after[1]:8.1f} us wall per request")
+    print(f"saved:           {before[0] - after[0]:8.1f} us CPU {before[1] - after[1]:8.1f} us wall per request")
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+
+"""Compare peak memory of the two ways of fetching patches.json.
+
+The contents API path goes through the JSON envelope, the base64 string and
+the decoded bytes before it has a UTF-8 string it can parse. It's measured as
+it used to be written. The raw blob path is Releases' own fetch, run against a
+fake GitHub: once on its own, and once through the single-flight that stores
+the result for the other workers.
+
+Both the download stage (everything up to the parser input) and the whole
+fetch are measured for the contents API path. Releases parses as it goes, so
+only its whole fetch is. The parsed object itself is the same for every path
+and usually dominates the total.
+
+A Redis server is needed, configured through the same environment variables
+as the API.
+
+Usage:
+    PYTHONPATH=. python benchmarks/patches_memory.py [number of patches]
+"""
+
+import sys
+import asyncio
+import tracemalloc
+from base64 import b64encode, b64decode
+from typing import Any, Awaitable, Callable
+
+import httpx
+import orjson
+
+def synthetic_patches(count: int) -> bytes:
+    """Build a patches.json document with a realistic shape
+
+    Args:
+        count (int): Number of patches
+
+    Returns:
+        bytes: The encoded document
+    """
+
+    return orjson.dumps([{
+        'name': f"patch-{index}",
+        'description': "Lorem ipsum dolor sit amet, consectetur adipiscing elit " * 3,
+        'version': "0.0.1",
+        'excluded': False,
+        'dependencies': [f"patch-{index - 1}"] if index else [],
+        'options': [{'key': "option", 'title': "Option", 'description': "An option",
+                     'required': False, 'choices': None}],
+        'compatiblePackages': [{'name': f"com.example.app{index % 40}",
+                                'versions': [f"18.{minor}.0" for minor in range(10)]}]
+    } for index in range(count)])
+
+def upstream(document: bytes) -> httpx.MockTransport:
+    """Fake the contents, directory listing and git blobs endpoints
+
+    Args:
+        document (bytes): patches.json
+
+    Returns:
+        httpx.MockTransport: The fake GitHub
+    """
+
+    envelope: bytes = orjson.dumps({'name': "patches.json", 'encoding': "base64",
+                                    'content': b64encode(document).decode()})
+    listing: bytes = orjson.dumps([{'name': "patches.json", 'sha': "0" * 40}])
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith('/contents/'):
+            return httpx.Response(200, content=listing)
+
+        if '/contents/' in request.url.path:
+            return httpx.Response(200, content=envelope)
+
+        return httpx.Response(200, content=document)
+
+    return httpx.MockTransport(handler)
+
+async def contents_api(client: httpx.AsyncClient) -> str:
+    """The contents API path patches.json used to be fetched with"""
+
+    response = await client.get("https://api.github.com/repos/revanced/revanced-patches/contents/patches.json")
+
+    return b64decode(response.json()['content']).decode('utf-8')
+
+async def releases(client: httpx.AsyncClient) -> dict:
+    """Releases' streamed raw blob fetch, nothing stored beforehand"""
+
+    # Imported here, fake_github shares synthetic_patches without loading the API's config
+    from app.controllers.Releases import Releases
+
+    Releases.httpx_client, Releases.patches_json_sha, Releases.patches_json = client, None, b""
+    await Releases.redis.delete("patches")
+
+    return await Releases()._Releases__get_patches_json()  # type: ignore[attr-defined]
+
+async def releases_flight(client: httpx.AsyncClient) -> dict:
+    """The same fetch as the leader of its single-flight"""
+
+    from app.controllers.Releases import Releases
+
+    Releases.httpx_client, Releases.patches_json_sha, Releases.patches_json = client, None, b""
+    await Releases.redis.delete("patches", "singleflight:stale:patches")
+
+    return await Releases().get_patches_document()
+
+async def measure(fetch: Callable[[httpx.AsyncClient], Awaitable[Any]], document: bytes) -> tuple[int | None, int]:
+    """Measure the peak memory of a fetch
+
+    Args:
+        fetch (Callable): Fetch under test, returning the parser input, or the parsed document
+        document (bytes): patches.json
+
+    Returns:
+        tuple[int | None, int]: Peak allocated bytes of the download stage, None if
+        the fetch parses on its own, and of the whole fetch, not counting the fake
+        upstream's own copy
+    """
+
+    async with httpx.AsyncClient(transport=upstream(document)) as client:
+        tracemalloc.start()
+
+        result: Any = await fetch(client)
+        download_peak: int | None = None
+
+        if not isinstance(result, dict):
+            _, download_peak = tracemalloc.get_traced_memory()
+            orjson.loads(result)
+
+        _, total_peak = tracemalloc.get_traced_memory()
+
+        tracemalloc.stop()
+
+    return download_peak, total_peak
+
+async def main() -> None:
+    count: int = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    document: bytes = synthetic_patches(count)
+
+    print(f"patches.json: {count} patches, {len(document) / 2**20:.1f} MiB")
+
+    # Loaded before measuring, the API's modules aren't part of any fetch
+    import app.controllers.Releases  # noqa: F401
+
+    for fetch in (contents_api, releases, releases_flight):
+        download_peak, total_peak = await measure(fetch, document)
+        download: str = f"download peak {download_peak / 2**20:.1f} MiB, " if download_peak is not None else ""
+        print(f"{fetch.__name__:>15}: {download}total peak {total_peak / 2**20:.1f} MiB")
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+"""Compare how many /patches requests per second a single worker answers.
+
+The old path decodes the cached payload and lets FastAPI validate it against
+PatchesResponseModel and serialize it again on every request. The new path
+validates once at ingest and sends the stored snapshot as it is.
+
+Both run in-process over httpx's ASGI transport, so the numbers leave out the
+server and the network and only count the work the application does per
+request. A Redis server is needed, configured through the same environment
+variables as the API.
+
+Usage:
+    PYTHONPATH=. python benchmarks/patches_rps.py [number of patches] [seconds] [concurrency]
+"""
+
+import sys
+import time
+import asyncio
+
+import httpx
+import orjson
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import ORJSONResponse
+
+from patches_memory import synthetic_patches
+
+from app.controllers.Refresher import Refresher
+import app.models.ResponseModels as ResponseModels
+
+refresher = Refresher()
+
+app = FastAPI(default_response_class=ORJSONResponse)
+
+@app.get('/before', response_model=ResponseModels.PatchesResponseModel)
+async def before() -> list:
+    """The per-response validation path /patches used to take"""
+
+    return await refresher.get('patches')
+
+@app.get('/after', response_model=ResponseModels.PatchesResponseModel)
+async def after(request: Request) -> Response:
+    """The ingest-validated path /patches takes now"""
+
+    return await refresher.serve('patches', request)
+
+async def drive(client: httpx.AsyncClient, path: str, seconds: float, concurrency: int) -> float:
+    """Send requests back to back for a while
+
+    Args:
+        client (httpx.AsyncClient): Client bound to the app
+        path (str): Path under test
+        seconds (float): How long to keep sending
+        concurrency (int): Requests in flight
+
+    Returns:
+        float: Requests answered per second
+    """
+
+    answered: int = 0
+    deadline: float = time.perf_counter() + seconds
+
+    async def worker() -> None:
+        nonlocal answered
+
+        while time.perf_counter() < deadline:
+            response = await client.get(path)
+            response.raise_for_status()
+            answered += 1
+
+    started: float = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+
+    return answered / (time.perf_counter() - started)
+
+async def main() -> None:
+    count: int = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    seconds: float = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    concurrency: int = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+
+    patches: list = await refresher.validate('patches', orjson.loads(synthetic_patches(count)))
+    await refresher.store('patches', patches)
+
+    print(f"patches.json: {count} patches, {len(orjson.dumps(patches)) / 2**20:.1f} MiB, "
+          f"{seconds:.0f}s per path, {concurrency} in flight")
+
+    async with httpx.AsyncClient(app=app, base_url="http://benchmark") as client:
+        for path in ('/before', '/after'):
+            # Warm up the caches and the code paths first
+            await client.get(path)
+
+            rps: float = await drive(client, path, seconds, concurrency)
+            print(f"{path:>8}: {rps:.1f} requests/s")
+
+if __name__ == '__main__':
+    asyncio.run(main())
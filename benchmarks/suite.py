@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+
+"""Benchmark the API end to end against a fake GitHub and a local Redis.
+
+Starts a throwaway redis-server (unless one is given), the fake GitHub
+from fake_github.py and the API itself through run.py, then measures every
+route under three scenarios:
+
+    cold   Redis flushed and the API restarted, every request can miss
+    warm   caches filled beforehand, the steady state
+    storm  caches filled, then repeatedly dropped while the load runs
+
+Results are written as JSON along with the commit they were measured on,
+so two runs can be put side by side with compare.py.
+
+Usage:
+    python benchmarks/suite.py [--output results.json] [--workers 2] [--duration 10] [--latency 0.05]
+"""
+
+import os
+import sys
+import time
+import socket
+import shutil
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+from datetime import datetime, timezone
+
+import httpx
+import orjson
+from redis import asyncio as aioredis
+
+from load import drive
+
+ROOT: Path = Path(__file__).resolve().parent.parent
+
+ROUTES: list[str] = ["/tools", "/patches", "/patches?package=com.example.app1", "/contributors",
+                     "/changelogs/revanced/revanced-patches?path=src", "/tools/history/revanced/revanced-cli"]
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def configure(directory: Path, github: str, overrides: dict[str, dict[str, str]] | None = None) -> None:
+    """Write a config.toml pointing the API at a fake GitHub
+
+    Args:
+        directory (Path): Directory to write it to, the API's working directory
+        github (str): Base URL of the fake GitHub
+        overrides (dict[str, dict[str, str]] | None, optional): TOML values to replace, by section and key. Defaults to None.
+    """
+
+    overrides = {'[github]': {'api_url': f'"{github}"', 'graphql_url': f'"{github}/graphql"'}} | {
+        f"[{section}]": values for section, values in (overrides or {}).items()}
+    lines: list[str] = []
+    section: str = ""
+
+    for line in (ROOT / "config.toml").read_text().splitlines():
+        if line.startswith("["):
+            section = line.strip()
+        else:
+            key: str = line.partition("=")[0].strip()
+            if key in overrides.get(section, {}):
+                line = f"{key} = {overrides[section][key]}"
+        lines.append(line)
+
+    (directory / "config.toml").write_text("\n".join(lines) + "\n")
+
+async def wait_for(url: str, timeout: float = 30) -> None:
+    """Poll a URL until it answers
+
+    Args:
+        url (str): URL to poll
+        timeout (float, optional): Seconds to wait. Defaults to 30.
+    """
+
+    deadline: float = time.monotonic() + timeout
+
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.head(url)
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.2)
+
+    raise TimeoutError(f"{url} didn't come up in {timeout} seconds")
+
+class Suite:
+
+    """Runs the processes under test and the scenarios against them."""
+
+    def __init__(self, options: argparse.Namespace) -> None:
+        self.options = options
+        self.workdir: Path = Path(tempfile.mkdtemp(prefix="releases-api-bench-"))
+        self.processes: list[subprocess.Popen] = []
+        self.api: subprocess.Popen | None = None
+        self.github_port: int = free_port()
+        self.api_port: int = free_port()
+
+        if options.redis:
+            self.redis_host, _, port = options.redis.partition(':')
+            self.redis_port: int = int(port or 6379)
+        else:
+            self.redis_host, self.redis_port = "127.0.0.1", free_port()
+
+        self.redis = aioredis.Redis(host=self.redis_host, port=self.redis_port)
+
+    def spawn(self, command: list[str], **kwargs) -> subprocess.Popen:
+        process: subprocess.Popen = subprocess.Popen(command, stdout=subprocess.DEVNULL, **kwargs)
+        self.processes.append(process)
+        return process
+
+    def configure(self) -> None:
+        """Write a config.toml pointing the API at the fake GitHub, without the per client rate limit"""
+
+        # The load comes from a single address, the per client limit would answer most of it with a 429
+        configure(self.workdir, f"http://127.0.0.1:{self.github_port}", {'ratelimit': {'limit': '"100000000/minute"'}})
+
+    async def start(self) -> None:
+        if not self.options.redis:
+            if shutil.which("redis-server") is None:
+                sys.exit("redis-server isn't installed, pass --redis host:port of a server to use instead")
+
+            self.spawn(["redis-server", "--port", str(self.redis_port), "--save", "", "--appendonly", "no"])
+
+        self.spawn([sys.executable, str(ROOT / "benchmarks" / "fake_github.py"), "--port", str(self.github_port),
+                    "--latency", str(self.options.latency), "--patches", str(self.options.patches),
+                    "--contributors", str(self.options.contributors)],
+                   cwd=ROOT / "benchmarks")
+
+        self.configure()
+
+        for _ in range(50):
+            try:
+                await self.redis.ping()
+                break
+            except aioredis.ConnectionError:
+                await asyncio.sleep(0.1)
+
+        await wait_for(f"http://127.0.0.1:{self.github_port}/graphql")
+        await self.start_api()
+
+    async def start_api(self) -> None:
+        environment: dict[str, str] = os.environ | {
+            'PYTHONPATH': str(ROOT),
+            'HYPERCORN_HOST': "127.0.0.1",
+            'HYPERCORN_PORT': str(self.api_port),
+            'WORKERS': str(self.options.workers),
+            'REDIS_URL': self.redis_host,
+            'REDIS_PORT': str(self.redis_port),
+            'GITHUB_TOKEN': os.environ.get('GITHUB_TOKEN', "benchmark"),
+            'SECRET_KEY': os.environ.get('SECRET_KEY', "benchmark"),
+        }
+
+        self.api = self.spawn([sys.executable, str(ROOT / "run.py")], cwd=self.workdir, env=environment)
+        await wait_for(f"http://127.0.0.1:{self.api_port}/ping")
+
+    async def restart_api(self) -> None:
+        if self.api is not None:
+            self.api.terminate()
+            self.api.wait()
+            self.processes.remove(self.api)
+
+        await self.start_api()
+
+    async def stop(self) -> None:
+        await self.redis.close()
+
+        for process in reversed(self.processes):
+            process.terminate()
+
+        for process in self.processes:
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    async def drop_caches(self) -> None:
+        """Drop every cached response, like an expiry would, and tell the workers"""
+
+        keys: list[bytes] = []
+
+        for pattern in ("snapshot:*", "fastapi-cache*", "patches:index*"):
+            keys.extend([key async for key in self.redis.scan_iter(match=pattern)])
+
+        if keys:
+            await self.redis.delete(*keys)
+
+        # Dropping the keys alone would leave the per-worker copies alive until they expire
+        for key in keys:
+            await self.redis.publish("cache:invalidate", key)
+
+    async def storm(self) -> None:
+        while True:
+            await asyncio.sleep(self.options.storm_interval)
+            await self.drop_caches()
+
+    async def run(self) -> list[dict]:
+        options: argparse.Namespace = self.options
+        limits = httpx.Limits(max_connections=options.concurrency, max_keepalive_connections=options.concurrency)
+        results: list[dict] = []
+
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{self.api_port}", limits=limits,
+                                     timeout=60) as client:
+
+            for route in options.routes:
+                await self.redis.flushall()
+                await self.restart_api()
+                results.append({'scenario': "cold"} | await drive(client, route, options.concurrency,
+                                                                   requests=options.cold_requests))
+
+            for route in options.routes:
+                await drive(client, route, options.concurrency, requests=options.concurrency)
+                results.append({'scenario': "warm"} | await drive(client, route, options.concurrency,
+                                                                   duration=options.duration))
+
+            for route in options.routes:
+                await drive(client, route, options.concurrency, requests=options.concurrency)
+                results.append({'scenario': "storm"} | await drive(client, route, options.concurrency,
+                                                                    duration=options.duration, during=self.storm))
+
+        return results
+
+async def main() -> None:
+    options = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    options.add_argument('--output', help="file to write the results to, stdout if omitted")
+    options.add_argument('--redis', help="host:port of a Redis to use instead of starting one, it gets flushed")
+    options.add_argument('--workers', type=int, default=2)
+    options.add_argument('--concurrency', type=int, default=32)
+    options.add_argument('--duration', type=float, default=10, help="seconds of warm and storm load per route")
+    options.add_argument('--cold-requests', type=int, default=200, help="requests per route after a cold start")
+    options.add_argument('--storm-interval', type=float, default=1, help="seconds between cache drops in the storm")
+    options.add_argument('--latency', type=float, default=0.05, help="latency of the fake GitHub")
+    options.add_argument('--patches', type=int, default=1000)
+    options.add_argument('--contributors', type=int, default=250)
+    options.add_argument('--routes', nargs='+', default=ROUTES)
+    arguments: argparse.Namespace = options.parse_args()
+
+    suite: Suite = Suite(arguments)
+
+    try:
+        await suite.start()
+        results: list[dict] = await suite.run()
+    finally:
+        await suite.stop()
+
+    report: bytes = orjson.dumps({'commit': commit(),
+                                  'timestamp': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+                                  'parameters': {key: value for key, value in vars(arguments).items()
+                                                 if key not in ('output', 'redis')},
+                                  'results': results}, option=orjson.OPT_INDENT_2)
+
+    if arguments.output:
+        Path(arguments.output).write_bytes(report)
+    else:
+        print(report.decode())
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -1,12 +1,24 @@
 import os
 import sys
+import glob
+import atexit
+import tempfile
+
+# Workers write their metrics to files in this directory and /metrics adds them up.
+# prometheus_client picks it up when it's imported, so it's set before the app is.
+if __name__ == '__main__':
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        # Left over by a previous run
+        for path in glob.glob(os.path.join(os.environ['PROMETHEUS_MULTIPROC_DIR'], "*.db")):
+            os.remove(path)
+    else:
+        os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix="revanced-metrics-")
 
 import logging
 #import sentry_sdk
 from app.main import app
 from loguru import logger
 from fastapi import FastAPI
-from types import FrameType
 from typing import Any
 from multiprocessing import cpu_count
 from gunicorn.glogging import Logger
@@ -15,6 +27,9 @@ from gunicorn.app.base import BaseApplication
 #from sentry_sdk.integrations.httpx import HttpxIntegration
 #from sentry_sdk.integrations.gnu_backtrace import GnuBacktraceIntegration
 
+from app.utils.Logger import Sampling
+from app.utils.LogSink import QueuedSink
+
 from app.dependencies import load_config
 
 config: dict = load_config()
@@ -29,35 +44,53 @@ config: dict = load_config()
 
 LOG_LEVEL: Any = logging.getLevelName(config['logging']['level'])
 JSON_LOGS: bool = config['logging']['json_logs']
-WORKERS: int = int(cpu_count() + 1)
+WORKERS: int = int(os.environ.get('WORKERS', cpu_count() + 1))
 BIND: str = f'{os.environ.get("HYPERCORN_HOST")}:{os.environ.get("HYPERCORN_PORT")}'
 
 class InterceptHandler(logging.Handler):
     """Intercept logs and forward them to Loguru.
 
+    The caller is taken from the record instead of searched for up the
+    stack, and access logs of successful requests are sampled.
+
     Args:
         logging.Handler (Filterer): Handler to filter logs
     """
+    
+    access_loggers: frozenset[str] = frozenset({"uvicorn.access", "gunicorn.access"})
+    
+    # Loguru level of each stdlib level seen so far
+    levels: dict[int, str | int] = {}
+    
+    def loguru_level(self, record: logging.LogRecord) -> str | int:
+        """Get the Loguru level of a record, its number if Loguru has no such level."""
+        
+        level: str | int | None = self.levels.get(record.levelno)
+        
+        if level is None:
+            try:
+                level = logger.level(record.levelname).name
+            except ValueError:
+                level = record.levelno
+            
+            self.levels[record.levelno] = level
+        
+        return level
+    
     def emit(self, record: logging.LogRecord) -> None:
         """Emit a log record."""
         
-        # Get corresponding Loguru level if it exists
-        level: str | int
-        frame: FrameType
-        depth: int
+        if record.name in self.access_loggers:
+            # uvicorn's access records carry the status code last
+            status: Any = record.args[-1] if isinstance(record.args, tuple) and record.args else 0
+            
+            if isinstance(status, int) and status < 400 and not Sampling.keep('access'):
+                return
         
-        try:
-            level = logger.level(record.levelname).name
-        except ValueError:
-            level = record.levelno
-
-        # Find caller from where originated the logged message
-        frame, depth = logging.currentframe(), 2
-        while frame.f_code.co_filename == logging.__file__:
-            frame = frame.f_back
-            depth += 1
+        # Where the record was logged from, which the sink formats in place of this handler
+        origin: dict[str, Any] = {'name': record.name, 'function': record.funcName, 'line': record.lineno}
 
-        logger.opt(depth=depth, exception=record.exc_info).log(level, record.getMessage())
+        logger.bind(origin=origin).opt(exception=record.exc_info).log(self.loguru_level(record), record.getMessage())
 
 
 class StubbedGunicornLogger(Logger):
@@ -135,7 +168,11 @@ if __name__ == '__main__':
             seen.add(name.split(".")[0])
             logging.getLogger(name).handlers = [intercept_handler]
 
-    logger.configure(handlers=[{"sink": sys.stdout, "serialize": JSON_LOGS}])
+    # Records are formatted and written by a background thread, never on the event loop
+    log_sink: QueuedSink = QueuedSink(sys.stdout, serialize=JSON_LOGS)
+    atexit.register(log_sink.stop)
+    
+    logger.configure(handlers=[{"sink": log_sink, "format": "{message}", "colorize": False}])
 
     options: dict = {
         "bind": BIND,
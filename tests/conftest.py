@@ -0,0 +1,150 @@
+"""Fixtures shared by the test suite.
+
+The API reads config.toml from its working directory, and where Redis is
+from the environment, as soon as its modules are imported. So before the
+tests are collected, this starts the fake GitHub from benchmarks/fake_github.py
+and a fake Redis (fakeredis, with Lua) in background threads, and moves to
+a temporary directory holding a config.toml pointed at them. Set
+TEST_REDIS=host:port to run against a real Redis instead, it gets flushed.
+
+Coroutine tests run on a single event loop kept for the whole session, like
+the API's clients, which are created once at import, expect.
+"""
+
+import os
+import sys
+import asyncio
+import shutil
+import inspect
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+import pytest
+import uvicorn
+from redis import Redis
+from redis.exceptions import ResponseError
+from fakeredis import TcpFakeServer
+from fakeredis._clients._tcp_server import TCPFakeRequestHandler
+
+ROOT: Path = Path(__file__).resolve().parent.parent
+
+sys.path[:0] = [str(ROOT), str(ROOT / "benchmarks")]
+
+from suite import configure, free_port
+from fake_github import FakeGitHub, parser
+
+class FakeRedisHandler(TCPFakeRequestHandler):
+
+    """Answers error replies, NOSCRIPT included, without hanging up like fakeredis' own handler does."""
+
+    def setup(self) -> None:
+        super().setup()
+        read_response: Callable[..., Any] = self.current_client.read_response
+
+        def read(**kwargs: Any) -> Any:
+            try:
+                return read_response(**kwargs)
+            except ResponseError as e:
+                return e
+
+        setattr(self.current_client, 'read_response', read)
+
+def start_redis() -> tuple[str, int]:
+    """Start a fake Redis, unless TEST_REDIS points at a real one
+
+    Returns:
+        tuple[str, int]: Host and port of the Redis to use
+    """
+
+    if 'TEST_REDIS' in os.environ:
+        host, _, port = os.environ['TEST_REDIS'].partition(':')
+        return host, int(port or 6379)
+
+    server = TcpFakeServer(("127.0.0.1", free_port()), server_type="redis")
+    server.RequestHandlerClass = FakeRedisHandler
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-redis", daemon=True).start()
+
+    address: tuple = server.server_address
+
+    return str(address[0]), int(address[1])
+
+def start_github() -> tuple[FakeGitHub, str]:
+    """Start the fake GitHub, without latency so the tests stay fast
+
+    Returns:
+        tuple[FakeGitHub, str]: The fake, to inject faults with, and its base URL
+    """
+
+    port: int = free_port()
+    options: argparse.Namespace = parser().parse_args(["--port", str(port), "--latency", "0", "--patches", "50",
+                                                       "--contributors", "120", "--commits", "150"])
+    github: FakeGitHub = FakeGitHub(options)
+    server = uvicorn.Server(uvicorn.Config(github.app(), host=options.host, port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="fake-github", daemon=True).start()
+
+    while not server.started:
+        threading.Event().wait(0.05)
+
+    return github, github.url
+
+redis_host, redis_port = start_redis()
+github, github_url = start_github()
+
+loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+asyncio.set_event_loop(loop)
+
+def pytest_sessionstart(session: pytest.Session) -> None:
+    """Set up the API's working directory and environment, before the tests import it"""
+
+    workdir: Path = Path(tempfile.mkdtemp(prefix="releases-api-tests-"))
+    session.config.add_cleanup(lambda: shutil.rmtree(workdir, ignore_errors=True))
+    configure(workdir, github_url, {
+        # Every request comes from the same address
+        'ratelimit': {'limit': '"100000000/minute"'},
+        'breaker': {'reset_timeout': "1"},
+    })
+    os.chdir(workdir)
+
+    os.environ.update({'REDIS_URL': redis_host, 'REDIS_PORT': str(redis_port), 'GITHUB_TOKEN': "test",
+                       'SECRET_KEY': "test", 'GITHUB_WEBHOOK_SECRET': "test"})
+    os.environ.pop('GITHUB_TOKENS', None)
+    os.environ.pop('GITHUB_TOKENS_FILE', None)
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem: pytest.Function) -> bool | None:
+    """Run coroutine tests on the session's event loop"""
+
+    if not inspect.iscoroutinefunction(pyfuncitem.obj):
+        return None
+
+    arguments: dict[str, Any] = {name: pyfuncitem.funcargs[name] for name in pyfuncitem._fixtureinfo.argnames}
+    loop.run_until_complete(pyfuncitem.obj(**arguments))
+
+    return True
+
+@pytest.fixture(autouse=True)
+def clean() -> Iterator[None]:
+    """Start every test from an empty Redis, a fake GitHub without faults, empty worker caches and closed circuits"""
+
+    # Only importable once the session has started
+    from app.utils.LocalCache import LocalCache
+    from app.controllers.Releases import Releases
+
+    Redis(host=redis_host, port=redis_port).flushall()
+    github.faults.clear()
+    github.requests.clear()
+    LocalCache.entries.clear()
+    LocalCache.size = 0
+    Releases.breaker.circuits.clear()
+
+    yield
+
+@pytest.fixture
+def fake_github() -> FakeGitHub:
+    """The fake GitHub the API is pointed at"""
+
+    return github
@@ -0,0 +1,107 @@
+from typing import Any, Awaitable, Callable
+
+import httpx
+import pytest
+
+from app.utils.CircuitBreaker import CircuitBreaker, CircuitOpenError
+from app.dependencies import load_config
+
+config: dict = load_config()
+
+def answer(status: int) -> Callable[[], Awaitable[Any]]:
+    async def fetch() -> Any:
+        response: httpx.Response = httpx.Response(status, request=httpx.Request('GET', "https://api.github.com/"))
+        response.raise_for_status()
+        return response.status_code
+
+    return fetch
+
+async def trip(breaker: CircuitBreaker) -> None:
+    for _ in range(config['breaker']['threshold']):
+        with pytest.raises(httpx.HTTPStatusError):
+            await breaker.call('releases', answer(502))
+
+def elapse(breaker: CircuitBreaker) -> None:
+    # As if reset_timeout had passed
+    breaker.circuit('releases')['opened_at'] -= config['breaker']['reset_timeout']
+
+async def test_server_errors_open_the_circuit() -> None:
+    breaker: CircuitBreaker = CircuitBreaker()
+    await trip(breaker)
+
+    assert breaker.circuit('releases')['state'] == CircuitBreaker.OPEN
+
+    with pytest.raises(CircuitOpenError):
+        await breaker.call('releases', answer(200))
+
+async def test_successful_probe_closes_the_circuit() -> None:
+    breaker: CircuitBreaker = CircuitBreaker()
+    await trip(breaker)
+    elapse(breaker)
+
+    assert await breaker.call('releases', answer(200)) == 200
+    assert breaker.circuit('releases') | {'opened_at': 0} == {'state': CircuitBreaker.CLOSED, 'failures': 0,
+                                                              'opened_at': 0}
+
+async def test_failed_probe_opens_the_circuit_again() -> None:
+    breaker: CircuitBreaker = CircuitBreaker()
+    await trip(breaker)
+    elapse(breaker)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await breaker.call('releases', answer(503))
+
+    assert breaker.circuit('releases')['state'] == CircuitBreaker.OPEN
+
+    with pytest.raises(CircuitOpenError):
+        await breaker.call('releases', answer(200))
+
+async def test_only_one_probe_at_a_time() -> None:
+    breaker: CircuitBreaker = CircuitBreaker()
+    await trip(breaker)
+    elapse(breaker)
+
+    async def probe() -> int:
+        with pytest.raises(CircuitOpenError):
+            await breaker.call('releases', answer(200))
+        return 200
+
+    assert await breaker.call('releases', probe) == 200
+
+@pytest.mark.parametrize('status', [404, 403, 422])
+async def test_client_errors_do_not_trip(status: int) -> None:
+    breaker: CircuitBreaker = CircuitBreaker()
+
+    for _ in range(config['breaker']['threshold'] * 2):
+        with pytest.raises(httpx.HTTPStatusError):
+            await breaker.call('commits', answer(status))
+
+    assert breaker.circuit('commits')['failures'] == 0
+    assert not breaker.is_open('commits')
+
+async def test_rate_limiting_and_transport_errors_trip() -> None:
+    breaker: CircuitBreaker = CircuitBreaker()
+
+    async def unreachable() -> None:
+        raise httpx.ConnectError("Connection refused")
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await breaker.call('releases', answer(429))
+
+    for _ in range(config['breaker']['threshold'] - 1):
+        with pytest.raises(httpx.ConnectError):
+            await breaker.call('releases', unreachable)
+
+    assert breaker.is_open('releases')
+
+async def test_validation_errors_do_not_trip() -> None:
+    breaker: CircuitBreaker = CircuitBreaker()
+
+    async def invalid() -> None:
+        raise ValueError("patches.json not found")
+
+    for _ in range(config['breaker']['threshold'] * 2):
+        with pytest.raises(ValueError):
+            await breaker.call('patches', invalid)
+
+    assert not breaker.is_open('patches')
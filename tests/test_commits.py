@@ -0,0 +1,61 @@
+from datetime import datetime
+
+from fake_github import FakeGitHub
+
+from app.controllers.Commits import Commits
+
+REPOSITORY: str = "revanced/revanced-patches"
+
+def details(fake_github: FakeGitHub) -> int:
+    return sum(count for path, count in fake_github.requests.items() if path.startswith(f"/repos/{REPOSITORY}/commits/"))
+
+async def test_cold_sync_lists_commits_in_pages(fake_github: FakeGitHub) -> None:
+    changes: dict = await Commits().get("revanced", "revanced-patches", "")
+
+    releases: list[dict] = fake_github.releases[REPOSITORY]
+    until: datetime = datetime.fromisoformat(releases[0]['created_at'])
+    since: datetime = datetime.fromisoformat(releases[1]['created_at'])
+    window: list[str] = [commit['sha'] for commit in fake_github.commits[REPOSITORY]
+                         if since <= datetime.fromisoformat(commit['commit']['committer']['date']) <= until]
+
+    assert window
+    assert [commit['sha'] for commit in changes['commits']] == window
+    # 150 commits, 100 a page
+    assert fake_github.requests[f"/repos/{REPOSITORY}/commits"] == 2
+    # Files are only fetched for the commits between the latest releases
+    assert details(fake_github) == len(window)
+
+async def test_commits_are_filtered_by_path(fake_github: FakeGitHub) -> None:
+    changes: dict = await Commits().get("revanced", "revanced-patches", "src/main/kotlin/app")
+
+    assert changes['commits']
+    assert all(fake_github.commit_index[commit['sha']]['files'][0]['filename'].startswith("src/main/kotlin/app/")
+               for commit in changes['commits'])
+
+async def test_resync_only_lists_new_commits(fake_github: FakeGitHub) -> None:
+    commits: Commits = Commits()
+    before: dict = await commits.get("revanced", "revanced-patches", "")
+    await commits.redis.delete(f"{await commits.assemble_key('revanced', 'revanced-patches')}:synced")
+    fake_github.requests.clear()
+
+    assert await commits.get("revanced", "revanced-patches", "") == before
+    assert fake_github.requests[f"/repos/{REPOSITORY}/commits"] == 1
+    assert details(fake_github) == 0
+
+async def test_missing_repository_has_no_commits() -> None:
+    changes: dict = await Commits().get("revanced", "does-not-exist", "")
+
+    assert changes == {'repository': "revanced/does-not-exist", 'path': "", 'commits': []}
+
+async def test_repositories_without_webhooks_keep_the_short_sync_interval() -> None:
+    commits: Commits = Commits()
+
+    assert await commits.sync_interval("vancedapp") < await commits.sync_interval("revanced")
+
+async def test_missing_repositories_do_not_open_the_circuit() -> None:
+    commits: Commits = Commits()
+
+    for index in range(10):
+        await commits.get("revanced", f"does-not-exist-{index}", "")
+
+    assert not commits.breaker.is_open('commits')
@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+from redis.exceptions import ConnectionError
+
+import app.utils.Denylist as denylist_module
+from app.utils.Denylist import Denylist, DenylistNotLoadedError
+from app.controllers.Clients import Clients
+
+async def test_tokens_are_rejected_until_the_denylist_loads(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setitem(denylist_module.config['tokens'], 'load_timeout', 0.1)
+    release: asyncio.Event = asyncio.Event()
+    load = Denylist.load
+
+    async def slow() -> None:
+        await release.wait()
+        await load()
+
+    monkeypatch.setattr(Denylist, 'load', slow)
+
+    await Denylist.start()
+    try:
+        # Startup gave up waiting, which mustn't let banned tokens through
+        with pytest.raises(DenylistNotLoadedError):
+            Denylist.contains("jti")
+
+        release.set()
+        assert Denylist.loaded is not None
+        await asyncio.wait_for(Denylist.loaded.wait(), timeout=5)
+
+        assert Denylist.contains("jti") is False
+    finally:
+        await Denylist.stop()
+
+async def test_ban_stands_when_publishing_it_fails(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def unreachable(channel: str, message: str) -> int:
+        raise ConnectionError("Connection refused")
+
+    monkeypatch.setattr(Denylist, 'revoked', {})
+    monkeypatch.setattr(Denylist.redis, 'publish', unreachable)
+
+    assert await Clients().ban_token("jti") is True
+    assert await Clients.redis_tokens.exists("jti") == 1
+    assert "jti" in Denylist.revoked
+
+async def test_unpublished_bans_are_loaded_within_the_reload_interval(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setitem(denylist_module.config['tokens'], 'reload_interval', 0.1)
+    monkeypatch.setattr(Denylist, 'revoked', {})
+
+    await Denylist.start()
+    try:
+        # Banned in Redis by another worker, whose publish never arrived
+        await Clients.redis_tokens.set("unpublished", "")
+
+        for _ in range(50):
+            if Denylist.contains("unpublished"):
+                break
+            await asyncio.sleep(0.1)
+
+        assert Denylist.contains("unpublished") is True
+    finally:
+        await Denylist.stop()
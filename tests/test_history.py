@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import orjson
+
+from app.main import app
+from app.controllers.ReleaseHistory import ReleaseHistory
+
+REPOSITORY: str = "revanced/revanced-cli"
+
+def snapshot(version: str, published: datetime, *names: str) -> dict:
+    return {'tools': [{'repository': REPOSITORY, 'version': version, 'timestamp': published.isoformat(),
+                       'name': name, 'size': 1, 'browser_download_url': f"https://github.com/{name}",
+                       'content_type': "application/java-archive"} for name in names]}
+
+async def assets(version: str) -> list[str]:
+    release: tuple[bytes, str, bool] | None = await ReleaseHistory().get(REPOSITORY, version)
+    assert release is not None
+    return [asset['name'] for asset in orjson.loads(release[0])['tools']]
+
+async def test_new_releases_follow_uploads_until_they_settle() -> None:
+    history: ReleaseHistory = ReleaseHistory()
+    published: datetime = datetime.now(timezone.utc)
+
+    await history.record(snapshot("v2.0.0", published, "cli.jar"))
+    await history.record(snapshot("v2.0.0", published, "cli.jar", "cli-all.jar"))
+
+    assert await assets("v2.0.0") == ["cli.jar", "cli-all.jar"]
+
+async def test_settled_releases_only_change_with_their_asset_list() -> None:
+    history: ReleaseHistory = ReleaseHistory()
+    published: datetime = datetime.now(timezone.utc) - timedelta(days=30)
+
+    await history.record(snapshot("v1.0.0", published, "cli.jar"))
+    frozen: tuple[bytes, str, bool] | None = await history.get(REPOSITORY, "v1.0.0")
+
+    # Same assets, only the size changed
+    changed: dict = snapshot("v1.0.0", published, "cli.jar")
+    changed['tools'][0]['size'] = 2
+    await history.record(changed)
+    assert await history.get(REPOSITORY, "v1.0.0") == frozen
+
+    await history.record(snapshot("v1.0.0", published, "cli.jar", "cli-all.jar"))
+    assert await assets("v1.0.0") == ["cli.jar", "cli-all.jar"]
+
+    # Clients that cached the old list as immutable would never see the new one
+    revised: tuple[bytes, str, bool] | None = await history.get(REPOSITORY, "v1.0.0")
+    assert revised is not None and revised[2] is False
+
+async def test_only_settled_releases_are_immutable() -> None:
+    history: ReleaseHistory = ReleaseHistory()
+    now: datetime = datetime.now(timezone.utc)
+    await history.record(snapshot("v2.0.0", now, "cli.jar"))
+    await history.record(snapshot("v1.0.0", now - timedelta(days=30), "cli.jar"))
+
+    async with httpx.AsyncClient(app=app, base_url="http://test") as api:
+        fresh: httpx.Response = await api.get(f"/tools/history/{REPOSITORY}/v2.0.0")
+        settled: httpx.Response = await api.get(f"/tools/history/{REPOSITORY}/v1.0.0")
+
+    assert 'immutable' not in fresh.headers['cache-control']
+    assert 'immutable' in settled.headers['cache-control']
+
+async def test_history_query_parameters() -> None:
+    history: ReleaseHistory = ReleaseHistory()
+    published: datetime = datetime(2023, 5, 2, 12, tzinfo=timezone.utc)
+    await history.record(snapshot("v1.0.0", published - timedelta(days=7), "cli.jar"))
+    await history.record(snapshot("v1.1.0", published, "cli.jar"))
+
+    async with httpx.AsyncClient(app=app, base_url="http://test") as api:
+        # A naive date is in UTC, whatever the server's timezone
+        before: httpx.Response = await api.get(f"/tools/history/{REPOSITORY}", params={'before': "2023-05-02T12:00:00"})
+        invalid: httpx.Response = await api.get(f"/tools/history/{REPOSITORY}", params={'limit': 0})
+
+    assert [release['version'] for release in orjson.loads(before.content)['releases']] == ["v1.0.0"]
+    assert invalid.status_code == 422
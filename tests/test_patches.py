@@ -0,0 +1,99 @@
+import asyncio
+
+import httpx
+import orjson
+import pytest
+
+import app.controllers.PatchesHistory as patches_history_module
+from app.main import app
+from app.controllers.Releases import Releases
+from app.controllers.Refresher import Refresher
+from app.controllers.PatchesIndex import PatchesIndex
+from app.controllers.PatchesHistory import PatchesHistory
+from app.utils.HTTPCache import HTTPCache
+
+PATCHES: list[dict] = [
+    {'name': "universal", 'compatiblePackages': []},
+    {'name': "any-version", 'compatiblePackages': [{'name': "com.example.app", 'versions': []}]},
+    {'name': "pinned", 'compatiblePackages': [{'name': "com.example.app", 'versions': ["1.0.0"]}]},
+]
+
+def client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(app=app, base_url="http://test")
+
+async def bucket(package: str, version: str | None = None) -> list[str]:
+    found: tuple[bytes, str] | None = await PatchesIndex().get(package, version)
+    assert found is not None
+    return [patch['name'] for patch in orjson.loads(found[0])]
+
+async def test_universal_patches_are_in_every_bucket() -> None:
+    await PatchesIndex().update(PATCHES)
+
+    assert await bucket("com.example.app") == ["universal", "any-version", "pinned"]
+    assert await bucket("com.example.app", "1.0.0") == ["universal", "any-version", "pinned"]
+    assert await bucket("com.example.app", "2.0.0") == ["universal", "any-version"]
+    assert await bucket("com.example.other") == ["universal"]
+    assert await bucket("com.example.other", "1.0.0") == ["universal"]
+
+async def test_version_without_package_is_rejected() -> None:
+    async with client() as api:
+        response: httpx.Response = await api.get("/patches", params={'version': "1.0.0"})
+
+    assert response.status_code == 422
+
+async def test_missing_index_is_built_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    builds: list[list] = []
+    update = PatchesIndex.update
+
+    async def counted(self: PatchesIndex, patches: list) -> None:
+        builds.append(patches)
+        await update(self, patches)
+
+    monkeypatch.setattr(PatchesIndex, 'update', counted)
+
+    async with client() as api:
+        responses: list[httpx.Response] = await asyncio.gather(
+            *[api.get("/patches", params={'package': "com.example.app1"}) for _ in range(10)]
+            )
+
+    assert {response.status_code for response in responses} == {200}
+    assert len({response.content for response in responses}) == 1
+    assert len(builds) == 1
+
+async def test_history_keeps_diffs_aliases_and_documents_together(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setitem(patches_history_module.config['patches'], 'history', 2)
+    history: PatchesHistory = PatchesHistory()
+    documents: list[list[dict]] = [PATCHES[:1], PATCHES[:2], PATCHES]
+    versions: list[str] = [HTTPCache.etag(orjson.dumps(document)).strip('"') for document in documents]
+
+    # Blob SHAs of each document upstream
+    shas: list[str] = [str(index) * 40 for index in range(1, 4)]
+
+    for sha, document in zip(shas, documents):
+        await history.record(document, sha)
+
+    # The first document fell beyond the history, along with its alias
+    assert await history.get(versions[0]) is None
+    assert await history.get(shas[0]) is None
+    assert await history.redis.exists(f"patches:version:{versions[0]}") == 0
+
+    found: tuple[bytes, str] | None = await history.get(shas[1])
+    assert found is not None
+    diff: dict = orjson.loads(found[0])
+    assert diff['since'] == versions[1] and diff['until'] == versions[2]
+    assert [patch['name'] for patch in diff['added']] == ["pinned"]
+
+async def test_history_aliases_the_sha_the_document_came_with(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Fetched by another worker, whose result this one was handed
+    async def coalesced(self: Releases) -> dict:
+        return {'sha': "1" * 40, 'patches': [patch | {'description': "", 'version': "1.0.0", 'excluded': False}
+                                             for patch in PATCHES]}
+
+    monkeypatch.setattr(Releases, 'get_patches_document', coalesced)
+    monkeypatch.setattr(Releases, 'patches_json_sha', "2" * 40)
+
+    await Refresher().refresh('patches')
+
+    found: tuple[bytes, str] | None = await PatchesHistory().get("1" * 40)
+    assert found is not None
+    assert await PatchesHistory().get("2" * 40) is None
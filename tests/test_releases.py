@@ -0,0 +1,91 @@
+import httpx
+import orjson
+import pytest
+
+from fake_github import FakeGitHub
+
+import app.controllers.Releases as releases_module
+from app.controllers.Releases import Releases
+from app.controllers.Refresher import Refresher
+
+REPOSITORIES: list[str] = ["revanced/revanced-patcher", "revanced/revanced-patches", "revanced/revanced-cli"]
+
+async def latest_releases(monkeypatch: pytest.MonkeyPatch, engine: str, repositories: list[str]) -> list[dict]:
+    monkeypatch.setitem(releases_module.config['github'], 'engine', engine)
+    return (await Releases().get_latest_releases(repositories))['tools']
+
+async def test_graphql_engine_matches_rest(fake_github: FakeGitHub, monkeypatch: pytest.MonkeyPatch) -> None:
+    rest: list[dict] = await latest_releases(monkeypatch, 'rest', REPOSITORIES)
+    fake_github.requests.clear()
+    graphql: list[dict] = await latest_releases(monkeypatch, 'graphql', REPOSITORIES)
+
+    assert graphql == rest
+    assert len(rest) == len(REPOSITORIES) * fake_github.options.assets
+    # A single query for every repository
+    assert fake_github.requests == {"/graphql": 1}
+
+async def test_graphql_engine_matches_rest_without_assets(fake_github: FakeGitHub,
+                                                          monkeypatch: pytest.MonkeyPatch) -> None:
+    release: dict = fake_github.releases["revanced/revanced-cli"][0]
+    monkeypatch.setitem(release, 'assets', [])
+
+    rest: list[dict] = await latest_releases(monkeypatch, 'rest', REPOSITORIES)
+    graphql: list[dict] = await latest_releases(monkeypatch, 'graphql', REPOSITORIES)
+
+    assert graphql == rest
+    tarball: dict = next(asset for asset in rest if asset['repository'] == "revanced/revanced-cli")
+    assert tarball['browser_download_url'] == release['tarball_url']
+    assert tarball['content_type'] == "application/gzip"
+
+async def test_graphql_engine_skips_missing_repositories_like_rest(monkeypatch: pytest.MonkeyPatch) -> None:
+    repositories: list[str] = [*REPOSITORIES, "revanced/does-not-exist"]
+
+    rest: list[dict] = await latest_releases(monkeypatch, 'rest', repositories)
+    graphql: list[dict] = await latest_releases(monkeypatch, 'graphql', repositories)
+
+    assert graphql == rest
+    assert {asset['repository'] for asset in graphql} == set(REPOSITORIES)
+
+async def test_graphql_failure_falls_back_to_rest(fake_github: FakeGitHub, monkeypatch: pytest.MonkeyPatch) -> None:
+    rest: list[dict] = await latest_releases(monkeypatch, 'rest', REPOSITORIES)
+    fake_github.requests.clear()
+    fake_github.fail(502, path="/graphql")
+
+    graphql: list[dict] = await latest_releases(monkeypatch, 'graphql', REPOSITORIES)
+
+    assert graphql == rest
+    assert fake_github.requests["/graphql"] == 1
+    assert all(fake_github.requests[f"/repos/{repository}/releases/latest"] == 1 for repository in REPOSITORIES)
+
+async def test_failed_contributors_page_keeps_the_previous_snapshot(fake_github: FakeGitHub) -> None:
+    refresher: Refresher = Refresher()
+    before: dict = await refresher.refresh('contributors')
+
+    fake_github.fail(404, path="/repos/revanced/revanced-patches/contributors")
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await refresher.refresh('contributors')
+
+    assert await refresher.get('contributors') == before
+
+async def test_patches_json_is_a_copy_callers_can_change() -> None:
+    patches: dict = await Releases().get_patches_json()
+    expected: bytes = orjson.dumps(patches)
+    patches.clear()
+
+    # Served from this worker's copy, the blob SHA is unchanged
+    assert orjson.dumps(await Releases().get_patches_json()) == expected
+
+@pytest.mark.parametrize('status', [403, 429])
+async def test_refused_release_keeps_the_previous_snapshot(fake_github: FakeGitHub, monkeypatch: pytest.MonkeyPatch,
+                                                           status: int) -> None:
+    monkeypatch.setitem(releases_module.config['github'], 'engine', 'rest')
+    refresher: Refresher = Refresher()
+    before: dict = await refresher.refresh('tools')
+
+    fake_github.fail(status, path="/repos/revanced/revanced-cli/releases/latest")
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await refresher.refresh('tools')
+
+    assert await refresher.get('tools') == before
@@ -0,0 +1,84 @@
+import time
+import asyncio
+from typing import Awaitable, cast
+
+import httpx
+import pytest
+from prometheus_client import REGISTRY
+
+import app.utils.RateLimitScheduler as scheduler_module
+from app.utils.RateLimitScheduler import RateLimitScheduler, BudgetExhaustedError
+
+KEY: str = "token:core"
+
+def scheduler(remaining: int, reset_in: float) -> RateLimitScheduler:
+    paced: RateLimitScheduler = RateLimitScheduler(httpx.MockTransport(lambda request: httpx.Response(200)))
+    paced.budgets[KEY] = {'remaining': remaining, 'limit': 5000, 'reset': time.time() + reset_in}
+    return paced
+
+def test_paced_requests_take_consecutive_slots() -> None:
+    # 100 requests left over 100 s, below the reserve, so user-facing requests are paced
+    paced: RateLimitScheduler = scheduler(110, 100)
+
+    waits: list[float] = [paced.delay(KEY, RateLimitScheduler.USER) for _ in range(4)]
+
+    assert waits[0] == 0
+    assert waits[1:] == pytest.approx([1, 2, 3], abs=0.05)
+
+def test_user_requests_wait_at_most_max_wait() -> None:
+    paced: RateLimitScheduler = scheduler(110, 100)
+
+    waits: list[float] = [paced.delay(KEY, RateLimitScheduler.USER) for _ in range(20)]
+
+    assert max(waits) == pytest.approx(5, abs=0.05)
+
+def test_background_requests_give_up_instead_of_waiting_for_the_window() -> None:
+    paced: RateLimitScheduler = scheduler(0, 3000)
+
+    with pytest.raises(BudgetExhaustedError):
+        paced.delay(KEY, RateLimitScheduler.BACKGROUND)
+
+    # User-facing requests still get their short wait
+    assert paced.delay(KEY, RateLimitScheduler.USER) == 5
+
+async def test_budgets_are_shared_without_per_worker_fields() -> None:
+    paced: RateLimitScheduler = RateLimitScheduler(httpx.MockTransport(lambda request: httpx.Response(
+        200, headers={'x-ratelimit-remaining': "10", 'x-ratelimit-limit': "5000", 'x-ratelimit-reset': "0"})))
+
+    async with httpx.AsyncClient(transport=paced) as client:
+        await client.get("https://api.github.com/repos/revanced/revanced-cli", headers={'Authorization': "token a"})
+
+    fields: dict = await cast(Awaitable[dict], paced.redis.hgetall("github:budget"))
+    assert all(not field.startswith("queue:") for field in fields)
+    assert 0 < await paced.redis.ttl("github:budget") <= RateLimitScheduler.window
+
+async def test_budget_and_queue_are_exported(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setitem(scheduler_module.config['scheduler'], 'concurrency', 1)
+    answer: asyncio.Event = asyncio.Event()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await answer.wait()
+        return httpx.Response(200, headers={'x-ratelimit-remaining': "42", 'x-ratelimit-limit': "5000",
+                                            'x-ratelimit-reset': "0"})
+
+    def requests(state: str) -> float | None:
+        return REGISTRY.get_sample_value('github_scheduler_requests', {'state': state})
+
+    paced: RateLimitScheduler = RateLimitScheduler(httpx.MockTransport(handler))
+    queued: float = requests('queued') or 0
+
+    async with httpx.AsyncClient(transport=paced) as client:
+        sent: list[asyncio.Task] = [asyncio.create_task(client.get("https://api.github.com/repos/revanced/revanced-cli",
+                                                                   headers={'Authorization': "token metrics"}))
+                                    for _ in range(3)]
+        await asyncio.sleep(0.1)
+
+        # One request holds the only slot, the others wait for it
+        assert requests('queued') == queued + 2
+
+        answer.set()
+        await asyncio.gather(*sent)
+
+    assert requests('queued') == queued
+    assert REGISTRY.get_sample_value('github_rate_limit_remaining', {
+        'token': RateLimitScheduler.fingerprint("token metrics"), 'resource': "core"}) == 42
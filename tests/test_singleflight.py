@@ -0,0 +1,26 @@
+import asyncio
+
+from app.utils.SingleFlight import SingleFlight
+
+async def test_followers_get_the_payload_stored_once() -> None:
+    leader: SingleFlight = SingleFlight()
+    fetched: asyncio.Event = asyncio.Event()
+    fetches: list[str] = []
+
+    async def fetch(worker: str) -> dict:
+        fetches.append(worker)
+        await fetched.wait()
+        return {'patches': ["patch"]}
+
+    # Each follows on its own, as two workers would
+    leading: asyncio.Task = asyncio.create_task(leader.follow("test", lambda: fetch('leader')))
+    await asyncio.sleep(0.1)
+    following: asyncio.Task = asyncio.create_task(SingleFlight().follow("test", lambda: fetch('follower')))
+    await asyncio.sleep(0.1)
+    fetched.set()
+
+    assert await leading == await following == {'patches': ["patch"]}
+    assert fetches == ['leader']
+
+    results: list[str] = [key async for key in leader.redis.scan_iter("singleflight:result:test:*")]
+    assert [await leader.redis.get(key) for key in results] == [""]
@@ -0,0 +1,149 @@
+import time
+import asyncio
+from typing import Any
+
+import httpx
+import orjson
+import pytest
+
+from fake_github import FakeGitHub
+
+import app.utils.Compression as compression_module
+from app.utils.Compression import Compression
+from app.main import app
+from app.utils.Metrics import Metrics
+from app.controllers.Refresher import Refresher
+
+def client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(app=app, base_url="http://test")
+
+async def test_tools_are_built_once_then_served_from_the_snapshot(fake_github: FakeGitHub) -> None:
+    async with client() as api:
+        response: httpx.Response = await api.get("/tools")
+        calls: int = sum(fake_github.requests.values())
+        again: httpx.Response = await api.get("/tools")
+
+    assert response.status_code == 200
+    tools: list[dict] = orjson.loads(response.content)['tools']
+    assert {tool['repository'] for tool in tools} == set(fake_github.releases)
+    assert again.content == response.content
+    assert sum(fake_github.requests.values()) == calls
+
+async def test_snapshot_revalidates_with_its_etag() -> None:
+    async with client() as api:
+        response: httpx.Response = await api.get("/tools")
+        revalidated: httpx.Response = await api.get("/tools", headers={'If-None-Match': response.headers['etag']})
+
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+
+async def test_patches_are_sent_compressed_when_accepted(fake_github: FakeGitHub) -> None:
+    async with client() as api:
+        response: httpx.Response = await api.get("/patches", headers={'Accept-Encoding': "gzip"})
+
+    assert response.headers['content-encoding'] == "gzip"
+    assert orjson.loads(response.content) == orjson.loads(fake_github.patches)
+
+async def test_contributors_follow_every_page(fake_github: FakeGitHub) -> None:
+    async with client() as api:
+        response: httpx.Response = await api.get("/contributors")
+
+    repositories: list[dict] = orjson.loads(response.content)['repositories']
+    patches: dict = next(entry for entry in repositories if entry['name'] == "revanced/revanced-patches")
+    assert len(patches['contributors']) == len(fake_github.contributors["revanced/revanced-patches"])
+
+async def test_unchanged_upstream_data_is_revalidated(fake_github: FakeGitHub) -> None:
+    refresher: Refresher = Refresher()
+    await refresher.refresh('contributors')
+    hits: float = Metrics.cache.labels('upstream', 'hit')._value.get()
+    await refresher.refresh('contributors')
+
+    # Every page of the second refresh was a 304, answered from the shared upstream cache
+    pages: int = sum(count for path, count in fake_github.requests.items() if path.endswith("/contributors")) // 2
+    assert Metrics.cache.labels('upstream', 'hit')._value.get() - hits == pages
+
+async def test_uncompressed_snapshot_keeps_its_etag_on_revalidation(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Too small to be compressed, whatever the client accepts
+    monkeypatch.setitem(compression_module.config['compression'], 'min_size', 10**9)
+    headers: dict[str, str] = {'Accept-Encoding': "gzip"}
+
+    async with client() as api:
+        response: httpx.Response = await api.get("/tools", headers=headers)
+        revalidated: httpx.Response = await api.get("/tools", headers=headers | {'If-None-Match': response.headers['etag']})
+
+    assert 'content-encoding' not in response.headers
+    assert revalidated.status_code == 304
+    assert revalidated.headers['etag'] == response.headers['etag']
+
+async def test_snapshot_missing_its_body_is_rebuilt() -> None:
+    refresher: Refresher = Refresher()
+    await refresher.refresh('tools')
+    # HDEL's stub types the fields as lists
+    await refresher.redis.execute_command("HDEL", "snapshot:tools", "payload")
+
+    async with client() as api:
+        response: httpx.Response = await api.get("/tools")
+
+    assert response.status_code == 200
+    assert orjson.loads(response.content)['tools']
+
+def count_encodes(monkeypatch: pytest.MonkeyPatch) -> list[Any]:
+    encoded: list[Any] = []
+    encode = Refresher.encode
+
+    async def counted(self: Refresher, payload: Any) -> dict[str, bytes | float]:
+        encoded.append(payload)
+        return await encode(self, payload)
+
+    monkeypatch.setattr(Refresher, 'encode', counted)
+    return encoded
+
+async def test_concurrent_cold_misses_build_the_snapshot_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    encoded: list[Any] = count_encodes(monkeypatch)
+
+    async with client() as api:
+        responses: list[httpx.Response] = await asyncio.gather(*[api.get("/patches") for _ in range(20)])
+
+    assert {response.status_code for response in responses} == {200}
+    assert len(encoded) == 1
+
+async def test_cold_miss_waits_for_the_scheduled_refresh(monkeypatch: pytest.MonkeyPatch) -> None:
+    encoded: list[Any] = count_encodes(monkeypatch)
+    refresher: Refresher = Refresher()
+    # Held by a worker's refresh loop
+    await refresher.redis.set("singleflight:lease:refresh:tools", "scheduler")
+
+    async with client() as api:
+        request: asyncio.Task = asyncio.create_task(api.get("/tools"))
+        await asyncio.sleep(0.2)
+        await refresher.refresh('tools')
+        await refresher.redis.delete("singleflight:lease:refresh:tools")
+        response: httpx.Response = await request
+
+    assert response.status_code == 200
+    assert len(encoded) == 1
+
+async def test_event_loop_keeps_running_while_encoding(monkeypatch: pytest.MonkeyPatch) -> None:
+    # As slow as brotli at quality 11 on the patches, and like it, releasing the GIL
+    def compress(body: bytes) -> bytes:
+        time.sleep(0.5)
+        return body
+
+    monkeypatch.setitem(Compression.compressors, 'gzip', compress)
+    gaps: list[float] = []
+
+    async def tick() -> None:
+        while True:
+            before: float = time.monotonic()
+            await asyncio.sleep(0.01)
+            gaps.append(time.monotonic() - before)
+
+    ticker: asyncio.Task = asyncio.create_task(tick())
+    try:
+        fields: dict[str, bytes | float] = await Refresher().encode({'patches': ["x" * 4096]})
+    finally:
+        ticker.cancel()
+
+    assert 'payload:gzip' in fields
+    assert len(gaps) > 10
+    assert max(gaps) < 0.1
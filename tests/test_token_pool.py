@@ -0,0 +1,67 @@
+import httpx
+import pytest
+from prometheus_client import REGISTRY
+
+from app.utils.TokenPool import TokenPool
+from app.utils.RateLimitScheduler import RateLimitScheduler
+
+URL: str = "https://api.github.com/repos/revanced/revanced-cli/releases/latest"
+
+def pool(monkeypatch: pytest.MonkeyPatch, answers: dict[str, httpx.Response]) -> tuple[TokenPool, list[str]]:
+    """A pool of the tokens answers is keyed by, each answering its response"""
+
+    monkeypatch.setenv('GITHUB_TOKENS', ",".join(answers))
+    used: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        token: str = request.headers['Authorization'].removeprefix("token ")
+        used.append(token)
+        return answers[token]
+
+    return TokenPool(RateLimitScheduler(httpx.MockTransport(handler))), used
+
+async def get(tokens: TokenPool) -> httpx.Response:
+    async with httpx.AsyncClient(transport=tokens) as client:
+        return await client.get(URL)
+
+async def test_bad_credentials_are_quarantined_and_retried(monkeypatch: pytest.MonkeyPatch) -> None:
+    tokens, used = pool(monkeypatch, {'bad': httpx.Response(401), 'good': httpx.Response(200)})
+    monkeypatch.setattr(tokens, 'choose', lambda resource, tried: next(token for token in ['bad', 'good']
+                                                                       if token not in tried))
+
+    assert (await get(tokens)).status_code == 200
+    assert used == ['bad', 'good']
+    assert set(tokens.quarantined) == {'bad'}
+
+async def test_rate_limited_tokens_are_quarantined_until_the_reset(monkeypatch: pytest.MonkeyPatch) -> None:
+    limited: httpx.Response = httpx.Response(403, headers={'x-ratelimit-remaining': "0", 'x-ratelimit-reset': "2000000000"})
+    tokens, used = pool(monkeypatch, {'limited': limited, 'good': httpx.Response(200)})
+    monkeypatch.setattr(tokens, 'choose', lambda resource, tried: next(token for token in ['limited', 'good']
+                                                                       if token not in tried))
+
+    assert (await get(tokens)).status_code == 200
+    assert tokens.quarantined == {'limited': 2000000000}
+
+async def test_forbidden_resources_are_returned_without_rotating(monkeypatch: pytest.MonkeyPatch) -> None:
+    forbidden: httpx.Response = httpx.Response(403, headers={'x-ratelimit-remaining': "4000"},
+                                               json={'message': "Repository access blocked"})
+    tokens, used = pool(monkeypatch, {'first': forbidden, 'second': forbidden})
+
+    assert (await get(tokens)).status_code == 403
+    assert len(used) == 1
+    assert tokens.quarantined == {}
+
+async def test_token_usage_is_exported(monkeypatch: pytest.MonkeyPatch) -> None:
+    tokens, used = pool(monkeypatch, {'exported': httpx.Response(401)})
+    fingerprint: str = tokens.fingerprints['exported']
+
+    def requests(outcome: str) -> float:
+        return REGISTRY.get_sample_value('github_token_requests_total',
+                                         {'token': fingerprint, 'outcome': outcome}) or 0
+
+    rejected: float = requests('rejected')
+
+    assert (await get(tokens)).status_code == 401
+    assert requests('rejected') == rejected + 1
+    assert REGISTRY.get_sample_value('github_token_quarantined_until_seconds',
+                                     {'token': fingerprint}) == tokens.quarantined['exported']
@@ -0,0 +1,32 @@
+from contextlib import nullcontext
+from typing import Any, ContextManager
+
+import pytest
+
+from app.utils.Tracing import Tracing
+
+async def test_class_and_static_methods_are_traced(monkeypatch: pytest.MonkeyPatch) -> None:
+    spans: list[str] = []
+    monkeypatch.setattr(Tracing, 'enabled', True)
+
+    def start_span(name: str, **options: Any) -> ContextManager[None]:
+        spans.append(name)
+        return nullcontext()
+
+    monkeypatch.setattr(Tracing, 'start_span', start_span)
+
+    @Tracing.traced
+    class Controller:
+        @classmethod
+        async def owner(cls) -> type:
+            return cls
+
+        @staticmethod
+        async def answer() -> int:
+            return 42
+
+    assert isinstance(vars(Controller)['owner'], classmethod)
+    assert isinstance(vars(Controller)['answer'], staticmethod)
+    assert await Controller.owner() is Controller
+    assert await Controller().answer() == 42
+    assert spans == [Controller.owner.__qualname__, Controller.answer.__qualname__]
@@ -0,0 +1,71 @@
+import hmac
+import hashlib
+from pathlib import Path
+
+import httpx
+import orjson
+import pytest
+
+import app.routers.webhooks as webhooks
+from app.main import app
+from app.utils.RateLimitScheduler import RateLimitScheduler
+
+FIXTURES: Path = Path(__file__).resolve().parent / "fixtures" / "webhooks"
+
+async def deliver(event: str, body: bytes) -> httpx.Response:
+    # Signed with GITHUB_WEBHOOK_SECRET as conftest sets it
+    signature: str = "sha256=" + hmac.new(b"test", body, hashlib.sha256).hexdigest()
+
+    async with httpx.AsyncClient(app=app, base_url="http://test") as api:
+        return await api.post("/webhooks/github", content=body, headers={
+            'X-GitHub-Event': event, 'X-Hub-Signature-256': signature, 'Content-Type': "application/json"})
+
+async def recorded(event: str, fixture: str | None = None) -> httpx.Response:
+    return await deliver(event, (FIXTURES / f"{fixture or event}.json").read_bytes())
+
+async def test_ping_refreshes_nothing() -> None:
+    response: httpx.Response = await recorded('ping')
+
+    assert response.status_code == 202
+    assert orjson.loads(response.content) == {'event': "ping", 'refreshing': []}
+
+async def test_push_to_the_default_branch_refreshes_patches_and_changelogs() -> None:
+    response: httpx.Response = await recorded('push')
+
+    # patches.json isn't in the listed commits, which GitHub caps at 20
+    assert orjson.loads(response.content)['refreshing'] == ["patches", "changelogs:revanced/revanced-patches"]
+
+async def test_push_to_another_branch_refreshes_nothing() -> None:
+    response: httpx.Response = await recorded('push', 'push_branch')
+
+    assert orjson.loads(response.content)['refreshing'] == []
+
+async def test_release_refreshes_tools_and_changelogs() -> None:
+    response: httpx.Response = await recorded('release')
+
+    assert orjson.loads(response.content)['refreshing'] == ["tools:revanced/revanced-cli",
+                                                            "changelogs:revanced/revanced-cli"]
+
+async def test_refreshes_queue_behind_user_requests(monkeypatch: pytest.MonkeyPatch) -> None:
+    priorities: list[int] = []
+
+    async def refresh(*args: str) -> None:
+        priorities.append(RateLimitScheduler.priority.get())
+
+    monkeypatch.setattr(webhooks.refresher, 'refresh', refresh)
+    monkeypatch.setattr(webhooks.commits, 'sync', refresh)
+    await recorded('push')
+
+    # A burst of webhooks mustn't use up the budget reserved for users
+    assert priorities == [RateLimitScheduler.BACKGROUND, RateLimitScheduler.BACKGROUND]
+
+async def test_invalid_payload_is_rejected() -> None:
+    assert (await deliver('push', b"payload=%7B%7D")).status_code == 400
+    assert (await deliver('push', b"[]")).status_code == 400
+
+async def test_unsigned_payload_is_rejected() -> None:
+    async with httpx.AsyncClient(app=app, base_url="http://test") as api:
+        response: httpx.Response = await api.post("/webhooks/github", content=(FIXTURES / "ping.json").read_bytes(),
+                                                  headers={'X-GitHub-Event': "ping"})
+
+    assert response.status_code == 401